@@ -0,0 +1,78 @@
+"""Per-user cost of decrypting Zerodha credentials, with and without the cache.
+
+Encrypts an API key and access token for --users users, then times:
+
+  fernet   cipher.decrypt for both tokens (the old decrypt_token)
+  cold     decrypt_token on an empty cache (Fernet plus the cache insert)
+  warm     decrypt_token again within CREDENTIAL_CACHE_TTL (margins, penalty retries)
+  batch    decrypt_tokens over every user's pair at once (warm cache)
+
+    python benchmarks/credentials.py --users 10000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float], users: int):
+    mean = statistics.mean(samples)
+    print(f"{label:<8} total={mean:9.2f}ms  per user={mean * 1000 / users:7.2f}us  max={max(samples):9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from cryptography.fernet import Fernet
+
+    os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URL", f"sqlite:///{tempfile.mkstemp(suffix='.db')[1]}")
+    os.environ["CREDENTIAL_CACHE_SIZE"] = str(args.users * 2)
+
+    import security
+    from security import cipher, decrypt_token, decrypt_tokens, encrypt_token
+
+    pairs = [(encrypt_token(f"api_key_{n:06d}"), encrypt_token(f"access_token_{n:032d}")) for n in range(args.users)]
+    flat = [token for pair in pairs for token in pair]
+
+    def fernet():
+        for api_key, access_token in pairs:
+            cipher.decrypt(api_key.encode()).decode()
+            cipher.decrypt(access_token.encode()).decode()
+
+    def cold():
+        security._plaintexts.clear()
+        for api_key, access_token in pairs:
+            decrypt_token(api_key)
+            decrypt_token(access_token)
+
+    def warm():
+        for api_key, access_token in pairs:
+            decrypt_token(api_key)
+            decrypt_token(access_token)
+
+    print(f"{args.users} users, 2 tokens each, mean of {args.repeat} runs")
+    report("fernet", timed(fernet, args.repeat), args.users)
+    report("cold", timed(cold, args.repeat), args.users)
+    report("warm", timed(warm, args.repeat), args.users)
+    report("batch", timed(lambda: decrypt_tokens(flat), args.repeat), args.users)
+
+
+if __name__ == "__main__":
+    main()
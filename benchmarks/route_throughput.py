@@ -0,0 +1,78 @@
+"""Requests/sec for the hot read routes against a running server.
+
+Run once on a build using the sync session and once on the async-session
+build, with the same pool settings, and compare the numbers:
+
+    python benchmarks/route_throughput.py --base-url http://localhost:8000 \
+        --session-token <session cookie> --concurrency 50 --duration 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/user/stats",
+    "/daily-questions",
+    "/problems/all?page=1&limit=50",
+    "/leaderboard/",
+]
+
+
+async def hammer(client: httpx.AsyncClient, path: str, concurrency: int, duration: float) -> dict:
+    deadline = time.perf_counter() + duration
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if len(latencies) > 1 else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--session-token", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per route")
+    parser.add_argument("--path", action="append", dest="paths", help="route to test (repeatable)")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        cookies={"session_token": args.session_token},
+        timeout=60,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        for path in args.paths or DEFAULT_PATHS:
+            result = await hammer(client, path, args.concurrency, args.duration)
+            print(
+                f"{path:<36} {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.1f}ms "
+                f"p99={result['p99_ms']:7.1f}ms  n={result['requests']} errors={result['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
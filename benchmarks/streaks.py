@@ -0,0 +1,109 @@
+"""Full-history streak rebuild vs. incremental solve-day updates.
+
+Seeds a throwaway SQLite database with users that each have --submissions
+LeetCode submissions spread over --days days, then times:
+
+  rebuild      helpers.streaks.rebuild_user_streak (the old per-request scan)
+  incremental  record_solve_days for one new day + commit (sync / sweep path)
+  read         stats lookup + decay check (GET /user/stats path)
+
+    python benchmarks/streaks.py --users 5 --submissions 10000 --repeat 20
+
+Pass --database-url to run against MySQL instead (tables are created if needed).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]):
+    print(f"{label:<12} mean={statistics.mean(samples):8.2f}ms  p50={statistics.median(samples):8.2f}ms  max={max(samples):8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--submissions", type=int, default=10000, help="submissions per user")
+    parser.add_argument("--days", type=int, default=730, help="history length in days")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkstemp(suffix='.db')[1]}"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = database_url
+
+    from database import Base, SessionLocal, engine
+    from helpers.streaks import decay_streak, rebuild_user_streak, record_solve_days, today_local
+    from models import LeetCodeSubmission, UserStat, UserSolveDay
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    rng = random.Random(42)
+    now = int(datetime.now().timestamp())
+
+    user_ids = []
+    for n in range(args.users):
+        stats = UserStat(user_id=1_000_000 + n)
+        db.add(stats)
+        user_ids.append(stats.user_id)
+        db.bulk_insert_mappings(LeetCodeSubmission, [
+            {
+                "user_id": stats.user_id,
+                "submission_id": f"bench-{n}-{i}",
+                "slug": "two-sum",
+                "status": "Accepted",
+                "timestamp": now - rng.randrange(args.days * 86400),
+            }
+            for i in range(args.submissions)
+        ])
+    db.commit()
+    print(f"Seeded {args.users} users x {args.submissions} submissions into {database_url}")
+
+    for user_id in user_ids:
+        report("rebuild", timed(lambda: rebuild_user_streak(user_id, db), args.repeat))
+
+    def incremental(user_id):
+        # Each call records the day after the current last day (new activity)
+        stats = db.query(UserStat).filter(UserStat.user_id == user_id).first()
+        next_day = (stats.streak_last_day or today_local()) + timedelta(days=1)
+        record_solve_days(db, user_id, [next_day], stats=stats)
+        db.commit()
+
+    for user_id in user_ids:
+        report("incremental", timed(lambda: incremental(user_id), args.repeat))
+
+    def read(user_id):
+        stats = db.query(UserStat).filter(UserStat.user_id == user_id).first()
+        if decay_streak(stats):
+            db.commit()
+
+    for user_id in user_ids:
+        report("read", timed(lambda: read(user_id), args.repeat))
+
+    # Leave a MySQL database as we found it
+    if args.database_url:
+        db.query(LeetCodeSubmission).filter(LeetCodeSubmission.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(UserSolveDay).filter(UserSolveDay.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(UserStat).filter(UserStat.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
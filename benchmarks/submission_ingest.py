@@ -0,0 +1,128 @@
+"""Submission history ingest: per-row ORM adds vs. streamed INSERT IGNORE batches.
+
+Feeds a synthetic --submissions long history (20-item pages, like LeetCode's
+submissionList) to a throwaway SQLite database and times:
+
+  orm          the old path: load every known id, db.add() each new row, one commit
+  streamed     helpers.submissions.ingest_submission_pages into an empty table
+  resync       the same history again (everything is a duplicate)
+  top-up       --new fresh submissions on top of the stored history
+
+Peak Python memory (tracemalloc) is reported next to each wall time.
+
+    python benchmarks/submission_ingest.py --submissions 50000
+
+Pass --database-url to run against MySQL instead (tables are created if needed).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PAGE_SIZE = 20
+
+
+def history(prefix: str, count: int, days: int, rng: random.Random) -> list[dict]:
+    now = int(datetime.now().timestamp())
+    stamps = sorted((now - rng.randrange(days * 86400) for _ in range(count)), reverse=True)
+    return [
+        {
+            "id": f"{prefix}-{i}",
+            "title": "Two Sum",
+            "slug": "two-sum",
+            "status": "Accepted" if rng.random() < 0.4 else "Wrong Answer",
+            "timestamp": stamp,
+        }
+        for i, stamp in enumerate(stamps)
+    ]
+
+
+async def pages(items: list[dict]):
+    for start in range(0, len(items), PAGE_SIZE):
+        yield items[start:start + PAGE_SIZE]
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed:10.1f}ms  peak={peak / 1024 / 1024:7.2f}MiB  -> {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=50000)
+    parser.add_argument("--new", type=int, default=200, help="fresh submissions for the top-up run")
+    parser.add_argument("--days", type=int, default=730, help="history length in days")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkstemp(suffix='.db')[1]}"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = database_url
+
+    from database import Base, SessionLocal, engine
+    from helpers.activity import record_activity, submission_counts
+    from helpers.streaks import day_from_timestamp, record_solve_days
+    from helpers.submissions import ingest_submission_pages
+    from models import LeetCodeSubmission, UserDailyActivity, UserSolveDay, UserStat
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    rng = random.Random(42)
+    orm_user, streamed_user = 2_000_000, 2_000_001
+    user_ids = [orm_user, streamed_user]
+    db.add_all([UserStat(user_id=user_id) for user_id in user_ids])
+    db.commit()
+
+    items = history("bench", args.submissions, args.days, rng)
+    print(f"{args.submissions} submissions per run against {database_url}")
+
+    def orm():
+        existing = {
+            row[0]
+            for row in db.query(LeetCodeSubmission.submission_id).filter(LeetCodeSubmission.user_id == orm_user)
+        }
+        new_items = []
+        for item in items:
+            if item["id"] in existing:
+                continue
+            db.add(LeetCodeSubmission(
+                user_id=orm_user, submission_id=item["id"], title=item["title"],
+                slug=item["slug"], status=item["status"], timestamp=item["timestamp"],
+            ))
+            existing.add(item["id"])
+            new_items.append(item)
+        record_activity(db, orm_user, submission_counts(new_items))
+        record_solve_days(db, orm_user, (day_from_timestamp(item["timestamp"]) for item in new_items))
+        db.commit()
+        return len(new_items)
+
+    def streamed(source):
+        return asyncio.run(ingest_submission_pages(db, streamed_user, pages(source)))
+
+    measure("orm", orm)
+    measure("streamed", lambda: streamed(items))
+    measure("resync", lambda: streamed(items))
+    fresh = history("fresh", args.new, 1, rng)
+    measure("top-up", lambda: streamed(fresh + items))
+
+    # Leave a MySQL database as we found it
+    if args.database_url:
+        for model in (LeetCodeSubmission, UserDailyActivity, UserSolveDay, UserStat):
+            db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
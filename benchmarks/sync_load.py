@@ -0,0 +1,84 @@
+"""Measure how concurrent /user/sync calls affect unrelated endpoints.
+
+Runs N concurrent POST /user/sync requests against a running server while
+probing a cheap endpoint (GET / by default) and reports its p50/p99 latency,
+compared with a baseline taken while the server is idle.
+
+    python benchmarks/sync_load.py --base-url http://localhost:8000 \
+        --session-token <session cookie> --syncs 20 --probes 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def probe(client: httpx.AsyncClient, path: str, count: int, interval: float) -> list[float]:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_syncs(client: httpx.AsyncClient, count: int) -> list[float]:
+    async def one():
+        started = time.perf_counter()
+        response = await client.post("/user/sync")
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            print(f"sync returned {response.status_code}: {response.text[:200]}")
+        return elapsed
+
+    return await asyncio.gather(*(one() for _ in range(count)))
+
+
+def report(label: str, samples: list[float]):
+    print(
+        f"{label:<28} n={len(samples):<5} p50={percentile(samples, 50):8.1f}ms "
+        f"p99={percentile(samples, 99):8.1f}ms mean={statistics.fmean(samples) if samples else 0:8.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--session-token", required=True)
+    parser.add_argument("--syncs", type=int, default=20, help="concurrent /user/sync calls")
+    parser.add_argument("--probes", type=int, default=200, help="probe requests per phase")
+    parser.add_argument("--probe-path", default="/")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between probes")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.syncs + 10)
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        cookies={"session_token": args.session_token},
+        timeout=120,
+        limits=limits,
+    ) as client:
+        idle = await probe(client, args.probe_path, args.probes, args.interval)
+        report(f"{args.probe_path} idle", idle)
+
+        loaded, syncs = await asyncio.gather(
+            probe(client, args.probe_path, args.probes, args.interval),
+            run_syncs(client, args.syncs),
+        )
+        report(f"{args.probe_path} during {args.syncs} syncs", loaded)
+        report("/user/sync", syncs)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -10,8 +11,16 @@ if os.getenv("ENVIRONMENT") != "production":
 # Replace with your actual MySQL credentials
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
 
+# Pool settings shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
     pool_recycle=280,
     pool_pre_ping=True
 )
@@ -19,10 +28,51 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def _async_database_url(url: str | None) -> str | None:
+    """Swap the sync driver for its asyncio counterpart (pymysql -> aiomysql)."""
+    if not url:
+        return url
+    for sync_driver, async_driver in (
+        ("mysql+pymysql://", "mysql+aiomysql://"),
+        ("mysql://", "mysql+aiomysql://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_driver):
+            return async_driver + url[len(sync_driver):]
+    return url
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv("ASYNC_SQLALCHEMY_DATABASE_URL") or _async_database_url(SQLALCHEMY_DATABASE_URL)
+
+try:
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=280,
+        pool_pre_ping=True,
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+except Exception as e:
+    # Missing async driver: sync routes keep working, async ones will raise.
+    print(f"Async database engine unavailable: {e}")
+    async_engine = None
+    AsyncSessionLocal = None
+
 # Dependency for DB session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency for async DB session
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database engine is not configured; install aiomysql")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,39 +1,84 @@
 from fastapi import Header, HTTPException, status, Cookie, Depends
 import redis.asyncio as redis
+import redis as sync_redis
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db
+from helpers.session_cache import (
+    cache_user_session,
+    get_cached_user_snapshot,
+    user_from_snapshot,
+)
 from models import User
 
 
 from datetime import datetime
 from models import User, UserSession
 
-def get_current_user(
+def _session_user_query(session_token: str):
+    return (
+        select(User, UserSession.expires_at)
+        .join(UserSession, UserSession.user_id == User.id)
+        .where(
+            UserSession.session_token == session_token,
+            UserSession.expires_at > datetime.now(),
+        )
+        .limit(1)
+    )
+
+
+async def get_current_user(
     session_token: str | None = Cookie(None),
     db: Session = Depends(get_db),
 ):
     if not session_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    # Verify session in database
-    session = db.query(UserSession).filter(
-        UserSession.session_token == session_token,
-        UserSession.expires_at > datetime.now()
-    ).first()
+    # Cache hit: zero DB round-trips, the row snapshot is attached to `db`
+    snapshot = await get_cached_user_snapshot(session_token, redis_client)
+    if snapshot:
+        return user_from_snapshot(snapshot, db)
 
-    if not session:
+    # Verify session in database (session + user in one query)
+    row = await run_in_threadpool(lambda: db.execute(_session_user_query(session_token)).first())
+    if not row:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
-    user = db.query(User).filter(User.id == session.user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-        
+    user, expires_at = row
+    await cache_user_session(session_token, expires_at, user, redis_client)
     return user
 
 
+async def get_current_user_async(
+    session_token: str | None = Cookie(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Async-session variant of get_current_user for read-only hot routes.
+
+    The returned user belongs to the AsyncSession, so routes that modify the
+    user and commit through the sync `get_db` session must keep using
+    get_current_user.
+    """
+    if not session_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    snapshot = await get_cached_user_snapshot(session_token, redis_client)
+    if snapshot:
+        return user_from_snapshot(snapshot, db)
+
+    row = (await db.execute(_session_user_query(session_token))).first()
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+
+    user, expires_at = row
+    await cache_user_session(session_token, expires_at, user, redis_client)
+    return user
+
 
 def verify_admin_access(x_api_key: str = Header(None)):
     if x_api_key != os.getenv("X_API_KEY"):
@@ -49,11 +94,73 @@ redis_client = None
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global redis_client
+    from helpers.leetcode_client import start_leetcode_client, close_leetcode_client
+
     redis_client = redis.from_url(os.getenv("REDIS_CONN_STRING"))
+    await start_leetcode_client()
+
+    from helpers.catalog import warm_catalog
+    await run_in_threadpool(warm_catalog)
+
+    # The API never runs scheduled or queued work; without a worker the sweep,
+    # penalties, nudges and syncs silently stop
+    from helpers.jobs import live_workers
+    try:
+        if not await run_in_threadpool(live_workers):
+            print("WARNING: no job worker has a heartbeat. Scheduled jobs (DSA sweep, penalties, "
+                  "nudges, curation, daily reset) and queued syncs only run in `python worker.py`.")
+    except Exception as e:
+        print(f"Worker heartbeat check failed: {e}")
     yield
+    await close_leetcode_client()
     if redis_client:
         await redis_client.close()
 
+    from database import async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 async def get_redis_client():
     return redis_client
+
+
+sync_redis_client = None
+
+
+def get_sync_redis_client():
+    """Blocking Redis client for scheduler threads and other non-async code."""
+    global sync_redis_client
+    if sync_redis_client is None:
+        sync_redis_client = sync_redis.from_url(os.getenv("REDIS_CONN_STRING"))
+    return sync_redis_client
+
+
+def run_off_loop(fn, *args):
+    """Run blocking Redis work from a session hook without blocking the event loop.
+
+    Commits on the event loop (AsyncSession, or a sync session used from an
+    async route) hand `fn` to the default executor; commits made in threads
+    (sync routes, workers) run it inline.
+    """
+    import asyncio
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        fn(*args)
+    else:
+        loop.run_in_executor(None, fn, *args)
+
+
+def delete_keys(keys, description: str):
+    """Delete Redis keys from a session hook (see run_off_loop)."""
+    keys = list(keys)
+
+    def delete():
+        try:
+            get_sync_redis_client().delete(*keys)
+        except Exception as e:
+            print(f"{description} failed: {e}")
+
+    run_off_loop(delete)
@@ -0,0 +1,137 @@
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from helpers.events import STAT_FIELDS, subscribe
+from models import UserAchievement, UserStat
+
+# Unlocked achievements per user are cached in Redis and dropped whenever an
+# unlock commits, so the TTL only bounds drift from manual DB edits.
+ACHIEVEMENTS_CACHE_TTL = int(os.getenv("ACHIEVEMENTS_CACHE_TTL", "86400"))
+
+# Achievement definitions. "fields" are the UserStat columns "check" reads; a
+# rule is only evaluated when one of them changes.
+ACHIEVEMENTS = [
+    {"id": "first-blood", "name": "First Blood", "description": "Solve your first problem", "icon": "🎯", "rarity": "common", "fields": {"problems_solved"}, "check": lambda s: s.problems_solved >= 1},
+    {"id": "week-warrior", "name": "Week Warrior", "description": "Maintain a 7-day streak", "icon": "🔥", "rarity": "rare", "fields": {"max_streak"}, "check": lambda s: s.max_streak >= 7},
+    {"id": "month-master", "name": "Month Master", "description": "Maintain a 30-day streak", "icon": "👑", "rarity": "epic", "fields": {"max_streak"}, "check": lambda s: s.max_streak >= 30},
+    {"id": "century-club", "name": "Century Club", "description": "Solve 100 problems", "icon": "💯", "rarity": "epic", "fields": {"problems_solved"}, "check": lambda s: s.problems_solved >= 100},
+    {"id": "diamond-hands", "name": "Diamond Hands", "description": "Never trigger a penalty", "icon": "💎", "rarity": "legendary", "fields": {"lifetime_loss", "problems_solved"}, "check": lambda s: s.lifetime_loss == 0 and s.problems_solved >= 10},
+    {"id": "survivor", "name": "Survivor", "description": "Recover from 0 lives", "icon": "🛡️", "rarity": "rare", "fields": {"lives", "problems_since_last_life"}, "check": lambda s: s.lives > 0 and s.problems_since_last_life > 0},
+    {"id": "grinder", "name": "Grinder", "description": "Solve 50 problems", "icon": "⚡", "rarity": "rare", "fields": {"problems_solved"}, "check": lambda s: s.problems_solved >= 50},
+    {"id": "dedicated", "name": "Dedicated", "description": "Solve 10 problems", "icon": "📚", "rarity": "common", "fields": {"problems_solved"}, "check": lambda s: s.problems_solved >= 10},
+]
+
+counters = {"cache_hits": 0, "cache_misses": 0, "rules_evaluated": 0, "unlocked": 0}
+
+
+def _cache_key(user_id: int) -> str:
+    return f"user:{user_id}:achievements"
+
+
+def unlock_achievements(session: Session, changes: dict[int, tuple[UserStat, set[str]]]) -> int:
+    """Evaluate the rules that read the changed fields and insert new unlocks in one statement.
+
+    Runs on the caller's transaction; returns the number of unlocks written.
+    """
+    candidates = set()
+    for user_id, (stats, fields) in changes.items():
+        for rule in ACHIEVEMENTS:
+            if rule["fields"] & fields:
+                counters["rules_evaluated"] += 1
+                if rule["check"](stats):
+                    candidates.add((user_id, rule["id"]))
+    if not candidates:
+        return 0
+
+    unlocked = set(session.execute(
+        select(UserAchievement.user_id, UserAchievement.achievement_id)
+        .where(UserAchievement.user_id.in_({user_id for user_id, _ in candidates}))
+    ).all())
+    rows = [
+        {"user_id": user_id, "achievement_id": achievement_id}
+        for user_id, achievement_id in sorted(candidates - unlocked)
+    ]
+    if not rows:
+        return 0
+
+    stmt = (
+        insert(UserAchievement.__table__)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    session.execute(stmt, rows)
+    counters["unlocked"] += len(rows)
+    session.info.setdefault("achievement_users", set()).update(row["user_id"] for row in rows)
+    return len(rows)
+
+
+@subscribe("solve", "streak", "lives", "penalty")
+def _on_stat_change(session, changes):
+    unlock_achievements(session, changes)
+
+
+def backfill_achievements(db: Session, batch_size: int = 1000) -> int:
+    """Evaluate every rule for every user, e.g. after adding a rule. Commits."""
+    total, last_id = 0, 0
+    while True:
+        batch = db.query(UserStat).filter(UserStat.id > last_id).order_by(UserStat.id).limit(batch_size).all()
+        if not batch:
+            break
+        total += unlock_achievements(db, {stats.user_id: (stats, set(STAT_FIELDS)) for stats in batch})
+        db.commit()
+        last_id = batch[-1].id
+    return total
+
+
+def unlocked_achievements(db: Session, user_id: int) -> dict[str, datetime | None]:
+    """achievement_id -> unlocked_at for the user, from the Redis cache when possible."""
+    from dependencies import get_sync_redis_client
+
+    redis_conn = None
+    try:
+        redis_conn = get_sync_redis_client()
+        cached = redis_conn.get(_cache_key(user_id))
+        if cached:
+            counters["cache_hits"] += 1
+            return {
+                achievement_id: datetime.fromisoformat(unlocked_at) if unlocked_at else None
+                for achievement_id, unlocked_at in json.loads(cached).items()
+            }
+    except Exception as e:
+        print(f"Achievements cache lookup failed: {e}")
+
+    counters["cache_misses"] += 1
+    unlocked = dict(
+        db.query(UserAchievement.achievement_id, UserAchievement.unlocked_at)
+        .filter(UserAchievement.user_id == user_id)
+        .all()
+    )
+    if redis_conn is not None:
+        try:
+            payload = {achievement_id: at.isoformat() if at else None for achievement_id, at in unlocked.items()}
+            redis_conn.set(_cache_key(user_id), json.dumps(payload), ex=ACHIEVEMENTS_CACHE_TTL)
+        except Exception as e:
+            print(f"Failed to cache achievements for user {user_id}: {e}")
+    return unlocked
+
+
+def stats() -> dict:
+    return dict(counters)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_unlocks(session):
+    from dependencies import delete_keys
+
+    user_ids = session.info.pop("achievement_users", None)
+    if user_ids:
+        delete_keys((_cache_key(user_id) for user_id in user_ids), f"Achievements cache invalidation for users {sorted(user_ids)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_unlocks(session):
+    session.info.pop("achievement_users", None)
@@ -0,0 +1,101 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from sqlalchemy import func
+
+from models import LeetCodeSubmission, QuestionCompletion, UserDailyActivity
+
+# Heatmap days are UTC, like the LeetCode submission calendar.
+_COUNTERS = ("submissions", "accepted", "completions")
+
+
+def utc_day(timestamp) -> date | None:
+    try:
+        return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).date()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def submission_counts(submissions) -> dict[date, dict[str, int]]:
+    """Per-day counters for dicts with `timestamp` and `status` keys."""
+    counts: dict[date, dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    for item in submissions:
+        day = utc_day(item.get("timestamp"))
+        if day is None:
+            continue
+        counts[day]["submissions"] += 1
+        if item.get("status") == "Accepted":
+            counts[day]["accepted"] += 1
+    return counts
+
+
+def record_activity(db, user_id: int, counts: dict[date, dict[str, int]]):
+    """Add per-day counters to the user's rollup rows (upsert). Does not commit."""
+    for day, values in counts.items():
+        values = {key: values.get(key, 0) for key in _COUNTERS}
+        if not any(values.values()):
+            continue
+        _upsert_day(db, user_id, day, values)
+
+
+def record_completions(db, user_id: int, count: int = 1, day: date | None = None):
+    """Count newly rewarded QuestionCompletions (stamped now) in the rollup."""
+    if count > 0:
+        record_activity(db, user_id, {day or datetime.now(timezone.utc).date(): {"completions": count}})
+
+
+def _upsert_day(db, user_id: int, day: date, values: dict[str, int]):
+    table = UserDailyActivity.__table__
+    dialect = db.get_bind().dialect.name
+    row = {"user_id": user_id, "date": day, **values}
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**row)
+        db.execute(stmt.on_duplicate_key_update(
+            {key: table.c[key] + stmt.inserted[key] for key in values}
+        ))
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**row)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "date"],
+            set_={key: table.c[key] + stmt.excluded[key] for key in values},
+        ))
+    else:
+        existing = db.query(UserDailyActivity).filter(
+            UserDailyActivity.user_id == user_id, UserDailyActivity.date == day
+        ).first()
+        if existing:
+            for key, value in values.items():
+                setattr(existing, key, getattr(existing, key) + value)
+        else:
+            db.add(UserDailyActivity(**row))
+
+
+def rebuild_user_activity(user_id: int, db) -> int:
+    """Recompute the user's rollup from raw submissions and completions. Commits."""
+    rows = (
+        db.query(LeetCodeSubmission.timestamp, LeetCodeSubmission.status)
+        .filter(LeetCodeSubmission.user_id == user_id, LeetCodeSubmission.timestamp.isnot(None))
+        .all()
+    )
+    counts = submission_counts({"timestamp": ts, "status": status} for ts, status in rows)
+
+    completion_days = (
+        db.query(func.date(QuestionCompletion.rewarded_at), func.count())
+        .filter(QuestionCompletion.user_id == user_id, QuestionCompletion.rewarded_at.isnot(None))
+        .group_by(func.date(QuestionCompletion.rewarded_at))
+        .all()
+    )
+    for day, count in completion_days:
+        if isinstance(day, str):  # SQLite returns DATE() as text
+            day = date.fromisoformat(day)
+        counts[day]["completions"] += count
+
+    db.query(UserDailyActivity).filter(UserDailyActivity.user_id == user_id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(UserDailyActivity, [
+        {"user_id": user_id, "date": day, **values} for day, values in counts.items()
+    ])
+    db.commit()
+    return len(counts)
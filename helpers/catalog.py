@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from array import array
+
+from helpers.topics import split_topics
+from models import Question, QuestionTopic, Topic
+
+# Bumped (INCR) whenever the questions table is reloaded; every API process
+# compares it with the version its in-memory index was built from.
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "30"))
+# Rebuild anyway after this long in case Redis is unreachable
+CATALOG_MAX_AGE = float(os.getenv("CATALOG_MAX_AGE", "3600"))
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def normalize_difficulty(difficulty: str | None) -> str:
+    value = (difficulty or "").strip().lower()
+    return "medium" if value == "med" else value  # Handle inconsistencies
+
+
+def _sheet_slugs() -> dict[str, list[str]]:
+    from helpers.problems import get_neetcode150_slugs
+    return {"neetcode150": get_neetcode150_slugs()}
+
+
+class CatalogIndex:
+    """Immutable snapshot of the questions table for in-process filtering.
+
+    Questions are stored column-wise, ordered by id, and addressed by position.
+    Each filter value maps to a bitset (a Python int, bit i = position i), so a
+    query is a handful of AND/OR operations over ~catalog-size integers.
+    """
+
+    def __init__(self, rows, sheets: dict[str, list[str]] | None = None, version=None,
+                 topic_links: list[tuple[int, str]] | None = None):
+        rows = sorted(rows, key=lambda row: row.id)
+        self.version = version
+        self.built_at = time.monotonic()
+
+        self.ids = array("l", (row.id for row in rows))
+        self.titles = [row.title for row in rows]
+        self.slugs = [row.slug for row in rows]
+        self.topics = [row.topics for row in rows]
+        self.difficulties = [row.difficulty for row in rows]
+        self.acc_rates = [row.acc_rate for row in rows]
+        self.paid = bytearray(1 if row.paid_only else 0 for row in rows)
+        self._titles_lower = [(row.title or "").lower() for row in rows]
+        self.position_by_slug = {slug: pos for pos, slug in enumerate(self.slugs)}
+
+        self.all = (1 << len(rows)) - 1
+        self.free = 0
+        self.by_difficulty: dict[str, int] = {}
+        self.by_topic: dict[str, int] = {}
+        for pos, row in enumerate(rows):
+            bit = 1 << pos
+            if not row.paid_only:
+                self.free |= bit
+            difficulty = normalize_difficulty(row.difficulty)
+            self.by_difficulty[difficulty] = self.by_difficulty.get(difficulty, 0) | bit
+            if not topic_links:
+                # Tables not backfilled yet: fall back to the comma-joined column
+                for topic in split_topics(row.topics):
+                    self.by_topic[topic] = self.by_topic.get(topic, 0) | bit
+
+        position_by_id = {question_id: pos for pos, question_id in enumerate(self.ids)}
+        for question_id, topic in topic_links or ():
+            pos = position_by_id.get(question_id)
+            if pos is not None:
+                self.by_topic[topic] = self.by_topic.get(topic, 0) | (1 << pos)
+
+        self.by_sheet: dict[str, int] = {}
+        for sheet, slugs in (sheets or {}).items():
+            self.by_sheet[sheet] = self.slug_bits(slugs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def slug_bits(self, slugs) -> int:
+        bits = 0
+        for slug in slugs:
+            pos = self.position_by_slug.get(slug)
+            if pos is not None:
+                bits |= 1 << pos
+        return bits
+
+    def any_topic(self, topics) -> int:
+        bits = 0
+        for topic in topics:
+            bits |= self.by_topic.get(topic, 0)
+        return bits
+
+    def select(self, difficulty: str | None = None, topic: str | None = None,
+               free_only: bool = False, sheet: str | None = None) -> int:
+        bits = self.free if free_only else self.all
+        if difficulty:
+            bits &= self.by_difficulty.get(normalize_difficulty(difficulty), 0)
+        if topic:
+            bits &= self.by_topic.get(topic, 0)
+        if sheet:
+            bits &= self.by_sheet.get(sheet, 0)
+        return bits
+
+    def search(self, bits: int, text: str) -> int:
+        """Keep positions whose title contains `text` (case-insensitive)."""
+        needle = text.lower()
+        matched = 0
+        for pos in self.positions(bits):
+            if needle in self._titles_lower[pos]:
+                matched |= 1 << pos
+        return matched
+
+    @staticmethod
+    def count(bits: int) -> int:
+        return bin(bits).count("1")
+
+    @staticmethod
+    def positions(bits: int) -> list[int]:
+        """Set bit positions in ascending order (i.e. ordered by question id)."""
+        return [pos for pos, flag in enumerate(reversed(bin(bits)[2:])) if flag == "1"]
+
+    def row(self, pos: int) -> dict:
+        return {
+            "id": self.ids[pos],
+            "title": self.titles[pos],
+            "slug": self.slugs[pos],
+            "difficulty": self.difficulties[pos],
+            "topics": self.topics[pos],
+            "acc_rate": self.acc_rates[pos],
+            "paid_only": self.paid[pos],
+        }
+
+
+_CATALOG_COLUMNS = (
+    Question.id, Question.title, Question.slug, Question.topics,
+    Question.difficulty, Question.paid_only, Question.acc_rate,
+)
+
+_catalog: CatalogIndex | None = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _is_fresh(version) -> bool:
+    return (
+        _catalog is not None
+        and _catalog.version == version
+        and time.monotonic() - _catalog.built_at < CATALOG_MAX_AGE
+    )
+
+
+def _read_version_sync():
+    from dependencies import get_sync_redis_client
+    try:
+        return get_sync_redis_client().get(CATALOG_VERSION_KEY)
+    except Exception as e:
+        print(f"Catalog version check failed: {e}")
+        return _catalog.version if _catalog else None
+
+
+async def _read_version(redis_conn):
+    try:
+        return await redis_conn.get(CATALOG_VERSION_KEY)
+    except Exception as e:
+        print(f"Catalog version check failed: {e}")
+        return _catalog.version if _catalog else None
+
+
+def _topic_links(db) -> list[tuple[int, str]]:
+    try:
+        return (
+            db.query(QuestionTopic.question_id, Topic.name)
+            .join(Topic, Topic.id == QuestionTopic.topic_id)
+            .all()
+        )
+    except Exception as e:
+        print(f"Could not read question_topics, using questions.topics: {e}")
+        return []
+
+
+def _build(db, version) -> CatalogIndex:
+    global _catalog
+    with _lock:
+        if not _is_fresh(version):
+            rows = db.query(*_CATALOG_COLUMNS).all()
+            _catalog = CatalogIndex(rows, _sheet_slugs(), version, _topic_links(db))
+            print(f"Catalog index built: {len(_catalog)} questions (version {version})")
+        return _catalog
+
+
+def _due_for_check() -> bool:
+    return _catalog is None or time.monotonic() - _checked_at >= CATALOG_CHECK_INTERVAL
+
+
+def get_catalog(db) -> CatalogIndex:
+    """The process-wide catalog index, rebuilt from `db` when the version moved."""
+    global _checked_at
+    if not _due_for_check():
+        return _catalog
+    version = _read_version_sync()
+    _checked_at = time.monotonic()
+    return _catalog if _is_fresh(version) else _build(db, version)
+
+
+async def get_catalog_async(db, redis_conn) -> CatalogIndex:
+    """Async-session variant of `get_catalog` (the build runs via run_sync)."""
+    global _checked_at
+    if not _due_for_check():
+        return _catalog
+    version = await _read_version(redis_conn)
+    _checked_at = time.monotonic()
+    if _is_fresh(version):
+        return _catalog
+    return await db.run_sync(_build, version)
+
+
+def warm_catalog():
+    """Load the index at startup so the first request doesn't pay for it."""
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        get_catalog(db)
+    except Exception as e:
+        print(f"Catalog warm-up failed: {e}")
+    finally:
+        db.close()
+
+
+def bump_catalog_version():
+    """Tell every process to rebuild its index after the questions table changed."""
+    global _catalog
+    from dependencies import get_sync_redis_client
+    _catalog = None
+    try:
+        get_sync_redis_client().incr(CATALOG_VERSION_KEY)
+    except Exception as e:
+        print(f"Failed to bump catalog version: {e}")
+
+
+def stats() -> dict:
+    if _catalog is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "questions": len(_catalog),
+        "topics": len(_catalog.by_topic),
+        "version": _catalog.version,
+        "age_seconds": round(time.monotonic() - _catalog.built_at, 1),
+    }
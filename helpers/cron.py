@@ -0,0 +1,225 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+
+import pytz
+
+# Cron expressions are evaluated in IST, like the rest of the daily cycle.
+CRON_TZ = pytz.timezone("Asia/Kolkata")
+# Seconds between scheduler ticks, and how long a leader's lease lasts
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK", "10"))
+SCHEDULER_LEASE = int(os.getenv("SCHEDULER_LEASE", "30"))
+
+LEADER_KEY = "scheduler:leader"
+LAST_RUN_KEY = "scheduler:last_run"  # job name -> epoch of the last slot that was started
+LAST_JOB_KEY = "scheduler:last_job"  # job name -> queue job id of that run
+
+# Renew or release the lease only while `token` still holds it, in one step, so
+# a leader whose lease just lapsed can't extend or drop its successor's.
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def _parse_field(field: str, low: int, high: int) -> frozenset[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronJob:
+    """A job that runs whenever `schedule` (minute hour day month weekday) matches.
+
+    A run missed while no scheduler was up is caught up once, as long as it is
+    at most `catchup` seconds late; later than that it is skipped. The same
+    window applies when a worker picks the queued run up: a run that only
+    starts after it is skipped as late.
+    """
+    name: str
+    schedule: str
+    run: Callable
+    catchup: int = 3600
+
+    def __post_init__(self):
+        fields = self.schedule.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron schedule {self.schedule!r} needs 5 fields")
+        parsed = tuple(_parse_field(field, *bounds) for field, bounds in zip(fields, _FIELD_RANGES))
+        object.__setattr__(self, "_fields", parsed)
+
+    def matches(self, moment: datetime) -> bool:
+        minutes, hours, days, months, weekdays = self._fields
+        return (
+            moment.minute in minutes
+            and moment.hour in hours
+            and moment.day in days
+            and moment.month in months
+            and (moment.weekday() + 1) % 7 in weekdays  # cron counts from Sunday = 0
+        )
+
+    def last_slot(self, now: datetime) -> datetime | None:
+        """Most recent scheduled minute at or before `now`, within the catch-up window."""
+        moment = now.astimezone(CRON_TZ).replace(second=0, microsecond=0)
+        for _ in range(self.catchup // 60 + 1):
+            if self.matches(moment):
+                return moment
+            moment -= timedelta(minutes=1)
+        return None
+
+
+_jobs: dict[str, CronJob] = {}
+
+
+def cron_job(name: str, schedule: str, catchup: int = 3600):
+    """Register `fn(db)` to run on `schedule`; it runs on the job queue (see worker.py)."""
+    from helpers.jobs import job_handler
+
+    def register(fn):
+        _jobs[name] = CronJob(name, schedule, fn, catchup)
+        job_handler(f"cron:{name}")(_run_with_session(fn, catchup))
+        return fn
+    return register
+
+
+def _run_with_session(fn, catchup: int):
+    def handler(job, report):
+        from database import SessionLocal
+
+        slot = job["params"].get("slot")
+        if slot:
+            late_by = time.time() - datetime.fromisoformat(slot).timestamp() - catchup
+            if late_by > 0:
+                print(f"Skipping {job['type']} for {slot}: started {late_by:.0f}s after its window closed")
+                return {"skipped": "late", "slot": slot}
+
+        db = SessionLocal()
+        try:
+            result = fn(db)
+            return result if isinstance(result, dict) else {}
+        finally:
+            db.close()
+    return handler
+
+
+def _redis():
+    from dependencies import get_sync_redis_client
+    return get_sync_redis_client()
+
+
+def _slot_key(job: CronJob, slot: datetime) -> str:
+    return f"scheduler:slot:{job.name}:{int(slot.timestamp())}"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def acquire_leadership(token: str) -> bool:
+    """Take or renew the scheduler lease; only the leader queues cron runs."""
+    r = _redis()
+    if r.set(LEADER_KEY, token, nx=True, ex=SCHEDULER_LEASE):
+        return True
+    return bool(r.eval(_RENEW_LEASE, 1, LEADER_KEY, token, SCHEDULER_LEASE))
+
+
+def release_leadership(token: str):
+    _redis().eval(_RELEASE_LEASE, 1, LEADER_KEY, token)
+
+
+def due_jobs(now: datetime | None = None) -> list[tuple[CronJob, datetime]]:
+    """(job, slot) pairs whose latest slot hasn't been started yet."""
+    now = now or datetime.now(CRON_TZ)
+    last_runs = {_decode(key): float(value) for key, value in _redis().hgetall(LAST_RUN_KEY).items()}
+    due = []
+    for job in _jobs.values():
+        slot = job.last_slot(now)
+        if slot is not None and last_runs.get(job.name, 0) < slot.timestamp():
+            due.append((job, slot))
+    return due
+
+
+def tick(now: datetime | None = None) -> list[str]:
+    """Queue every due job once. Call only while holding the leader lease."""
+    from helpers.jobs import enqueue_job
+
+    r = _redis()
+    started = []
+    for job, slot in due_jobs(now):
+        # Claim the slot first: a run is never queued twice, even by two schedulers
+        # that both believe they lead, or a leader that dies mid-tick
+        if not r.set(_slot_key(job, slot), "1", nx=True, ex=job.catchup + 60):
+            continue
+        r.hset(LAST_RUN_KEY, job.name, slot.timestamp())
+        job_id, _ = enqueue_job(f"cron:{job.name}", params={"slot": slot.isoformat()}, priority=True)
+        r.hset(LAST_JOB_KEY, job.name, job_id)
+        print(f"Scheduler queued {job.name} for {slot.strftime('%Y-%m-%d %H:%M %Z')} (job {job_id})")
+        started.append(job.name)
+    return started
+
+
+def run_scheduler(stop=None):
+    """Tick forever on every worker; the lease makes exactly one of them the leader."""
+    token = uuid.uuid4().hex
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                if acquire_leadership(token):
+                    tick()
+            except Exception as e:
+                print(f"Scheduler tick failed: {e}")
+            if stop is not None:
+                stop.wait(SCHEDULER_TICK)
+            else:
+                time.sleep(SCHEDULER_TICK)
+    finally:
+        try:
+            release_leadership(token)
+        except Exception:
+            pass
+
+
+def stats() -> dict:
+    try:
+        r = _redis()
+        last_runs = {_decode(key): float(value) for key, value in r.hgetall(LAST_RUN_KEY).items()}
+        leader = r.get(LEADER_KEY)
+    except Exception as e:
+        return {"error": str(e)}
+    return {
+        "leader_elected": leader is not None,
+        "jobs": {
+            name: {
+                "schedule": job.schedule,
+                "last_run": datetime.fromtimestamp(last_runs[name], CRON_TZ).isoformat() if name in last_runs else None,
+            }
+            for name, job in _jobs.items()
+        },
+    }
@@ -0,0 +1,229 @@
+import datetime
+import hashlib
+import json
+import time
+from collections import defaultdict
+
+import pytz
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+from models import DailyCuration, User, UserStat
+
+# Curated problems roll over at 3:30 PM IST. A curation "date" is the IST date
+# of the rollover that started it, so 10 AM on the 18th is still the 17th.
+CURATION_TZ = pytz.timezone("Asia/Kolkata")
+ROLLOVER_HOUR, ROLLOVER_MINUTE = 15, 30
+
+# user -> preference hash pointers; refreshed by the 15:15 IST curation batch
+PREFERENCES_TTL = 2 * 86400
+
+_PREFERENCE_COLUMNS = ("problem_set_type", "problem_set_topics", "problem_set_sheet")
+
+
+def last_rollover(now: datetime.datetime | None = None) -> datetime.datetime:
+    now = now or datetime.datetime.now(CURATION_TZ)
+    rollover = now.astimezone(CURATION_TZ).replace(hour=ROLLOVER_HOUR, minute=ROLLOVER_MINUTE, second=0, microsecond=0)
+    if now < rollover:
+        # If it's before 3:30 PM, the "day" started at 3:30 PM yesterday
+        rollover -= datetime.timedelta(days=1)
+    return rollover
+
+
+def curation_date(now: datetime.datetime | None = None) -> str:
+    """ISO date of the curation window that is live right now."""
+    return last_rollover(now).date().isoformat()
+
+
+def next_curation_date(now: datetime.datetime | None = None) -> str:
+    return (last_rollover(now) + datetime.timedelta(days=1)).date().isoformat()
+
+
+def curation_expiry(date_str: str) -> int:
+    """Seconds until the window for `date_str` closes (at least 60)."""
+    start = CURATION_TZ.localize(datetime.datetime.combine(
+        datetime.date.fromisoformat(date_str), datetime.time(ROLLOVER_HOUR, ROLLOVER_MINUTE)
+    ))
+    end = start + datetime.timedelta(days=1)
+    return max(60, int((end - datetime.datetime.now(CURATION_TZ)).total_seconds()))
+
+
+def preference_hash(preferences: tuple) -> str:
+    return hashlib.sha1(json.dumps(list(preferences)).encode()).hexdigest()[:16]
+
+
+def results_key(date_str: str, pref_hash: str) -> str:
+    return f"curation:{date_str}:{pref_hash}"
+
+
+def user_preferences_key(user_id: int) -> str:
+    return f"curation:prefs:{user_id}"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _cache_results(results: dict[str, dict], pointers: dict[int, str], date_str: str):
+    """Write picks per preference hash, plus the user -> hash pointers."""
+    from dependencies import get_sync_redis_client
+    try:
+        pipe = get_sync_redis_client().pipeline(transaction=False)
+        ttl = curation_expiry(date_str)
+        for pref_hash, problems in results.items():
+            pipe.set(results_key(date_str, pref_hash), json.dumps(problems), ex=ttl)
+        for user_id, pref_hash in pointers.items():
+            pipe.set(user_preferences_key(user_id), pref_hash, ex=PREFERENCES_TTL)
+        pipe.execute()
+    except Exception as e:
+        print(f"Failed to cache curation for {date_str}: {e}")
+
+
+async def load_curation_async(redis_conn, user_id: int, date_str: str) -> dict | None:
+    """Cached picks for a user, shared by everyone with the same preferences."""
+    try:
+        pref_hash = await redis_conn.get(user_preferences_key(user_id))
+        if not pref_hash:
+            return None
+        cached = await redis_conn.get(results_key(date_str, _decode(pref_hash)))
+        return json.loads(cached) if cached else None
+    except Exception as e:
+        print(f"Curation cache lookup failed: {e}")
+        return None
+
+
+def load_curation(db, user_id: int, date_str: str, pref_hash: str) -> dict | None:
+    """Picks for these preferences: Redis first, then the user's daily_curation row."""
+    from dependencies import get_sync_redis_client
+    try:
+        cached = get_sync_redis_client().get(results_key(date_str, pref_hash))
+        if cached:
+            _cache_results({}, {user_id: pref_hash}, date_str)
+            return json.loads(cached)
+    except Exception as e:
+        print(f"Curation cache lookup failed: {e}")
+
+    row = db.query(DailyCuration.problems, DailyCuration.preferences_hash).filter(
+        DailyCuration.user_id == user_id,
+        DailyCuration.date == datetime.date.fromisoformat(date_str),
+    ).first()
+    # A row curated under different preferences is stale
+    if row is None or row.preferences_hash != pref_hash:
+        return None
+    problems = json.loads(row.problems)
+    _cache_results({pref_hash: problems}, {user_id: pref_hash}, date_str)
+    return problems
+
+
+def store_curation(db, results: dict[str, dict], pointers: dict[int, str], date_str: str):
+    """Write picks to daily_curation (one row per user) in the caller's transaction.
+
+    Doesn't commit; the picks reach Redis once the caller does.
+    """
+    if not pointers:
+        return
+    day = datetime.date.fromisoformat(date_str)
+    rows = [
+        {"user_id": user_id, "date": day, "preferences_hash": pref_hash, "problems": json.dumps(results[pref_hash])}
+        for user_id, pref_hash in pointers.items()
+    ]
+
+    db.query(DailyCuration).filter(
+        DailyCuration.date == day, DailyCuration.user_id.in_(list(pointers))
+    ).delete(synchronize_session=False)
+    # IGNORE: two requests racing to curate the same user insert identical rows
+    stmt = insert(DailyCuration).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+    for start in range(0, len(rows), 1000):
+        db.execute(stmt, rows[start:start + 1000])
+    db.info.setdefault("curation_results", []).append((results, pointers, date_str))
+
+
+def run_daily_curation(db, date_str: str | None = None) -> dict:
+    """Curate every user's problems for `date_str` (default: the next window).
+
+    Users are grouped by preference tuple, so each distinct combination of
+    paid flag / set type / topics / sheet is curated once against the catalog.
+    """
+    from helpers.catalog import get_catalog
+    from helpers.problems import curate_problems, preference_tuple
+
+    date_str = date_str or next_curation_date()
+    started = time.perf_counter()
+
+    catalog = get_catalog(db)
+    users = (
+        db.query(
+            User.id, User.allow_paid,
+            UserStat.problem_set_type, UserStat.problem_set_topics, UserStat.problem_set_sheet,
+        )
+        .outerjoin(UserStat, UserStat.user_id == User.id)
+        .all()
+    )
+
+    groups: dict[tuple, list[int]] = defaultdict(list)
+    for user_id, allow_paid, set_type, topics, sheet in users:
+        groups[preference_tuple(allow_paid, set_type, topics, sheet)].append(user_id)
+
+    results, pointers = {}, {}
+    for preferences, user_ids in groups.items():
+        pref_hash = preference_hash(preferences)
+        results[pref_hash] = curate_problems(catalog, preferences, date_str)
+        pointers.update(dict.fromkeys(user_ids, pref_hash))
+
+    store_curation(db, results, pointers, date_str)
+    db.commit()
+    summary = {
+        "date": date_str,
+        "users": len(pointers),
+        "groups": len(groups),
+        "wall_time": round(time.perf_counter() - started, 2),
+    }
+    print(f"Daily curation: {summary}")
+    return summary
+
+
+def invalidate_user_preferences(user_ids):
+    """Forget which preference hash these users map to (their preferences changed)."""
+    from dependencies import get_sync_redis_client
+    try:
+        get_sync_redis_client().delete(*(user_preferences_key(user_id) for user_id in user_ids))
+    except Exception as e:
+        print(f"Curation pointer invalidation failed for users {list(user_ids)}: {e}")
+
+
+# Any committed change to allow_paid or the problem set preferences (e.g.
+# POST /problems/preference) sends the user back through curation.
+def _mark_preferences_changed(session, user_id):
+    if session is not None:
+        session.info.setdefault("curation_dirty_users", set()).add(user_id)
+
+
+@event.listens_for(User, "after_update")
+def _user_preferences_changed(mapper, connection, target):
+    if inspect(target).attrs.allow_paid.history.has_changes():
+        _mark_preferences_changed(inspect(target).session, target.id)
+
+
+@event.listens_for(UserStat, "after_update")
+def _stat_preferences_changed(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in _PREFERENCE_COLUMNS):
+        _mark_preferences_changed(state.session, target.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_preference_changes(session):
+    user_ids = session.info.pop("curation_dirty_users", None)
+    if user_ids:
+        invalidate_user_preferences(user_ids)
+    stored = session.info.pop("curation_results", None)
+    if stored:
+        from dependencies import run_off_loop
+        for results, pointers, date_str in stored:
+            run_off_loop(_cache_results, results, pointers, date_str)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_preference_changes(session):
+    session.info.pop("curation_dirty_users", None)
+    session.info.pop("curation_results", None)
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from helpers.leetcode import DAILY_PROBLEM_FALLBACK, fetch_daily_problem, fetch_daily_problem_async
+
+# Fresh copy, expires at the next 00:00 UTC rollover
+DAILY_PROBLEM_KEY = "leetcode:daily_problem"
+# Last good copy without expiry, served when LeetCode is unreachable
+DAILY_PROBLEM_STALE_KEY = "leetcode:daily_problem:last"
+# Set after a failed fetch; until it expires every process serves the stale copy
+DAILY_PROBLEM_BACKOFF_KEY = "leetcode:daily_problem:backoff"
+DAILY_PROBLEM_RETRY_AFTER = int(os.getenv("DAILY_PROBLEM_RETRY_AFTER", "60"))
+
+# In-process copy: {"date": "YYYY-MM-DD" (UTC), "problem": {...}}
+_cached = None
+_sync_lock = threading.Lock()
+_async_lock = None
+# time.monotonic() before which this process won't ask LeetCode again
+_retry_at = 0.0
+
+
+def _utc_today() -> str:
+    return datetime.now(pytz.utc).date().isoformat()
+
+
+def seconds_until_utc_rollover() -> int:
+    now = datetime.now(pytz.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(int((tomorrow - now).total_seconds()), 1)
+
+
+def _fresh(entry) -> bool:
+    return bool(entry) and entry.get("date") == _utc_today()
+
+
+def _decode(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _remember(problem: dict) -> dict:
+    global _cached
+    entry = {"date": _utc_today(), "problem": problem}
+    _cached = entry
+    return entry
+
+
+def _backing_off() -> bool:
+    return time.monotonic() < _retry_at
+
+
+def _record_failure():
+    global _retry_at
+    _retry_at = time.monotonic() + DAILY_PROBLEM_RETRY_AFTER
+
+
+def _stale_problem(redis_entry=None) -> dict:
+    for entry in (_cached, redis_entry):
+        if entry and entry.get("problem", {}).get("slug"):
+            print(f"Serving stale daily problem from {entry.get('date')}")
+            return dict(entry["problem"])
+    return dict(DAILY_PROBLEM_FALLBACK)
+
+
+def get_daily_problem() -> dict:
+    """Today's LeetCode daily problem, cached in memory and Redis until 00:00 UTC.
+
+    Concurrent callers in this process share a single upstream request; if
+    LeetCode is down the last known problem is returned instead.
+    """
+    if _fresh(_cached):
+        return dict(_cached["problem"])
+    if _backing_off() and _cached:
+        return _stale_problem()
+
+    from dependencies import get_sync_redis_client
+
+    with _sync_lock:
+        if _fresh(_cached):
+            return dict(_cached["problem"])
+
+        stale_entry = None
+        try:
+            redis_conn = get_sync_redis_client()
+            entry = _decode(redis_conn.get(DAILY_PROBLEM_KEY))
+            if _fresh(entry):
+                _remember(entry["problem"])
+                return dict(entry["problem"])
+            stale_entry = _decode(redis_conn.get(DAILY_PROBLEM_STALE_KEY))
+            if redis_conn.exists(DAILY_PROBLEM_BACKOFF_KEY):
+                return _stale_problem(stale_entry)
+        except Exception as e:
+            redis_conn = None
+            print(f"Daily problem cache unavailable: {e}")
+
+        # Callers that queued on the lock behind a failed fetch don't retry it
+        if _backing_off():
+            return _stale_problem(stale_entry)
+
+        problem = fetch_daily_problem()
+        if not problem.get("slug"):
+            _record_failure()
+            if redis_conn is not None:
+                try:
+                    redis_conn.set(DAILY_PROBLEM_BACKOFF_KEY, 1, ex=DAILY_PROBLEM_RETRY_AFTER)
+                except Exception:
+                    pass
+            return _stale_problem(stale_entry)
+
+        entry = _remember(problem)
+        if redis_conn is not None:
+            try:
+                redis_conn.set(DAILY_PROBLEM_KEY, json.dumps(entry), ex=seconds_until_utc_rollover())
+                redis_conn.set(DAILY_PROBLEM_STALE_KEY, json.dumps(entry))
+            except Exception as e:
+                print(f"Failed to cache daily problem: {e}")
+        return dict(problem)
+
+
+async def get_daily_problem_async(redis_conn=None) -> dict:
+    """Async variant of get_daily_problem for FastAPI routes."""
+    global _async_lock
+
+    if _fresh(_cached):
+        return dict(_cached["problem"])
+    if _backing_off() and _cached:
+        return _stale_problem()
+
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+
+    async with _async_lock:
+        if _fresh(_cached):
+            return dict(_cached["problem"])
+
+        stale_entry = None
+        if redis_conn is not None:
+            try:
+                entry = _decode(await redis_conn.get(DAILY_PROBLEM_KEY))
+                if _fresh(entry):
+                    _remember(entry["problem"])
+                    return dict(entry["problem"])
+                stale_entry = _decode(await redis_conn.get(DAILY_PROBLEM_STALE_KEY))
+                if await redis_conn.exists(DAILY_PROBLEM_BACKOFF_KEY):
+                    return _stale_problem(stale_entry)
+            except Exception as e:
+                print(f"Daily problem cache unavailable: {e}")
+
+        if _backing_off():
+            return _stale_problem(stale_entry)
+
+        problem = await fetch_daily_problem_async()
+        if not problem.get("slug"):
+            _record_failure()
+            if redis_conn is not None:
+                try:
+                    await redis_conn.set(DAILY_PROBLEM_BACKOFF_KEY, 1, ex=DAILY_PROBLEM_RETRY_AFTER)
+                except Exception:
+                    pass
+            return _stale_problem(stale_entry)
+
+        entry = _remember(problem)
+        if redis_conn is not None:
+            try:
+                await redis_conn.set(DAILY_PROBLEM_KEY, json.dumps(entry), ex=seconds_until_utc_rollover())
+                await redis_conn.set(DAILY_PROBLEM_STALE_KEY, json.dumps(entry))
+            except Exception as e:
+                print(f"Failed to cache daily problem: {e}")
+        return dict(problem)
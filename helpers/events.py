@@ -0,0 +1,82 @@
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import UserStat
+
+# Stat-change events and the UserStat columns behind each. Any flush that
+# changes one of these columns publishes the event, so writers (sweep, syncs,
+# routes) never call subscribers themselves.
+STAT_EVENTS = {
+    "solve": frozenset({"problems_solved", "problems_since_last_life"}),
+    "streak": frozenset({"current_streak", "max_streak"}),
+    "lives": frozenset({"lives"}),
+    "penalty": frozenset({"lifetime_loss"}),
+}
+STAT_FIELDS = frozenset().union(*STAT_EVENTS.values())
+
+_subscribers: dict[str, list[Callable]] = defaultdict(list)
+
+
+def subscribe(*events: str):
+    """Register `fn(session, changes)` for `events`.
+
+    `changes` maps user_id -> (UserStat, changed fields). Subscribers run
+    inside the flush, on the same transaction as the change, so anything
+    they write commits or rolls back with it.
+    """
+    unknown = set(events) - set(STAT_EVENTS)
+    if unknown:
+        raise ValueError(f"Unknown stat events: {sorted(unknown)}")
+
+    def register(fn):
+        for name in events:
+            _subscribers[name].append(fn)
+        return fn
+    return register
+
+
+def _dispatch(session: Session, changes: dict[int, tuple[UserStat, set[str]]]):
+    # Each subscriber is called once, with every user whose change it listens to
+    calls: dict[Callable, dict[int, tuple[UserStat, set[str]]]] = {}
+    for user_id, (stats, fields) in changes.items():
+        for name, event_fields in STAT_EVENTS.items():
+            if not fields & event_fields:
+                continue
+            for fn in _subscribers.get(name, ()):
+                _, seen = calls.setdefault(fn, {}).setdefault(user_id, (stats, set()))
+                seen.update(fields & event_fields)
+    for fn, fn_changes in calls.items():
+        fn(session, fn_changes)
+
+
+def _record(target: UserStat, fields: set[str]):
+    session = inspect(target).session
+    if session is not None and fields:
+        _, seen = session.info.setdefault("stat_changes", {}).setdefault(target.user_id, (target, set()))
+        seen.update(fields)
+
+
+@event.listens_for(UserStat, "after_insert")
+def _stats_created(mapper, connection, target):
+    _record(target, set(STAT_FIELDS))
+
+
+@event.listens_for(UserStat, "after_update")
+def _stats_changed(mapper, connection, target):
+    attrs = inspect(target).attrs
+    _record(target, {field for field in STAT_FIELDS if attrs[field].history.has_changes()})
+
+
+@event.listens_for(Session, "after_flush")
+def _publish_stat_changes(session, flush_context):
+    changes = session.info.pop("stat_changes", None)
+    if changes:
+        _dispatch(session, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stat_changes(session):
+    session.info.pop("stat_changes", None)
@@ -0,0 +1,342 @@
+import asyncio
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+
+# Jobs are Redis hashes (job:{id}) pushed onto a queue list. Each worker thread
+# BLMOVEs the job it takes onto its own processing list and keeps a heartbeat
+# key alive; if the heartbeat lapses (the worker died), the reaper puts its
+# jobs back on their queue. Any number of worker processes can share the queues.
+JOB_QUEUE_KEY = "jobs:queue"
+# Scheduled and deadline-bound work (cron runs, sweep shards, penalty orders).
+# Workers always drain it first, and worker.py keeps threads that serve only
+# this queue, so a long history backfill can't hold up the 3 PM sweep.
+PRIORITY_QUEUE_KEY = "jobs:queue:priority"
+QUEUES = (PRIORITY_QUEUE_KEY, JOB_QUEUE_KEY)
+PROCESSING_KEY_PREFIX = "jobs:processing:"
+WORKER_KEY_PREFIX = "jobs:worker:"
+REAPER_KEY = "jobs:reaper"
+# How long a finished job's status stays readable
+JOB_TTL = int(os.getenv("JOB_TTL", "86400"))
+# Per-user locks and dedupe keys expire this long after the last heartbeat of
+# the job holding them, so a dead worker can't block a user forever
+JOB_LOCK_TTL = int(os.getenv("JOB_LOCK_TTL", "900"))
+# A job whose user is locked by another job goes back on the queue after this pause
+JOB_REQUEUE_DELAY = float(os.getenv("JOB_REQUEUE_DELAY", "1"))
+# A worker that hasn't renewed its heartbeat for this long is considered dead
+JOB_HEARTBEAT_TTL = int(os.getenv("JOB_HEARTBEAT_TTL", "60"))
+# Seconds between reaper passes (one per cluster), and how often a job is
+# handed out again before it is marked failed
+JOB_REAP_INTERVAL = int(os.getenv("JOB_REAP_INTERVAL", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+_JSON_FIELDS = ("params", "progress", "result")
+
+_handlers = {}
+
+
+def job_handler(job_type: str):
+    """Register `fn(job, report)` as the handler for `job_type` (sync or async).
+
+    `report(**progress)` publishes progress to the job's status; the return
+    value is stored as the job result.
+    """
+    def register(fn):
+        _handlers[job_type] = fn
+        return fn
+    return register
+
+
+def job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _dedupe_key(job_type: str, user_id: int) -> str:
+    return f"jobs:dedupe:{job_type}:{user_id}"
+
+
+def _user_lock_key(user_id: int) -> str:
+    return f"jobs:lock:user:{user_id}"
+
+
+def _processing_key(worker_id: str) -> str:
+    return f"{PROCESSING_KEY_PREFIX}{worker_id}"
+
+
+def _worker_key(worker_id: str) -> str:
+    return f"{WORKER_KEY_PREFIX}{worker_id}"
+
+
+def _redis():
+    from dependencies import get_sync_redis_client
+    return get_sync_redis_client()
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def enqueue_job(
+    job_type: str, user_id: int | None = None, params: dict | None = None, priority: bool = False
+) -> tuple[str, bool]:
+    """Queue a job and return (job_id, created).
+
+    A user has at most one queued or running job of each type: asking again
+    returns the existing job id with created=False. `priority` jobs go on
+    PRIORITY_QUEUE_KEY.
+    """
+    r = _redis()
+    job_id = uuid.uuid4().hex
+    if user_id is not None:
+        dedupe_key = _dedupe_key(job_type, user_id)
+        if not r.set(dedupe_key, job_id, nx=True, ex=JOB_LOCK_TTL):
+            existing = r.get(dedupe_key)
+            if existing:
+                return _decode(existing), False
+            r.set(dedupe_key, job_id, ex=JOB_LOCK_TTL)
+
+    queue = PRIORITY_QUEUE_KEY if priority else JOB_QUEUE_KEY
+    job = {
+        "id": job_id,
+        "type": job_type,
+        "user_id": "" if user_id is None else str(user_id),
+        "params": json.dumps(params or {}),
+        "status": "queued",
+        "queue": queue,
+        "created_at": str(int(time.time())),
+    }
+    pipe = r.pipeline()
+    pipe.hset(job_key(job_id), mapping=job)
+    pipe.expire(job_key(job_id), JOB_TTL)
+    pipe.rpush(queue, job_id)
+    pipe.execute()
+    return job_id, True
+
+
+def get_job(job_id: str) -> dict | None:
+    raw = _redis().hgetall(job_key(job_id))
+    if not raw:
+        return None
+    job = {_decode(key): _decode(value) for key, value in raw.items()}
+    for field in _JSON_FIELDS:
+        if job.get(field):
+            job[field] = json.loads(job[field])
+    for field in ("user_id", "created_at", "started_at", "finished_at"):
+        job[field] = int(job[field]) if job.get(field) else None
+    return job
+
+
+def update_job(job_id: str, **fields):
+    mapping = {
+        key: json.dumps(value) if key in _JSON_FIELDS else str(value)
+        for key, value in fields.items()
+    }
+    _redis().hset(job_key(job_id), mapping=mapping)
+
+
+def _finish(job: dict, **fields):
+    r = _redis()
+    update_job(job["id"], finished_at=int(time.time()), **fields)
+    r.expire(job_key(job["id"]), JOB_TTL)
+    if job["user_id"] is not None:
+        dedupe_key = _dedupe_key(job["type"], job["user_id"])
+        if _decode(r.get(dedupe_key)) == job["id"]:
+            r.delete(dedupe_key)
+
+
+def _renew(job: dict):
+    """Push back the expiry of the user lock and dedupe key held by a running job."""
+    if job["user_id"] is None:
+        return
+    r = _redis()
+    for key in (_user_lock_key(job["user_id"]), _dedupe_key(job["type"], job["user_id"])):
+        if _decode(r.get(key)) == job["id"]:
+            r.expire(key, JOB_LOCK_TTL)
+
+
+def run_job(job_id: str, worker_id: str | None = None) -> bool:
+    """Run one taken job. Returns False if it was put back on the queue.
+
+    With `worker_id`, the job is expected on that worker's processing list
+    and is removed from it once finished (or requeued).
+    """
+    r = _redis()
+    processing_key = _processing_key(worker_id) if worker_id else None
+
+    def release():
+        if processing_key:
+            r.lrem(processing_key, 1, job_id)
+
+    job = get_job(job_id)
+    if job is None:
+        release()
+        return True  # expired before a worker got to it
+
+    handler = _handlers.get(job["type"])
+    if handler is None:
+        _finish(job, status="failed", error=f"Unknown job type {job['type']}")
+        release()
+        return True
+
+    # One job per user at a time, across all workers
+    lock_key = _user_lock_key(job["user_id"]) if job["user_id"] is not None else None
+    if lock_key and not r.set(lock_key, job_id, nx=True, ex=JOB_LOCK_TTL):
+        time.sleep(JOB_REQUEUE_DELAY)
+        pipe = r.pipeline()
+        pipe.rpush(job.get("queue") or JOB_QUEUE_KEY, job_id)
+        if processing_key:
+            pipe.lrem(processing_key, 1, job_id)
+        pipe.execute()
+        return False
+
+    update_job(job_id, status="running", started_at=int(time.time()))
+    _current_jobs[worker_id] = job
+    try:
+        def report(**progress):
+            update_job(job_id, progress=progress)
+            _renew(job)
+
+        result = handler(job, report)
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+        _finish(job, status="done", result=result if result is not None else {})
+    except Exception as e:
+        print(f"Job {job_id} ({job['type']}) failed: {e}")
+        _finish(job, status="failed", error=str(e))
+    finally:
+        _current_jobs.pop(worker_id, None)
+        if lock_key and _decode(r.get(lock_key)) == job_id:
+            r.delete(lock_key)
+        release()
+    return True
+
+
+# worker id -> the job that worker thread is running, for the heartbeat
+_current_jobs: dict[str | None, dict] = {}
+
+
+def _heartbeat(worker_id: str, done: threading.Event):
+    """Keep the worker's heartbeat (and its running job's lock) alive until `done`."""
+    while True:
+        try:
+            _redis().set(_worker_key(worker_id), int(time.time()), ex=JOB_HEARTBEAT_TTL)
+            job = _current_jobs.get(worker_id)
+            if job is not None:
+                _renew(job)
+        except Exception as e:
+            print(f"Job worker heartbeat failed: {e}")
+        if done.wait(JOB_HEARTBEAT_TTL / 3):
+            return
+
+
+def reap_abandoned_jobs() -> int:
+    """Put jobs held by workers whose heartbeat lapsed back on the queue.
+
+    A job is handed out at most JOB_MAX_ATTEMPTS times; after that it is
+    marked failed instead of being retried again.
+    """
+    r = _redis()
+    requeued = 0
+    for raw_key in r.scan_iter(match=f"{PROCESSING_KEY_PREFIX}*"):
+        processing_key = _decode(raw_key)
+        worker_id = processing_key[len(PROCESSING_KEY_PREFIX):]
+        if r.exists(_worker_key(worker_id)):
+            continue
+        while True:
+            job_id = _decode(r.lpop(processing_key))
+            if job_id is None:
+                break
+            job = get_job(job_id)
+            if job is None:
+                continue
+            # The dead worker's user lock would otherwise hold the job back until it expires
+            if job["user_id"] is not None and _decode(r.get(_user_lock_key(job["user_id"]))) == job_id:
+                r.delete(_user_lock_key(job["user_id"]))
+            attempts = r.hincrby(job_key(job_id), "attempts", 1)
+            if attempts >= JOB_MAX_ATTEMPTS:
+                print(f"Job {job_id} ({job['type']}) abandoned {attempts} times; giving up")
+                _finish(job, status="failed", error="Worker died while running the job")
+                continue
+            update_job(job_id, status="queued")
+            _renew(job)
+            r.lpush(job.get("queue") or JOB_QUEUE_KEY, job_id)  # it has waited long enough; run it next
+            print(f"Requeued job {job_id} ({job['type']}) abandoned by worker {worker_id}")
+            requeued += 1
+    return requeued
+
+
+def _maybe_reap():
+    # One reaper pass per JOB_REAP_INTERVAL across the cluster
+    try:
+        if _redis().set(REAPER_KEY, 1, nx=True, ex=JOB_REAP_INTERVAL):
+            reap_abandoned_jobs()
+    except Exception as e:
+        print(f"Job reaper failed: {e}")
+
+
+def _take(r, queues: tuple[str, ...], processing_key: str, block_timeout: int):
+    """Next job id from the first non-empty queue, moved onto `processing_key`."""
+    for queue in queues[:-1]:
+        job_id = r.lmove(queue, processing_key, "LEFT", "RIGHT")
+        if job_id:
+            return job_id
+    # Only the last queue can be waited on; keep the wait short so the others are re-checked
+    timeout = block_timeout if len(queues) == 1 else min(block_timeout, 1)
+    return r.blmove(queues[-1], processing_key, timeout, "LEFT", "RIGHT")
+
+
+def work(stop=None, block_timeout: int = 5, queues: tuple[str, ...] = QUEUES):
+    """Take and run jobs until `stop` (a threading.Event) is set.
+
+    `queues` are served in order: a job is only taken from a later queue when
+    the earlier ones are empty.
+    """
+    r = _redis()
+    worker_id = uuid.uuid4().hex
+    processing_key = _processing_key(worker_id)
+    done = threading.Event()
+    # Alive before the first job lands on the processing list, so the reaper never takes it
+    try:
+        r.set(_worker_key(worker_id), int(time.time()), ex=JOB_HEARTBEAT_TTL)
+    except Exception as e:
+        print(f"Job worker heartbeat failed: {e}")
+    heartbeat = threading.Thread(target=_heartbeat, args=(worker_id, done), daemon=True)
+    heartbeat.start()
+    try:
+        while stop is None or not stop.is_set():
+            _maybe_reap()
+            try:
+                job_id = _take(r, queues, processing_key, block_timeout)
+            except Exception as e:
+                print(f"Job queue unavailable: {e}")
+                time.sleep(block_timeout)
+                continue
+            if job_id:
+                run_job(_decode(job_id), worker_id)
+    finally:
+        done.set()
+        heartbeat.join()
+        try:
+            r.delete(_worker_key(worker_id))
+        except Exception:
+            pass
+
+
+def live_workers() -> int:
+    """Worker threads with a current heartbeat."""
+    return sum(1 for _ in _redis().scan_iter(match=f"{WORKER_KEY_PREFIX}*"))
+
+
+def stats() -> dict:
+    try:
+        r = _redis()
+        running = sum(r.llen(key) for key in r.scan_iter(match=f"{PROCESSING_KEY_PREFIX}*"))
+        return {
+            "queued": r.llen(JOB_QUEUE_KEY), "queued_priority": r.llen(PRIORITY_QUEUE_KEY),
+            "running": running, "workers": live_workers(),
+        }
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,97 @@
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models import UserStat
+
+# Sorted set of user_id -> total_xp; ranks come from ZREVRANK/ZREVRANGE.
+LEADERBOARD_KEY = "leaderboard:xp"
+
+
+def update_leaderboard_scores(scores: dict[int, int]):
+    """Write the latest total_xp for the given users (ZADD is idempotent)."""
+    from dependencies import get_sync_redis_client
+
+    if not scores:
+        return
+    try:
+        get_sync_redis_client().zadd(
+            LEADERBOARD_KEY, {str(user_id): xp for user_id, xp in scores.items()}
+        )
+    except Exception as e:
+        print(f"Failed to update leaderboard for users {list(scores)}: {e}")
+
+
+def rebuild_leaderboard(db: Session) -> int:
+    """Recompute the whole sorted set from user_stats to correct any drift."""
+    from dependencies import get_sync_redis_client
+
+    rows = db.query(UserStat.user_id, UserStat.total_xp).all()
+    redis_conn = get_sync_redis_client()
+    tmp_key = f"{LEADERBOARD_KEY}:rebuild"
+
+    pipe = redis_conn.pipeline()
+    pipe.delete(tmp_key)
+    for start in range(0, len(rows), 1000):
+        chunk = rows[start:start + 1000]
+        pipe.zadd(tmp_key, {str(user_id): xp or 0 for user_id, xp in chunk})
+    if rows:
+        pipe.rename(tmp_key, LEADERBOARD_KEY)
+    else:
+        pipe.delete(LEADERBOARD_KEY)
+    pipe.execute()
+    print(f"Leaderboard rebuilt with {len(rows)} users")
+    return len(rows)
+
+
+async def ensure_leaderboard(redis_conn, db) -> int:
+    """Populate the sorted set from the DB if it is empty (cold Redis)."""
+    total = await redis_conn.zcard(LEADERBOARD_KEY)
+    if total:
+        return total
+
+    rows = (await db.execute(select(UserStat.user_id, UserStat.total_xp))).all()
+    if rows:
+        await redis_conn.zadd(LEADERBOARD_KEY, {str(user_id): xp or 0 for user_id, xp in rows})
+    return len(rows)
+
+
+async def leaderboard_range(redis_conn, start: int, stop: int) -> list[tuple[int, int]]:
+    """(user_id, total_xp) for 0-based ranks start..stop inclusive, best first."""
+    rows = await redis_conn.zrevrange(LEADERBOARD_KEY, start, stop, withscores=True)
+    return [(int(member), int(score)) for member, score in rows]
+
+
+async def leaderboard_rank(redis_conn, user_id: int) -> int | None:
+    """0-based rank of the user, or None if they have no stats yet."""
+    return await redis_conn.zrevrank(LEADERBOARD_KEY, str(user_id))
+
+
+# Every committed total_xp change (sweep rewards, syncs, purchases...) is
+# mirrored into the sorted set, so call sites don't need to remember it.
+def _record_score(target: UserStat):
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault("leaderboard_scores", {})[target.user_id] = target.total_xp or 0
+
+
+@event.listens_for(UserStat, "after_insert")
+def _mark_new_user(mapper, connection, target):
+    _record_score(target)
+
+
+@event.listens_for(UserStat, "after_update")
+def _mark_xp_changed(mapper, connection, target):
+    if inspect(target).attrs.total_xp.history.has_changes():
+        _record_score(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_xp_changes(session):
+    scores = session.info.pop("leaderboard_scores", None)
+    if scores:
+        update_leaderboard_scores(scores)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_xp_changes(session):
+    session.info.pop("leaderboard_scores", None)
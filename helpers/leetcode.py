@@ -2,11 +2,27 @@ from datetime import datetime
 import os
 import pytz
 import requests
-import httpx
 import uuid
 import json
 import base64
 import asyncio
+from helpers.leetcode_client import leetcode_client
+from helpers.ratelimit import get_rate_limiter
+
+LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql/"
+
+# Shared across every caller in the process so concurrent sweeps stay polite.
+leetcode_rate_limiter = get_rate_limiter(
+    "leetcode.com",
+    rate=float(os.getenv("LEETCODE_RATE_LIMIT", "5")),
+    burst=int(os.getenv("LEETCODE_RATE_BURST", "5")),
+)
+
+
+def _leetcode_post(url: str = LEETCODE_GRAPHQL_URL, **kwargs):
+    """Blocking POST to LeetCode that waits its turn on the host rate limiter."""
+    leetcode_rate_limiter.acquire()
+    return requests.post(url, **kwargs)
 
 
 def extract_uuuserid(session_jwt: str) -> str | None:
@@ -29,12 +45,23 @@ def extract_uuuserid(session_jwt: str) -> str | None:
     return None
 
 
-def is_leetcode_solved_today(
-    username: str = None, session: str = None, daily_slug: str = None
-):
-    # Use env as fallback for backward compatibility / single-tenant default
-    username = username or os.getenv("LEETCODE_USERNAME")
+RECENT_SUBMISSIONS_QUERY = """
+query recentSubmissions($username: String!, $limit: Int!) {
+    recentSubmissionList(username: $username, limit: $limit) {
+        id
+        title
+        titleSlug
+        statusDisplay
+        timestamp
+    }
+}
+"""
+
+# Large enough for the curated-status, daily-problem and activity checks combined.
+SNAPSHOT_LIMIT = 30
+
 
+def _recent_submissions_request(username: str, session: str | None, limit: int):
     headers = {
         "accept": "*/*",
         "accept-language": "en-US,en;q=0.6",
@@ -58,180 +85,145 @@ def is_leetcode_solved_today(
     if session:
         cookies["LEETCODE_SESSION"] = session
 
-    # If daily slug is provided, we check for that specifically
-    if daily_slug:
-        # Fetch recent submissions (both AC and non-AC)
-        json_data = {
-            "query": """
-            query recentSubmissions($username: String!, $limit: Int!) {
-                recentSubmissionList(username: $username, limit: $limit) {
-                    titleSlug
-                    statusDisplay
-                    timestamp
-                }
-            }
-            """,
-            "variables": {
-                "username": username,
-                "limit": 30,
-            },
-            "operationName": "recentSubmissions",
-        }
-
-        try:
-            response = requests.post(
-                "https://leetcode.com/graphql/",
-                headers=headers,
-                json=json_data,
-                cookies=cookies,
-                timeout=15,
-            )
-            data = response.json().get("data", {}).get("recentSubmissionList", [])
-
-            # Check if any accepted submission matches the daily slug and is from today
-            tz = pytz.timezone("Asia/Kolkata")
-            now = datetime.now(tz)
-            # Daily reset is at 5:30 AM IST usually for global daily problem? Actually LeetCode daily resets at 00:00 UTC = 5:30 AM IST.
-            # But the user logic handled 3:30 PM for some reason in get_problems_status.
-            # Let's align with "today" in local time for simplicity or stick to the 3:30 PM logic if consistent.
-            # However, for the OFFICIAL daily problem, it follows UTC.
-
-            # Let's just check if it was solved "today" in standard terms roughly.
-            # Or better, check if the timestamp matches the current daily problem day window.
-            # For simplicity, let's just check if it appears in the recent list with 'Accepted' status.
-            # Assuming people don't re-solve old dailies just for fun often, searching for slug in recent AC is decent.
-
-            for sub in data:
-                if (
-                    sub["titleSlug"] == daily_slug
-                    and sub["statusDisplay"] == "Accepted"
-                ):
-                    # Potentially check timestamp if needed, but recent list (limit 30) is usually fresh enough
-                    return True
-            return False
-
-        except Exception as e:
-            print(f"Error checking daily problem status: {e}")
-            return False
-
-    # Fallback to generic "any submission made today" logic
     json_data = {
-        "query": """
-        query recentSubmissions($username: String!, $limit: Int!) {
-            recentSubmissionList(username: $username, limit: $limit) {
-                id
-                title
-                titleSlug
-                timestamp
-            }
-        }
-        """,
-        "variables": {
-            "username": username,
-            "limit": 15,
-        },
+        "query": RECENT_SUBMISSIONS_QUERY,
+        "variables": {"username": username, "limit": limit},
         "operationName": "recentSubmissions",
     }
+    return headers, cookies, json_data
 
-    try:
-        response = requests.post(
-            "https://leetcode.com/graphql/",
-            headers=headers,
-            json=json_data,
-            cookies=cookies,
-            timeout=15,
-        )
-        data = response.json().get("data", {})
-    except Exception as e:
-        print(f"Error checking if LeetCode activity today: {e}")
-        return False
-    if not data or not data.get("recentSubmissionList"):
-        return False
 
-    latest_submission = data["recentSubmissionList"][0]
-    submission_time = int(latest_submission["timestamp"])
-    submission_date = datetime.fromtimestamp(
-        submission_time, pytz.timezone("Asia/Kolkata")
-    ).date()
-    today_date = datetime.now(pytz.timezone("Asia/Kolkata")).date()
+def _evaluation_window_start() -> int:
+    """Timestamp of the last 3:30 PM IST reset, when curated problems roll over."""
+    from helpers.curation import last_rollover
+    return int(last_rollover().timestamp())
 
-    return submission_date == today_date
 
+class SubmissionSnapshot:
+    """A user's recent LeetCode submissions, fetched once and evaluated in memory.
 
-def get_problems_status(slugs: list[str], username: str = None, session: str = None):
-    username = username or os.getenv("LEETCODE_USERNAME")
-    if not username:
-        return {slug: "unattempted" for slug in slugs}
+    Every daily decision (curated problem status, daily problem solved, any
+    activity today) is answered from the same list, so one evaluation costs a
+    single GraphQL request and all checks agree with each other.
+    """
 
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "origin": "https://leetcode.com",
-        "referer": f"https://leetcode.com/u/{username}/",
-        "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
-    }
+    def __init__(self, submissions: list[dict] | None = None, ok: bool = True):
+        # Newest first, as returned by recentSubmissionList
+        self.submissions = submissions or []
+        self.ok = ok
 
-    cookies = {}
-    if session:
-        cookies["LEETCODE_SESSION"] = session
+    @classmethod
+    def from_response(cls, response) -> "SubmissionSnapshot":
+        """Snapshot of a GraphQL response; anything but a clean answer is `ok=False`.
 
-    # Fetch recent submissions (both AC and non-AC)
-    json_data = {
-        "query": """
-        query recentSubmissions($username: String!, $limit: Int!) {
-            recentSubmissionList(username: $username, limit: $limit) {
-                titleSlug
-                statusDisplay
-                timestamp
-            }
-        }
-        """,
-        "variables": {
-            "username": username,
-            "limit": 30,
-        },
-        "operationName": "recentSubmissions",
-    }
+        Rate limits, expired cookies and GraphQL errors must not read as "no
+        submissions", or the sweep would penalize the user for our failure.
+        """
+        response.raise_for_status()
+        body = response.json()
+        submissions = (body.get("data") or {}).get("recentSubmissionList")
+        if body.get("errors") or submissions is None:
+            print(f"LeetCode submission snapshot unusable: {body.get('errors') or 'no recentSubmissionList'}")
+            return cls(ok=False)
+        return cls(submissions)
+
+    def problems_status(self, slugs: list[str]) -> dict[str, str]:
+        eval_timestamp = _evaluation_window_start()
+
+        status_map = {slug: "unattempted" for slug in slugs}
+        for sub in self.submissions:
+            slug = sub["titleSlug"]
+            if slug in status_map:
+                sub_ts = int(sub["timestamp"])
+
+                # Only count submissions after the last curation/evaluation reset
+                if sub_ts >= eval_timestamp:
+                    if sub["statusDisplay"] == "Accepted":
+                        status_map[slug] = "completed"
+                    elif status_map[slug] != "completed":
+                        status_map[slug] = "attempted"
+        return status_map
+
+    def is_solved(self, slug: str) -> bool:
+        # The recent list (30 entries) is fresh enough that an accepted entry
+        # for the daily slug means it was solved for the current daily.
+        return any(
+            sub["titleSlug"] == slug and sub["statusDisplay"] == "Accepted"
+            for sub in self.submissions
+        )
+
+    def has_activity_today(self) -> bool:
+        if not self.submissions:
+            return False
 
+        tz = pytz.timezone("Asia/Kolkata")
+        latest_submission = self.submissions[0]
+        submission_date = datetime.fromtimestamp(
+            int(latest_submission["timestamp"]), tz
+        ).date()
+        return submission_date == datetime.now(tz).date()
+
+    def activity_days(self) -> set:
+        """IST calendar days that have at least one submission in the snapshot."""
+        from helpers.streaks import day_from_timestamp
+        return {day_from_timestamp(sub["timestamp"]) for sub in self.submissions} - {None}
+
+
+def fetch_submission_snapshot(
+    username: str = None, session: str = None, limit: int = SNAPSHOT_LIMIT, timeout: float = 15
+) -> SubmissionSnapshot:
+    # Use env as fallback for backward compatibility / single-tenant default
+    username = username or os.getenv("LEETCODE_USERNAME")
+    if not username:
+        return SubmissionSnapshot(ok=False)
+
+    headers, cookies, json_data = _recent_submissions_request(username, session, limit)
     try:
-        response = requests.post(
-            "https://leetcode.com/graphql/",
+        response = _leetcode_post(
             headers=headers,
             json=json_data,
             cookies=cookies,
-            timeout=15,
+            timeout=timeout,
         )
-        data = response.json().get("data", {}).get("recentSubmissionList", [])
+        return SubmissionSnapshot.from_response(response)
     except Exception as e:
-        print(f"Error fetching LeetCode status: {e}")
-        return {slug: "unattempted" for slug in slugs}
+        print(f"Error fetching LeetCode submission snapshot: {e}")
+        return SubmissionSnapshot(ok=False)
+
 
-    # Evaluation time (3:30 PM today or yesterday)
-    tz = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(tz)
-    eval_time = now.replace(hour=15, minute=30, second=0, microsecond=0)
+async def fetch_submission_snapshot_async(
+    username: str = None, session: str = None, limit: int = SNAPSHOT_LIMIT
+) -> SubmissionSnapshot:
+    username = username or os.getenv("LEETCODE_USERNAME")
+    if not username:
+        return SubmissionSnapshot(ok=False)
 
-    if now < eval_time:
-        # If it's before 3:30 PM, the "day" started at 3:30 PM yesterday
-        from datetime import timedelta
+    headers, _, json_data = _recent_submissions_request(username, session, limit)
+    try:
+        async with leetcode_client() as client:
+            response = await client.post_graphql(json_data, headers=headers, session=session)
+        return SubmissionSnapshot.from_response(response)
+    except Exception as e:
+        print(f"Error fetching LeetCode submission snapshot async: {e}")
+        return SubmissionSnapshot(ok=False)
 
-        eval_time = eval_time - timedelta(days=1)
 
-    eval_timestamp = int(eval_time.timestamp())
+def is_leetcode_solved_today(
+    username: str = None, session: str = None, daily_slug: str = None
+):
+    snapshot = fetch_submission_snapshot(username, session)
+    # If daily slug is provided, we check for that specifically
+    if daily_slug:
+        return snapshot.is_solved(daily_slug)
+    # Fallback to generic "any submission made today" logic
+    return snapshot.has_activity_today()
 
-    status_map = {slug: "unattempted" for slug in slugs}
-    for sub in data:
-        slug = sub["titleSlug"]
-        if slug in status_map:
-            sub_ts = int(sub["timestamp"])
 
-            # Only count submissions after the last curation/evaluation reset
-            if sub_ts >= eval_timestamp:
-                if sub["statusDisplay"] == "Accepted":
-                    status_map[slug] = "completed"
-                elif status_map[slug] != "completed":
-                    status_map[slug] = "attempted"
-    return status_map
+def get_problems_status(slugs: list[str], username: str = None, session: str = None):
+    username = username or os.getenv("LEETCODE_USERNAME")
+    if not username:
+        return {slug: "unattempted" for slug in slugs}
+    return fetch_submission_snapshot(username, session).problems_status(slugs)
 
 
 async def get_problems_status_async(
@@ -240,94 +232,21 @@ async def get_problems_status_async(
     username = username or os.getenv("LEETCODE_USERNAME")
     if not username:
         return {slug: "unattempted" for slug in slugs}
+    snapshot = await fetch_submission_snapshot_async(username, session)
+    return snapshot.problems_status(slugs)
 
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "origin": "https://leetcode.com",
-        "referer": f"https://leetcode.com/u/{username}/",
-        "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
-    }
-
-    cookies = {}
-    if session:
-        cookies["LEETCODE_SESSION"] = session
-
-    # Fetch recent submissions (both AC and non-AC)
-    json_data = {
-        "query": """
-        query recentSubmissions($username: String!, $limit: Int!) {
-            recentSubmissionList(username: $username, limit: $limit) {
-                titleSlug
-                statusDisplay
-                timestamp
-            }
-        }
-        """,
-        "variables": {
-            "username": username,
-            "limit": 30,
-        },
-        "operationName": "recentSubmissions",
-    }
-
-    try:
-        # Set a generous timeout for the async client
-        timeout = httpx.Timeout(30.0, read=30.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # httpx uses 'cookies' as a Cookies object or dict, similar to requests
-            # But let's verify if 'cookies' contains None or empty values
-            response = await client.post(
-                "https://leetcode.com/graphql/",
-                headers=headers,
-                json=json_data,
-                cookies={k: v for k, v in cookies.items() if v is not None},
-            )
-            data = response.json().get("data", {}).get("recentSubmissionList", [])
-            if data is None:
-                data = []
-    except Exception as e:
-        import traceback
-
-        print(f"Error fetching LeetCode status async: {e}")
-        traceback.print_exc()
-        return {slug: "unattempted" for slug in slugs}
-
-    # Evaluation time (3:30 PM today or yesterday)
-    tz = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(tz)
-    eval_time = now.replace(hour=15, minute=30, second=0, microsecond=0)
-
-    if now < eval_time:
-        # If it's before 3:30 PM, the "day" started at 3:30 PM yesterday
-        from datetime import timedelta
 
-        eval_time = eval_time - timedelta(days=1)
-
-    eval_timestamp = int(eval_time.timestamp())
-
-    status_map = {slug: "unattempted" for slug in slugs}
-    for sub in data:
-        slug = sub["titleSlug"]
-        if slug in status_map:
-            sub_ts = int(sub["timestamp"])
+DAILY_PROBLEM_FALLBACK = {
+    "link": "https://leetcode.com/problemset/all/",
+    "slug": None,
+    "title": "Daily Problem",
+}
 
-            # Only count submissions after the last curation/evaluation reset
-            if sub_ts >= eval_timestamp:
-                if sub["statusDisplay"] == "Accepted":
-                    status_map[slug] = "completed"
-                elif status_map[slug] != "completed":
-                    status_map[slug] = "attempted"
-    return status_map
 
+def _daily_problem_request():
+    now = datetime.now(pytz.utc)
 
-def fetch_daily_problem():
-    url = "https://leetcode.com/graphql"
-
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-
-    payload = f'{{"operationName":"codingChallengeMedal","variables":{{"year":{current_year},"month":{current_month}}},"query":"query codingChallengeMedal($year: Int!, $month: Int!) {{  dailyChallengeMedal(year: $year, month: $month) {{    name    config {{      icon      __typename    }}    __typename  }}  activeDailyCodingChallengeQuestion {{    link    question {{      questionId      titleSlug      title    }}    __typename  }}}}"}}'
+    payload = f'{{"operationName":"codingChallengeMedal","variables":{{"year":{now.year},"month":{now.month}}},"query":"query codingChallengeMedal($year: Int!, $month: Int!) {{  dailyChallengeMedal(year: $year, month: $month) {{    name    config {{      icon      __typename    }}    __typename  }}  activeDailyCodingChallengeQuestion {{    link    question {{      questionId      titleSlug      title    }}    __typename  }}}}"}}'
     headers = {
         "Content-Type": "application/json",
         "accept": "*/*",
@@ -347,21 +266,12 @@ def fetch_daily_problem():
         "sec-gpc": "1",
         "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36",
     }
+    return payload, headers
 
-    try:
-        response = requests.request(
-            "POST", url, data=payload, headers=headers, timeout=15
-        )
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Error fetching daily problem: {e}")
-        return {
-            "link": "https://leetcode.com/problemset/all/",
-            "slug": None,
-            "title": "Daily Problem",
-        }
 
-    today_date = datetime.now().strftime("%Y-%m-%d")
+def _parse_daily_problem(response) -> dict:
+    # The official daily problem rolls over at 00:00 UTC
+    today_date = datetime.now(pytz.utc).strftime("%Y-%m-%d")
     data = response.json()["data"]["activeDailyCodingChallengeQuestion"]
     link = (
         "https://leetcode.com"
@@ -377,6 +287,35 @@ def fetch_daily_problem():
     }
 
 
+def fetch_daily_problem():
+    """Fetch today's daily problem straight from LeetCode.
+
+    Most callers should go through helpers.daily_problem, which caches this.
+    """
+    payload, headers = _daily_problem_request()
+    try:
+        response = _leetcode_post(
+            "https://leetcode.com/graphql", data=payload, headers=headers, timeout=15
+        )
+        response.raise_for_status()
+        return _parse_daily_problem(response)
+    except Exception as e:
+        print(f"Error fetching daily problem: {e}")
+        return dict(DAILY_PROBLEM_FALLBACK)
+
+
+async def fetch_daily_problem_async():
+    payload, headers = _daily_problem_request()
+    try:
+        async with leetcode_client() as client:
+            response = await client.post_graphql(None, headers=headers, content=payload)
+        response.raise_for_status()
+        return _parse_daily_problem(response)
+    except Exception as e:
+        print(f"Error fetching daily problem async: {e}")
+        return dict(DAILY_PROBLEM_FALLBACK)
+
+
 async def fetch_all_solved_slugs(
     username: str = None, session: str = None
 ) -> list[str]:
@@ -405,75 +344,23 @@ async def fetch_recent_submissions(
         "content-type": "application/json",
         "origin": "https://leetcode.com",
         "referer": f"https://leetcode.com/u/{username}/",
-        "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
     }
 
-    timeout = httpx.Timeout(30.0, read=30.0)
-
-    async with httpx.AsyncClient(
-        timeout=timeout,
-        follow_redirects=True,
-    ) as client:
-        if session:
-            client.cookies.set(
-                "LEETCODE_SESSION", session, domain=".leetcode.com", path="/"
-            )
-            uuuserid = extract_uuuserid(session)
-            if uuuserid:
-                client.cookies.set(
-                    "uuuserid", uuuserid, domain=".leetcode.com", path="/"
-                )
-                base_headers["uuuserid"] = uuuserid
-
-        try:
-            await client.get(
-                "https://leetcode.com",
-                headers={"user-agent": base_headers["user-agent"]},
-            )
-            csrf_token = ""
-            for cookie in client.cookies.jar:
-                if cookie.name == "csrftoken":
-                    csrf_token = cookie.value
-                    break
-            if not csrf_token:
-                csrf_token = str(uuid.uuid4()).replace("-", "") * 2
-                client.cookies.set(
-                    "csrftoken", csrf_token, domain=".leetcode.com", path="/"
-                )
-            base_headers["x-csrftoken"] = csrf_token
-        except Exception:
-            csrf_token = str(uuid.uuid4()).replace("-", "") * 2
-            client.cookies.set(
-                "csrftoken", csrf_token, domain=".leetcode.com", path="/"
-            )
-            base_headers["x-csrftoken"] = csrf_token
-
-        json_data = {
-            "query": """
-            query recentSubmissions($username: String!, $limit: Int!) {
-                recentSubmissionList(username: $username, limit: $limit) {
-                    id
-                    title
-                    titleSlug
-                    statusDisplay
-                    timestamp
-                }
-            }
-            """,
-            "variables": {"username": username, "limit": limit},
-            "operationName": "recentSubmissions",
-        }
+    json_data = {
+        "query": RECENT_SUBMISSIONS_QUERY,
+        "variables": {"username": username, "limit": limit},
+        "operationName": "recentSubmissions",
+    }
 
-        try:
-            response = await client.post(
-                "https://leetcode.com/graphql/",
-                headers=base_headers,
-                json=json_data,
+    try:
+        async with leetcode_client() as client:
+            response = await client.post_graphql(
+                json_data, headers=base_headers, session=session
             )
-            data = response.json().get("data", {}).get("recentSubmissionList", [])
-        except Exception as e:
-            print(f"Error fetching recent submissions: {e}")
-            return []
+        data = response.json().get("data", {}).get("recentSubmissionList", [])
+    except Exception as e:
+        print(f"Error fetching recent submissions: {e}")
+        return []
 
     submissions = []
     for sub in data or []:
@@ -497,78 +384,39 @@ async def fetch_recent_submissions(
     return submissions
 
 
-async def fetch_all_submissions(
+async def iter_submission_pages(
     username: str | None = None,
     session: str | None = None,
     page_size: int = 20,
     since_timestamp: int | None = None,
-) -> list[dict]:
-    """Fetch the user's full submission history from LeetCode.
+    known_id: str | None = None,
+    known_timestamp: int | None = None,
+    progress: dict | None = None,
+):
+    """Yield the user's LeetCode submission history one page at a time, newest first.
 
     LeetCode's `submissionList` endpoint is authenticated and paginated,
     so it is the durable source for a monthly submission archive.
+
+    With `known_id` / `known_timestamp` (a sync high-water mark) paging stops
+    at the first submission already seen. `progress["complete"]` is set once
+    the walk reaches its end rather than stopping on a fetch error.
     """
     username = username or os.getenv("LEETCODE_USERNAME")
     if not username or not session:
-        return []
+        return
 
     base_headers = {
         "accept": "*/*",
         "content-type": "application/json",
         "origin": "https://leetcode.com",
         "referer": f"https://leetcode.com/u/{username}/submissions/",
-        "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
     }
 
-    timeout = httpx.Timeout(30.0, read=30.0)
-    submissions: list[dict] = []
-
-    async with httpx.AsyncClient(
-        timeout=timeout,
-        follow_redirects=True,
-    ) as client:
-        client.cookies.set(
-            "LEETCODE_SESSION", str(session), domain=".leetcode.com", path="/"
-        )
-        uuuserid = extract_uuuserid(str(session))
-        if uuuserid:
-            client.cookies.set("uuuserid", uuuserid, domain=".leetcode.com", path="/")
-            base_headers["uuuserid"] = uuuserid
-
-        try:
-            await client.get(
-                "https://leetcode.com",
-                headers={"user-agent": base_headers["user-agent"]},
-            )
-            csrf_token = ""
-            for cookie in client.cookies.jar:
-                if cookie.name == "csrftoken":
-                    csrf_token = cookie.value
-                    break
-            if not csrf_token:
-                csrf_token = str(uuid.uuid4()).replace("-", "") * 2
-                client.cookies.set(
-                    "csrftoken", csrf_token, domain=".leetcode.com", path="/"
-                )
-            base_headers["x-csrftoken"] = csrf_token
-        except Exception:
-            csrf_token = str(uuid.uuid4()).replace("-", "") * 2
-            client.cookies.set(
-                "csrftoken", csrf_token, domain=".leetcode.com", path="/"
-            )
-            base_headers["x-csrftoken"] = csrf_token
-
+    complete = False
+    async with leetcode_client() as client:
         offset = 0
         while True:
-            csrf_token = ""
-            for cookie in client.cookies.jar:
-                if cookie.name == "csrftoken":
-                    csrf_token = cookie.value
-                    break
-            if not csrf_token:
-                csrf_token = base_headers.get("x-csrftoken", "")
-            base_headers["x-csrftoken"] = csrf_token
-
             json_data = {
                 "query": """
                 query submissionList($offset: Int!, $limit: Int!) {
@@ -591,10 +439,8 @@ async def fetch_all_submissions(
             try:
                 if offset > 0:
                     await asyncio.sleep(0.5)
-                response = await client.post(
-                    "https://leetcode.com/graphql/",
-                    headers=base_headers,
-                    json=json_data,
+                response = await client.post_graphql(
+                    json_data, headers=base_headers, session=str(session)
                 )
                 payload = response.json().get("data", {})
                 submission_list = payload.get("submissionList") or {}
@@ -605,8 +451,11 @@ async def fetch_all_submissions(
                 break
 
             if not page:
+                complete = True
                 break
 
+            submissions: list[dict] = []
+            reached_known = False
             for sub in page:
                 try:
                     timestamp = (
@@ -614,6 +463,12 @@ async def fetch_all_submissions(
                         if sub.get("timestamp") is not None
                         else None
                     )
+                    if known_id is not None and (
+                        str(sub.get("id")) == known_id
+                        or (known_timestamp is not None and timestamp is not None and timestamp < known_timestamp)
+                    ):
+                        reached_known = True
+                        break
                     if (
                         since_timestamp is not None
                         and timestamp is not None
@@ -632,6 +487,12 @@ async def fetch_all_submissions(
                 except Exception:
                     continue
 
+            if submissions:
+                yield submissions
+            if reached_known:
+                complete = True
+                break
+
             offset += len(page)
             if since_timestamp is not None and page:
                 oldest_timestamp = next(
@@ -643,14 +504,28 @@ async def fetch_all_submissions(
                     None,
                 )
                 if oldest_timestamp is not None and oldest_timestamp < since_timestamp:
+                    complete = True
                     break
 
             if has_next is False or len(page) < page_size:
+                complete = True
                 break
 
-    return submissions
+    if progress is not None:
+        progress["complete"] = complete
 
 
+async def fetch_all_submissions(
+    username: str | None = None,
+    session: str | None = None,
+    page_size: int = 20,
+    since_timestamp: int | None = None,
+) -> list[dict]:
+    """Fetch the user's full submission history from LeetCode as one list."""
+    submissions: list[dict] = []
+    async for page in iter_submission_pages(username, session, page_size, since_timestamp):
+        submissions.extend(page)
+    return submissions
 
 
 def _parse_leetcode_timestamp(value) -> int:
@@ -695,46 +570,9 @@ async def fetch_solved_problem_progress(
         "content-type": "application/json",
         "origin": "https://leetcode.com",
         "referer": "https://leetcode.com/progress/",
-        "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
     }
 
-    timeout = httpx.Timeout(30.0, read=30.0)
-
-    async with httpx.AsyncClient(
-        timeout=timeout,
-        follow_redirects=True,
-    ) as client:
-        client.cookies.set(
-            "LEETCODE_SESSION", session, domain=".leetcode.com", path="/"
-        )
-        uuuserid = extract_uuuserid(session)
-        if uuuserid:
-            client.cookies.set("uuuserid", uuuserid, domain=".leetcode.com", path="/")
-            base_headers["uuuserid"] = uuuserid
-
-        try:
-            await client.get(
-                "https://leetcode.com",
-                headers={"user-agent": base_headers["user-agent"]},
-            )
-            csrf_token = ""
-            for cookie in client.cookies.jar:
-                if cookie.name == "csrftoken":
-                    csrf_token = cookie.value
-                    break
-            if not csrf_token:
-                csrf_token = str(uuid.uuid4()).replace("-", "") * 2
-                client.cookies.set(
-                    "csrftoken", csrf_token, domain=".leetcode.com", path="/"
-                )
-            base_headers["x-csrftoken"] = csrf_token
-        except Exception:
-            csrf_token = str(uuid.uuid4()).replace("-", "") * 2
-            client.cookies.set(
-                "csrftoken", csrf_token, domain=".leetcode.com", path="/"
-            )
-            base_headers["x-csrftoken"] = csrf_token
-
+    async with leetcode_client() as client:
         query = """
         query userProgressQuestionList($filters: UserProgressQuestionListInput) {
           userProgressQuestionList(filters: $filters) {
@@ -755,16 +593,7 @@ async def fetch_solved_problem_progress(
         page_size = 50
 
         while True:
-            csrf_token = ""
-            for cookie in client.cookies.jar:
-                if cookie.name == "csrftoken":
-                    csrf_token = cookie.value
-                    break
-            if not csrf_token:
-                csrf_token = base_headers.get("x-csrftoken", "")
-
             request_headers = dict(base_headers)
-            request_headers["x-csrftoken"] = csrf_token
             request_headers["random-uuid"] = str(uuid.uuid4())
             request_headers["x-operation-name"] = "userProgressQuestionList"
             request_headers["referer"] = (
@@ -780,10 +609,8 @@ async def fetch_solved_problem_progress(
             try:
                 if skip > 0:
                     await asyncio.sleep(0.5)
-                response = await client.post(
-                    "https://leetcode.com/graphql/",
-                    headers=request_headers,
-                    json=json_data,
+                response = await client.post_graphql(
+                    json_data, headers=request_headers, session=session
                 )
                 if response.status_code != 200:
                     print(
@@ -830,7 +657,7 @@ async def fetch_solved_problem_progress(
 
         if not progress_rows:
             print("userProgressQuestionList API failed or returned empty. Falling back to recentAcSubmissionList...")
-            fallback_slugs = await _fetch_via_recent_ac(client, base_headers, username)
+            fallback_slugs = await _fetch_via_recent_ac(client, base_headers, username, session)
             progress_rows = [
                 {
                     "titleSlug": slug,
@@ -853,7 +680,7 @@ async def fetch_solved_problem_progress(
 
 
 async def _fetch_via_recent_ac(
-    client: httpx.AsyncClient, headers: dict, username: str
+    client, headers: dict, username: str, session: str | None = None
 ) -> list[str]:
     """Fallback: fetch solved slugs via recentAcSubmissionList (public API, limited results)."""
     json_data = {
@@ -869,11 +696,7 @@ async def _fetch_via_recent_ac(
     }
 
     try:
-        response = await client.post(
-            "https://leetcode.com/graphql/",
-            headers=headers,
-            json=json_data,
-        )
+        response = await client.post_graphql(json_data, headers=headers, session=session)
         data = response.json().get("data", {}).get("recentAcSubmissionList", [])
         if data is None:
             data = []
@@ -894,98 +717,10 @@ async def _fetch_via_recent_ac(
 
 
 def recalculate_user_streak(user_id: int, db) -> int:
-    """Recalculate the user's current and max streaks from overall solved history.
-
-    This uses both:
-    - QuestionCompletion timestamps (GamLeet/manual sync history)
-    - LeetCodeSubmission timestamps (raw LeetCode submission cache)
+    """Rebuild the user's streaks from overall solved history (on demand only).
 
-    The union gives a fuller picture than only looking at GamLeet-synced rows.
+    Day-to-day updates are incremental (see helpers.streaks.record_solve_days);
+    this full scan of submissions and completions is for backfills and repairs.
     """
-    from models import LeetCodeSubmission, QuestionCompletion, UserStat
-    from datetime import datetime, timedelta
-    import pytz
-
-    stats = db.query(UserStat).filter(UserStat.user_id == user_id).first()
-    if not stats:
-        return 0
-
-    tz = pytz.timezone("Asia/Kolkata")
-    solved_dates = set()
-
-    def add_local_date(dt):
-        if dt is None:
-            return
-        try:
-            if getattr(dt, "tzinfo", None) is None:
-                dt = pytz.utc.localize(dt)
-            solved_dates.add(dt.astimezone(tz).date())
-        except Exception:
-            return
-
-    submissions = (
-        db.query(LeetCodeSubmission.timestamp)
-        .filter(
-            LeetCodeSubmission.user_id == user_id,
-            LeetCodeSubmission.timestamp.isnot(None),
-        )
-        .all()
-    )
-    for (timestamp,) in submissions:
-        try:
-            add_local_date(datetime.utcfromtimestamp(int(timestamp)))
-        except Exception:
-            continue
-
-    completions = (
-        db.query(QuestionCompletion.rewarded_at)
-        .filter(QuestionCompletion.user_id == user_id)
-        .all()
-    )
-    for (rewarded_at,) in completions:
-        add_local_date(rewarded_at)
-
-    if not solved_dates:
-        stats.current_streak = 0
-        db.commit()
-        return 0
-
-    today = datetime.now(tz).date()
-    yesterday = today - timedelta(days=1)
-
-    # A streak is active if the user solved a problem today or yesterday
-    if today in solved_dates:
-        start_date = today
-    elif yesterday in solved_dates:
-        start_date = yesterday
-    else:
-        stats.current_streak = 0
-        db.commit()
-        return 0
-
-    current_streak = 0
-    check_date = start_date
-    while check_date in solved_dates:
-        current_streak += 1
-        check_date -= timedelta(days=1)
-
-    max_streak = 0
-    previous_date = None
-    running = 0
-    for solved_date in sorted(solved_dates):
-        if previous_date and solved_date == previous_date + timedelta(days=1):
-            running += 1
-        else:
-            running = 1
-        max_streak = max(max_streak, running)
-        previous_date = solved_date
-
-    stats.current_streak = current_streak
-    stats.max_streak = max(stats.max_streak, max_streak)
-
-    db.commit()
-    return current_streak
-
-
-
-# print(fetch_daily_problem())
+    from helpers.streaks import rebuild_user_streak
+    return rebuild_user_streak(user_id, db)
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+LEETCODE_HOME_URL = "https://leetcode.com"
+LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql/"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36"
+
+# How long a primed CSRF token is reused before hitting the homepage again
+CSRF_TTL_SECONDS = int(os.getenv("LEETCODE_CSRF_TTL", "3600"))
+MAX_CACHED_SESSIONS = int(os.getenv("LEETCODE_MAX_SESSIONS", "2048"))
+
+
+class _RejectAllCookies(DefaultCookiePolicy):
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _session_key(session: str) -> str:
+    return hashlib.sha256(session.encode()).hexdigest()
+
+
+def _random_csrf_token() -> str:
+    return str(uuid.uuid4()).replace("-", "") * 2
+
+
+class LeetCodeSessionState:
+    """Per-user cookie jar and CSRF token, kept across requests."""
+
+    def __init__(self, session: str):
+        from helpers.leetcode import extract_uuuserid
+
+        self.cookies = httpx.Cookies()
+        self.cookies.set("LEETCODE_SESSION", session, domain=".leetcode.com", path="/")
+        self.uuuserid = extract_uuuserid(session)
+        if self.uuuserid:
+            self.cookies.set("uuuserid", self.uuuserid, domain=".leetcode.com", path="/")
+        self.csrf_token = None
+        self.primed_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def needs_priming(self) -> bool:
+        return not self.csrf_token or time.monotonic() - self.primed_at > CSRF_TTL_SECONDS
+
+    def cookie_header(self) -> str:
+        return "; ".join(f"{cookie.name}={cookie.value}" for cookie in self.cookies.jar)
+
+    def absorb(self, response: httpx.Response):
+        self.cookies.extract_cookies(response)
+        for cookie in self.cookies.jar:
+            if cookie.name == "csrftoken" and cookie.value:
+                self.csrf_token = cookie.value
+
+
+class LeetCodeClient:
+    """One long-lived, connection-pooled client for all LeetCode GraphQL traffic.
+
+    The underlying httpx client never stores cookies itself; each LeetCode
+    session gets its own jar and cached CSRF token so users never share state.
+    """
+
+    def __init__(
+        self,
+        http2: bool | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+    ):
+        if http2 is None:
+            http2 = os.getenv("LEETCODE_HTTP2", "0") == "1"
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("LEETCODE_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1")
+                http2 = False
+
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("LEETCODE_MAX_CONNECTIONS", "50")),
+            max_keepalive_connections=max_keepalive_connections or int(os.getenv("LEETCODE_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("LEETCODE_KEEPALIVE_EXPIRY", "30")),
+        )
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, read=30.0),
+            limits=self.limits,
+            http2=http2,
+            follow_redirects=True,
+            cookies=CookieJar(policy=_RejectAllCookies()),
+        )
+        self._sessions: OrderedDict[str, LeetCodeSessionState] = OrderedDict()
+        self.loop = None
+        self.counters = {
+            "requests": 0,
+            "errors": 0,
+            "csrf_primes": 0,
+            "csrf_cache_hits": 0,
+            "csrf_retries": 0,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+        self._sessions.clear()
+
+    def _state_for(self, session: str) -> LeetCodeSessionState:
+        key = _session_key(session)
+        state = self._sessions.get(key)
+        if state is None:
+            state = LeetCodeSessionState(session)
+            self._sessions[key] = state
+            while len(self._sessions) > MAX_CACHED_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        return state
+
+    async def _prime(self, state: LeetCodeSessionState, force: bool = False):
+        async with state.lock:
+            if not force and not state.needs_priming():
+                self.counters["csrf_cache_hits"] += 1
+                return
+            self.counters["csrf_primes"] += 1
+            state.csrf_token = None
+            try:
+                response = await self._client.get(
+                    LEETCODE_HOME_URL,
+                    headers={"user-agent": USER_AGENT, "cookie": state.cookie_header()},
+                )
+                state.absorb(response)
+            except Exception as e:
+                print(f"Error priming LeetCode CSRF token: {e}")
+            if not state.csrf_token:
+                state.csrf_token = _random_csrf_token()
+                state.cookies.set("csrftoken", state.csrf_token, domain=".leetcode.com", path="/")
+            state.primed_at = time.monotonic()
+
+    async def post_graphql(
+        self,
+        json_data: dict,
+        headers: dict | None = None,
+        session: str | None = None,
+        content: str | None = None,
+    ) -> httpx.Response:
+        """POST to the GraphQL endpoint, attaching the session's cookies and CSRF token."""
+        from helpers.leetcode import leetcode_rate_limiter
+
+        request_headers = {"user-agent": USER_AGENT, **(headers or {})}
+        state = self._state_for(session) if session else None
+        if state:
+            await self._prime(state)
+
+        for attempt in range(2):
+            if state:
+                request_headers["cookie"] = state.cookie_header()
+                request_headers["x-csrftoken"] = state.csrf_token
+                if state.uuuserid:
+                    request_headers["uuuserid"] = state.uuuserid
+
+            await leetcode_rate_limiter.acquire_async()
+            self.counters["requests"] += 1
+            try:
+                if content is not None:
+                    response = await self._client.post(
+                        LEETCODE_GRAPHQL_URL, headers=request_headers, content=content
+                    )
+                else:
+                    response = await self._client.post(
+                        LEETCODE_GRAPHQL_URL, headers=request_headers, json=json_data
+                    )
+            except Exception:
+                self.counters["errors"] += 1
+                raise
+
+            if state:
+                state.absorb(response)
+                # A rejected CSRF token means the cached one went stale
+                if response.status_code == 403 and attempt == 0:
+                    self.counters["csrf_retries"] += 1
+                    await self._prime(state, force=True)
+                    continue
+            return response
+        return response
+
+    def metrics(self) -> dict:
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            **self.counters,
+            "http2": self.http2,
+            "cached_sessions": len(self._sessions),
+            "pool_max_connections": self.limits.max_connections,
+            "pool_max_keepalive": self.limits.max_keepalive_connections,
+            "pool_connections": len(connections),
+            "pool_idle_connections": sum(1 for c in connections if c.is_idle()),
+        }
+
+
+_shared_client: LeetCodeClient | None = None
+
+
+async def start_leetcode_client() -> LeetCodeClient:
+    global _shared_client
+    _shared_client = LeetCodeClient()
+    _shared_client.loop = asyncio.get_running_loop()
+    return _shared_client
+
+
+async def close_leetcode_client():
+    global _shared_client
+    if _shared_client:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
+def get_leetcode_client() -> LeetCodeClient | None:
+    return _shared_client
+
+
+@asynccontextmanager
+async def leetcode_client():
+    """Yield the app-wide client, or a temporary one outside the API event loop.
+
+    Scheduler threads run their own event loops and cannot reuse connections
+    owned by the FastAPI loop, so they get a short-lived client instead.
+    """
+    client = _shared_client
+    if client is not None and client.loop is asyncio.get_running_loop():
+        yield client
+        return
+
+    client = LeetCodeClient()
+    try:
+        yield client
+    finally:
+        await client.aclose()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import User
+
+# Margins younger than the soft TTL are served as is; older ones (up to the
+# hard TTL, when Redis drops them) are served immediately while a background
+# refresh fetches new ones.
+MARGINS_SOFT_TTL = int(os.getenv("MARGINS_SOFT_TTL", "300"))
+MARGINS_HARD_TTL = int(os.getenv("MARGINS_HARD_TTL", "3600"))
+# Failed lookups (expired Kite session, bad credentials...) are remembered this
+# long; a failed refresh of stale margins keeps serving them and waits as long
+# before trying again
+MARGINS_NEGATIVE_TTL = int(os.getenv("MARGINS_NEGATIVE_TTL", "60"))
+# Cross-process guard so only one API process refreshes a user at a time
+REFRESH_LOCK_TTL = 30
+
+counters = {
+    "hits": 0, "stale": 0, "misses": 0, "negative_hits": 0, "no_credentials": 0,
+    "refreshes": 0, "refresh_errors": 0,
+}
+
+_inflight: dict[int, asyncio.Task] = {}
+
+
+def margins_key(user_id: int) -> str:
+    return f"user:{user_id}:margins"
+
+
+def _refresh_lock_key(user_id: int) -> str:
+    return f"user:{user_id}:margins:refresh"
+
+
+def empty_margins(error: str | None = None) -> dict:
+    margins = {"equity": {"available": {"live_balance": 0}}}
+    if error:
+        margins["error"] = error
+    return margins
+
+
+def _fetch_margins(api_key_token: str, access_token_token: str) -> dict:
+    """Blocking Kite call; run in the threadpool."""
+    from kite import get_kite_client
+    from security import decrypt_token
+
+    kite_client = get_kite_client(decrypt_token(api_key_token))
+    kite_client.set_access_token(decrypt_token(access_token_token))
+    return kite_client.margins()
+
+
+async def _refresh(user_id: int, api_key_token: str, access_token_token: str, redis_conn, locked: bool, stale: dict | None = None) -> dict:
+    counters["refreshes"] += 1
+    failed = False
+    try:
+        try:
+            return await _fetch_and_store(user_id, api_key_token, access_token_token, redis_conn, stale)
+        except Exception:
+            failed = True
+            return stale["data"]
+    finally:
+        if locked:
+            try:
+                if failed:
+                    # Keep the lock so the stale entry isn't refreshed again on every request
+                    await redis_conn.expire(_refresh_lock_key(user_id), MARGINS_NEGATIVE_TTL)
+                else:
+                    await redis_conn.delete(_refresh_lock_key(user_id))
+            except Exception:
+                pass
+
+
+async def _fetch_and_store(user_id: int, api_key_token: str, access_token_token: str, redis_conn, stale: dict | None = None) -> dict:
+    """Fetch and cache the user's margins.
+
+    A failure is cached as a negative entry only on a true miss; when `stale`
+    (the entry being revalidated) is given, the error is raised instead and
+    the stale entry stays cached.
+    """
+    try:
+        margins = await run_in_threadpool(_fetch_margins, api_key_token, access_token_token)
+        entry, ttl = {"fetched_at": time.time(), "data": margins}, MARGINS_HARD_TTL
+    except Exception as e:
+        print(f"Error fetching margins for user {user_id}: {e}")
+        counters["refresh_errors"] += 1
+        if stale is not None:
+            raise
+        margins = empty_margins(str(e))
+        entry, ttl = {"fetched_at": time.time(), "data": margins, "negative": True}, MARGINS_NEGATIVE_TTL
+    try:
+        await redis_conn.set(margins_key(user_id), json.dumps(entry), ex=ttl)
+    except Exception as e:
+        print(f"Failed to cache margins for user {user_id}: {e}")
+    return margins
+
+
+def _single_flight(user, redis_conn, locked: bool = False, stale: dict | None = None) -> asyncio.Task:
+    """The in-flight refresh for this user in this process, starting one if needed."""
+    task = _inflight.get(user.id)
+    if task is None or task.done():
+        task = asyncio.create_task(_refresh(user.id, user.zerodha_api_key, user.access_token, redis_conn, locked, stale))
+        _inflight[user.id] = task
+        task.add_done_callback(lambda _, user_id=user.id: _inflight.pop(user_id, None))
+    return task
+
+
+async def _refresh_in_background(user, redis_conn, stale: dict):
+    if user.id in _inflight:
+        return
+    try:
+        if not await redis_conn.set(_refresh_lock_key(user.id), "1", nx=True, ex=REFRESH_LOCK_TTL):
+            return  # another process is already on it
+    except Exception as e:
+        print(f"Margins refresh lock failed for user {user.id}: {e}")
+        return
+    _single_flight(user, redis_conn, locked=True, stale=stale)
+
+
+async def get_margins(user, redis_conn) -> dict:
+    """The user's Zerodha margins, never waiting on Kite when any cached copy exists."""
+    if not user.access_token or not user.zerodha_api_key:
+        # Answered from the user row itself; nothing to fetch or cache
+        counters["no_credentials"] += 1
+        return empty_margins("No credentials")
+
+    entry = None
+    try:
+        cached = await redis_conn.get(margins_key(user.id))
+        entry = json.loads(cached) if cached else None
+    except Exception as e:
+        print(f"Margins cache lookup failed: {e}")
+
+    if entry is not None:
+        if "fetched_at" not in entry:  # written before soft TTLs existed
+            entry = {"fetched_at": 0, "data": entry}
+        if entry.get("negative"):
+            counters["negative_hits"] += 1
+            return entry["data"]
+        if time.time() - entry["fetched_at"] < MARGINS_SOFT_TTL:
+            counters["hits"] += 1
+        else:
+            counters["stale"] += 1
+            await _refresh_in_background(user, redis_conn, entry)
+        return entry["data"]
+
+    counters["misses"] += 1
+    return await asyncio.shield(_single_flight(user, redis_conn))
+
+
+def invalidate_margins(user_ids):
+    from dependencies import delete_keys
+    delete_keys((margins_key(user_id) for user_id in user_ids), f"Margins cache invalidation for users {list(user_ids)}")
+
+
+def stats() -> dict:
+    lookups = counters["hits"] + counters["stale"] + counters["misses"] + counters["negative_hits"]
+    return {
+        **counters,
+        "hit_ratio": round((counters["hits"] + counters["stale"]) / lookups, 3) if lookups else None,
+        "inflight": len(_inflight),
+    }
+
+
+# New Zerodha credentials or a disconnect make any cached margins (or cached
+# failure) meaningless.
+_CREDENTIAL_COLUMNS = ("access_token", "zerodha_api_key")
+
+
+@event.listens_for(User, "after_update")
+def _credentials_changed(mapper, connection, target):
+    state = inspect(target)
+    if state.session is not None and any(state.attrs[column].history.has_changes() for column in _CREDENTIAL_COLUMNS):
+        state.session.info.setdefault("margins_dirty_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_credential_changes(session):
+    user_ids = session.info.pop("margins_dirty_users", None)
+    if user_ids:
+        invalidate_margins(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_credential_changes(session):
+    session.info.pop("margins_dirty_users", None)
@@ -0,0 +1,282 @@
+import os
+import random
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from decimal import Decimal
+
+import pytz
+from sqlalchemy import func, insert
+
+from helpers.jobs import enqueue_job, job_handler
+from models import PenaltyOrder, User, UserStat
+
+IST = pytz.timezone("Asia/Kolkata")
+# NSE cash market hours; outside them penalties go in as after-market orders
+MARKET_OPEN, MARKET_CLOSE = dtime(9, 15), dtime(15, 30)
+
+# Kite order tags are at most 20 characters
+_TAG_PREFIX = "gl"
+
+# A row still queued or placing this long after its last change has lost its
+# job (the enqueue failed, or the worker died mid-order) and is queued again
+PENALTY_STUCK_AFTER = int(os.getenv("PENALTY_STUCK_AFTER", "300"))
+
+
+def penalty_date(now: datetime | None = None) -> date:
+    return (now or datetime.now(IST)).astimezone(IST).date()
+
+
+def order_variety(now: datetime | None = None) -> str:
+    """"regular" while NSE is open (Mon-Fri 9:15-15:30 IST), otherwise "amo"."""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    if now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE:
+        return "regular"
+    return "amo"
+
+
+def order_tag(user_id: int, day: date) -> str:
+    return f"{_TAG_PREFIX}{day:%y%m%d}{user_id}"[:20]
+
+
+def queue_penalty(db, user_id: int, day: date | None = None) -> bool:
+    """Journal a penalty for `day` and queue its order. Commits.
+
+    The (user_id, penalty_date) unique key makes this idempotent: a second
+    sweep or a retried shard finds the row and queues nothing, unless the
+    earlier attempt failed, in which case the order is retried.
+    """
+    day = day or penalty_date()
+    stmt = (
+        insert(PenaltyOrder.__table__)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    queued = db.execute(stmt, [{"user_id": user_id, "penalty_date": day, "status": "queued", "attempts": 0}]).rowcount == 1
+    if not queued:
+        queued = db.query(PenaltyOrder).filter(
+            PenaltyOrder.user_id == user_id,
+            PenaltyOrder.penalty_date == day,
+            PenaltyOrder.status == "failed",
+        ).update({PenaltyOrder.status: "queued"}, synchronize_session=False) == 1
+    db.commit()
+
+    if queued:
+        enqueue_job("penalty_order", user_id=user_id, params={"penalty_date": day.isoformat()}, priority=True)
+    return queued
+
+
+def requeue_stuck_penalties(db, older_than: int | None = None) -> int:
+    """Queue a job again for penalty rows left queued or placing. Commits.
+
+    A `placing` row goes back to `queued`; its next claim is a retry, which
+    first looks for the tagged order in Kite's order book, so an order that
+    did reach Kite isn't placed twice.
+    """
+    # updated_at is stamped by the database, so compare against its clock
+    if older_than is None:
+        older_than = PENALTY_STUCK_AFTER
+    cutoff = db.query(func.current_timestamp()).scalar() - timedelta(seconds=older_than)
+    stuck = db.query(PenaltyOrder).filter(
+        PenaltyOrder.status.in_(("queued", "placing")),
+        PenaltyOrder.updated_at < cutoff,
+    ).all()
+
+    requeued = 0
+    for order in stuck:
+        user_id, day, status = order.user_id, order.penalty_date, order.status
+        if status == "placing":
+            # Guarded on updated_at: a worker that moved the row on since wins
+            moved = db.query(PenaltyOrder).filter(
+                PenaltyOrder.id == order.id,
+                PenaltyOrder.status == "placing",
+                PenaltyOrder.updated_at == order.updated_at,
+            ).update({PenaltyOrder.status: "queued"}, synchronize_session=False)
+            db.commit()
+            if not moved:
+                continue
+        # A job still waiting on the queue is deduped rather than doubled
+        _, created = enqueue_job("penalty_order", user_id=user_id, params={"penalty_date": day.isoformat()}, priority=True)
+        if created:
+            print(f"Requeued stuck penalty for user {user_id} on {day} (was {status})")
+            requeued += 1
+    db.commit()
+    return requeued
+
+
+def penny_stock_prices(kite_client) -> dict[str, float]:
+    """Last prices of all PENNY_STOCKS from the sweep-wide quote cache in kite.py."""
+    from kite import PENNY_STOCK_INSTRUMENTS, cached_last_prices
+
+    prices = cached_last_prices(kite_client, PENNY_STOCK_INSTRUMENTS)
+    return {instrument.split(":", 1)[1]: price for instrument, price in prices.items()}
+
+
+def prefetch_penny_stock_prices() -> bool:
+    """Warm the quote cache before a sweep with one multi-instrument quote call.
+
+    Uses the deployment's own quote session (KITE_QUOTE_ACCESS_TOKEN); users'
+    Kite sessions are only ever used for their own orders. Without one the
+    first penalty order's cache miss fills the cache for the rest.
+    """
+    from kite import PENNY_STOCK_INSTRUMENTS, get_quote_client, prefetch_quotes
+
+    kite_client = get_quote_client()
+    if kite_client is None:
+        return False
+    prefetch_quotes(kite_client, PENNY_STOCK_INSTRUMENTS)
+    return True
+
+
+def size_penalty(kite_client, risk_amount: int) -> tuple[str, int, float]:
+    """Pick a penny stock and the quantity worth about `risk_amount` INR (at least 1).
+
+    Returns the symbol, quantity and last price (0 when no quote was available).
+    """
+    from kite import PENNY_STOCKS
+
+    symbol = random.choice(PENNY_STOCKS)
+    try:
+        ltp = penny_stock_prices(kite_client).get(symbol) or 0
+    except Exception as e:
+        print(f"Error fetching quote for {symbol}: {e}. Defaulting to Qty=1")
+        return symbol, 1, 0
+    quantity = max(int(risk_amount // ltp), 1) if ltp > 0 else 1
+    print(f"Penalty calculation: Stock={symbol}, LTP={ltp}, Risk={risk_amount}, Qty={quantity}")
+    return symbol, quantity, ltp
+
+
+def _find_tagged_order(kite_client, tag: str) -> str | None:
+    """Order id of an earlier attempt that reached Kite (today's order book)."""
+    for order in kite_client.orders():
+        if order.get("tag") == tag or tag in (order.get("tags") or []):
+            return order.get("order_id")
+    return None
+
+
+def _add_loss(stats: UserStat | None, amount: float):
+    """Add a placed order's value to lifetime_loss (committed with the order's journal entry)."""
+    if stats and amount:
+        stats.lifetime_loss = (stats.lifetime_loss or Decimal("0")) + Decimal(str(amount)).quantize(Decimal("0.01"))
+
+
+def _journal(db, order: PenaltyOrder, **fields):
+    for key, value in fields.items():
+        setattr(order, key, value)
+    db.commit()
+
+
+def execute_zerodha_penalty(db, user_id: int, day: date) -> dict:
+    """Place the journaled penalty order for (user, day), at most once.
+
+    The row is claimed queued -> placing in one UPDATE, so only one worker
+    can act on it. A retry first looks for the tagged order in Kite's order
+    book, in case the previous attempt was placed but never recorded.
+    """
+    claimed = db.query(PenaltyOrder).filter(
+        PenaltyOrder.user_id == user_id,
+        PenaltyOrder.penalty_date == day,
+        PenaltyOrder.status == "queued",
+    ).update(
+        {PenaltyOrder.status: "placing", PenaltyOrder.attempts: PenaltyOrder.attempts + 1},
+        synchronize_session=False,
+    )
+    db.commit()
+    if not claimed:
+        return {"status": "not_queued"}
+
+    order = db.query(PenaltyOrder).filter(PenaltyOrder.user_id == user_id, PenaltyOrder.penalty_date == day).first()
+    try:
+        return _place_claimed_order(db, order)
+    except Exception as e:
+        print(f"Failed to place penalty order for user {user_id}: {e}")
+        db.rollback()
+        _journal(db, order, status="failed", error=str(e))
+        return {"status": "failed"}
+
+
+def _place_claimed_order(db, order: PenaltyOrder) -> dict:
+    from kiteconnect.exceptions import InputException
+    from kite import get_kite_client, place_order
+    from security import decrypt_token
+
+    user_id, day = order.user_id, order.penalty_date
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user or not user.access_token or not user.zerodha_api_key:
+        print(f"User {user_id} has no Zerodha credentials set. Skipping penalty.")
+        _journal(db, order, status="skipped", error="No Zerodha credentials")
+        return {"status": "skipped"}
+
+    kite_client = get_kite_client(decrypt_token(user.zerodha_api_key))
+    kite_client.set_access_token(decrypt_token(user.access_token))
+    tag = order_tag(user_id, day)
+
+    stats = db.query(UserStat).filter(UserStat.user_id == user_id).first()
+    if order.attempts > 1:
+        existing_id = _find_tagged_order(kite_client, tag)
+        if existing_id:
+            # The earlier attempt journaled its symbol and quantity before placing
+            try:
+                ltp = penny_stock_prices(kite_client).get(order.tradingsymbol) or 0
+            except Exception as e:
+                print(f"Error fetching quote for {order.tradingsymbol}: {e}")
+                ltp = 0
+            _add_loss(stats, ltp * (order.quantity or 0))
+            _journal(db, order, status="placed", order_id=existing_id, error=None)
+            return {"status": "placed", "order_id": existing_id}
+
+    risk_amount = stats.daily_risk_amount if stats else 50
+    symbol, quantity, ltp = size_penalty(kite_client, risk_amount)
+    variety = order_variety()
+    _journal(db, order, tradingsymbol=symbol, quantity=quantity, variety=variety)
+
+    def place(variety: str):
+        return place_order(
+            kite_client,
+            variety=variety,
+            tradingsymbol=symbol,
+            exchange=kite_client.EXCHANGE_NSE,
+            transaction_type=kite_client.TRANSACTION_TYPE_BUY,
+            quantity=quantity,
+            order_type=kite_client.ORDER_TYPE_MARKET,
+            product=kite_client.PRODUCT_CNC,
+            validity=kite_client.VALIDITY_DAY,
+            tag=tag,
+        )
+
+    try:
+        order_id = place(variety)
+    except InputException as e:
+        # Exchange holidays look like trading hours to order_variety
+        if variety == kite_client.VARIETY_AMO or "Markets are closed" not in str(e):
+            raise
+        variety = kite_client.VARIETY_AMO
+        order_id = place(variety)
+
+    # Without a quote the order was sized at one share; count the intended risk
+    _add_loss(stats, quantity * ltp if ltp else risk_amount)
+    _journal(db, order, status="placed", order_id=str(order_id), variety=variety, error=None)
+    print(f"Penalty {variety} order placed for user {user_id}. Order ID: {order_id}")
+    _send_penalty_email(user)
+    return {"status": "placed", "order_id": str(order_id)}
+
+
+def _send_penalty_email(user):
+    import resend
+    from helpers.mails import build_penalty_email
+
+    if user.email and getattr(user, "email_notifications", 1):
+        try:
+            resend.Emails.send(build_penalty_email(user.email))
+        except Exception as mail_err:
+            print(f"Failed to send penalty email to {user.email}: {mail_err}")
+
+
+@job_handler("penalty_order")
+def _penalty_order_job(job: dict, report) -> dict:
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return execute_zerodha_penalty(db, job["user_id"], date.fromisoformat(job["params"]["penalty_date"]))
+    finally:
+        db.close()
@@ -1,9 +1,8 @@
-import datetime
 import json
 import os
 import random
 from sqlalchemy.orm import Session
-from models import Question, User, UserStat
+from models import User, UserStat
 
 NEETCODE_150_PATH = os.path.join(os.path.dirname(__file__), "../content/neetcode-150.json")
 
@@ -25,89 +24,75 @@ def get_neetcode150_slugs():
         return []
 
 
-def get_curated_problems_for_user(db: Session, user: User, date_str: str = None):
-    if date_str is None:
-        date_str = datetime.date.today().isoformat()
-        
-    seed = int(date_str.replace("-", ""))
-    random.seed(seed)
+def preference_tuple(allow_paid, problem_set_type=None, problem_set_topics=None, problem_set_sheet=None) -> tuple:
+    """Everything that affects a user's curation, normalized so equal tuples get equal picks.
 
-    # Get user's problem set preferences
-    stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
-    problem_set_type = stats.problem_set_type if stats else "default"
-    problem_set_topics = None
-    problem_set_sheet = None
-    
-    if stats and stats.problem_set_topics:
+    Takes the raw UserStat column values (`problem_set_topics` as stored JSON).
+    """
+    problem_set_type = problem_set_type or "default"
+    topics = ()
+    if problem_set_type == "topics" and problem_set_topics:
         try:
-            problem_set_topics = json.loads(stats.problem_set_topics)
-        except json.JSONDecodeError:
-            problem_set_topics = None
-    
-    if stats:
-        problem_set_sheet = stats.problem_set_sheet
+            topics = tuple(sorted(set(json.loads(problem_set_topics))))
+        except (json.JSONDecodeError, TypeError):
+            topics = ()
+    sheet = problem_set_sheet if problem_set_type == "sheet" else None
+    return (0 if allow_paid == 0 else 1, problem_set_type, topics, sheet)
+
+
+def curate_problems(catalog, preferences: tuple, date_str: str) -> dict:
+    """Pick the day's easy/medium/hard problems for one preference tuple.
+
+    Uses a private RNG seeded from the date, so the result depends only on the
+    arguments and concurrent callers don't disturb each other.
+    """
+    from helpers.catalog import DIFFICULTIES
+
+    allow_paid, problem_set_type, problem_set_topics, problem_set_sheet = preferences
+    rng = random.Random(int(date_str.replace("-", "")))
+
+    # 1. Build the pool of eligible questions from the in-memory catalog
+    eligible = catalog.select(free_only=allow_paid == 0)
 
-    # 1. Build the pool of eligible questions
-    query = db.query(Question.id, Question.title, Question.slug, Question.topics, Question.difficulty, Question.paid_only)
-    
-    if user.allow_paid == 0:
-        query = query.filter(Question.paid_only == 0)
-        
     if problem_set_type == "sheet" and problem_set_sheet == "neetcode150":
-        neetcode_slugs = get_neetcode150_slugs()
-        if neetcode_slugs:
-            query = query.filter(Question.slug.in_(neetcode_slugs))
+        if catalog.by_sheet.get("neetcode150"):
+            eligible &= catalog.by_sheet["neetcode150"]
     elif problem_set_type == "topics" and problem_set_topics:
-        from sqlalchemy import or_
-        topic_conditions = [Question.topics.contains(topic) for topic in problem_set_topics]
-        if topic_conditions:
-            query = query.filter(or_(*topic_conditions))
+        eligible &= catalog.any_topic(problem_set_topics)
 
-    all_eligible = query.all()
+    all_eligible = catalog.positions(eligible)
     
     # 2. Pick 3 questions
     selected_questions = []
     
-    def q_to_dict(q):
-        if not q:
+    def q_to_dict(pos):
+        if pos is None:
             return None
-        return {
-            "id": q.id,
-            "title": q.title,
-            "slug": q.slug,
-            "difficulty": q.difficulty,
-            "topics": q.topics,
-            "paid_only": q.paid_only
-        }
+        row = catalog.row(pos)
+        del row["acc_rate"]
+        return row
 
     if not all_eligible:
         return {"easy": None, "medium": None, "hard": None}
 
     # Group by difficulty (normalized to lowercase)
-    by_diff = {"easy": [], "medium": [], "hard": []}
-    for q in all_eligible:
-        diff_lower = q.difficulty.lower()
-        if diff_lower in by_diff:
-            by_diff[diff_lower].append(q)
-        elif diff_lower == "med": # Handle inconsistencies
-            by_diff["medium"].append(q)
+    by_diff = {diff: catalog.positions(eligible & catalog.by_difficulty.get(diff, 0)) for diff in DIFFICULTIES}
 
     if problem_set_type == "sheet":
         # Random pick 3 from all eligible
         if len(all_eligible) >= 3:
-            selected_questions = random.sample(all_eligible, 3)
+            selected_questions = rng.sample(all_eligible, 3)
         else:
             selected_questions = list(all_eligible)
             while len(selected_questions) < 3 and selected_questions:
-                selected_questions.append(random.choice(all_eligible))
+                selected_questions.append(rng.choice(all_eligible))
     else:
         # Default or Topics -> try 1 of each difficulty
         temp_selected = [None, None, None]
-        diff_order = ["easy", "medium", "hard"]
         
-        for i, diff in enumerate(diff_order):
+        for i, diff in enumerate(DIFFICULTIES):
             if by_diff[diff]:
-                q = random.choice(by_diff[diff])
+                q = rng.choice(by_diff[diff])
                 temp_selected[i] = q
                 by_diff[diff].remove(q)
         
@@ -115,14 +100,14 @@ def get_curated_problems_for_user(db: Session, user: User, date_str: str = None)
         remaining_pool = [q for diff_list in by_diff.values() for q in diff_list]
         for i in range(3):
             if temp_selected[i] is None and remaining_pool:
-                q = random.choice(remaining_pool)
+                q = rng.choice(remaining_pool)
                 temp_selected[i] = q
                 remaining_pool.remove(q)
         
         # Last resort: if we still don't have 3 (pool was very small), just repeat
         while None in temp_selected and all_eligible:
             idx = temp_selected.index(None)
-            temp_selected[idx] = random.choice(all_eligible)
+            temp_selected[idx] = rng.choice(all_eligible)
             
         selected_questions = temp_selected
 
@@ -133,3 +118,34 @@ def get_curated_problems_for_user(db: Session, user: User, date_str: str = None)
         "hard": q_to_dict(selected_questions[2]) if len(selected_questions) > 2 else None
     }
 
+
+def user_preference_tuple(db: Session, user: User) -> tuple:
+    stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
+    if not stats:
+        return preference_tuple(user.allow_paid)
+    return preference_tuple(user.allow_paid, stats.problem_set_type, stats.problem_set_topics, stats.problem_set_sheet)
+
+
+def get_curated_problems_for_user(db: Session, user: User, date_str: str = None):
+    """The user's curated problems for a curation window (default: the live one).
+
+    Served from the 15:15 IST curation batch when the user's preferences still
+    match its picks, otherwise curated now and shared with same-preference users.
+    A fresh curation is only written to `db`; the caller commits it.
+    """
+    from helpers.catalog import get_catalog
+    from helpers.curation import curation_date, load_curation, preference_hash, store_curation
+
+    if date_str is None:
+        date_str = curation_date()
+
+    preferences = user_preference_tuple(db, user)
+    pref_hash = preference_hash(preferences)
+
+    stored = load_curation(db, user.id, date_str, pref_hash)
+    if stored is not None:
+        return stored
+
+    result = curate_problems(get_catalog(db), preferences, date_str)
+    store_curation(db, {pref_hash: result}, {user.id: pref_hash}, date_str)
+    return result
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket usable from both worker threads and coroutines.
+
+    `rate` is the sustained number of requests per second and `burst` the
+    number of requests that may go out back to back before throttling.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = max(float(rate), 0.001)
+        self.burst = max(int(burst or 1), 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str, rate: float, burst: int | None = None) -> RateLimiter:
+    """Return the process-wide limiter for `host`, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = RateLimiter(rate, burst)
+            _limiters[host] = limiter
+        return limiter
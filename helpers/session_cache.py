@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import DateTime, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from helpers.cache import TTLCache
+from models import User
+
+# Redis copies are shared by every API process; the in-process layer is short
+# so a user update made through another process is picked up quickly.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_LOCAL_TTL = float(os.getenv("AUTH_LOCAL_TTL", "30"))
+
+_local_sessions = TTLCache(maxsize=10000, ttl=AUTH_LOCAL_TTL)  # token hash -> (user_id, expires_at)
+_local_users = TTLCache(maxsize=10000, ttl=AUTH_LOCAL_TTL)  # user_id -> column snapshot
+
+counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0}
+
+_DATETIME_COLUMNS = {c.key for c in User.__table__.columns if isinstance(c.type, DateTime)}
+# Plaintext secrets never go to Redis; the snapshot only says whether the
+# LeetCode cookie is set (see leetcode_connected). Routes that need the cookie
+# itself load it from the DB. (Zerodha credentials are stored encrypted.)
+_SECRET_COLUMNS = {"leetcode_session"}
+_SNAPSHOT_COLUMNS = [c.key for c in User.__table__.columns if c.key not in _SECRET_COLUMNS]
+
+
+def token_hash(session_token: str) -> str:
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+
+def _session_key(hashed: str) -> str:
+    return f"auth:session:{hashed}"
+
+
+def _user_key(user_id: int) -> str:
+    return f"auth:user:{user_id}"
+
+
+def snapshot_user(user: User) -> dict:
+    snapshot = {}
+    for key in _SNAPSHOT_COLUMNS:
+        value = getattr(user, key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        snapshot[key] = value
+    snapshot["leetcode_connected"] = bool(user.leetcode_session)
+    return snapshot
+
+
+def user_from_snapshot(snapshot: dict, db) -> User:
+    """Attach a cached user row to `db` without querying the database.
+
+    The instance behaves as if it had just been loaded, so routes can still
+    modify it and commit through the same session.
+    """
+    values = {key: value for key, value in snapshot.items() if key in _SNAPSHOT_COLUMNS}
+    for key in _DATETIME_COLUMNS:
+        if values.get(key):
+            values[key] = datetime.fromisoformat(values[key])
+    user = User(**values)
+    make_transient_to_detached(user)
+    inspect(user).info["leetcode_connected"] = snapshot["leetcode_connected"]
+    db.add(user)
+    return user
+
+
+def leetcode_connected(user: User) -> bool:
+    """Whether the user has a LeetCode cookie, without loading it for cached users.
+
+    Reading `user.leetcode_session` on a user rebuilt from a snapshot would
+    lazy-load it: an extra query on a sync session, MissingGreenlet on an
+    AsyncSession.
+    """
+    state = inspect(user)
+    if "leetcode_session" in state.unloaded and "leetcode_connected" in state.info:
+        return state.info["leetcode_connected"]
+    return bool(user.leetcode_session)
+
+
+def _still_valid(expires_at: float) -> bool:
+    return expires_at > datetime.now().timestamp()
+
+
+async def _session_not_revoked(hashed: str, redis_conn) -> bool:
+    """Logout in any process deletes the Redis session key; local hits check it is still there."""
+    if redis_conn is None:
+        return True
+    try:
+        if await redis_conn.exists(_session_key(hashed)):
+            return True
+    except Exception as e:
+        print(f"Auth cache revocation check failed: {e}")
+        return True
+    _local_sessions.pop(hashed)
+    return False
+
+
+async def get_cached_user_snapshot(session_token: str, redis_conn) -> dict | None:
+    hashed = token_hash(session_token)
+
+    session_entry = _local_sessions.get(hashed)
+    if session_entry and _still_valid(session_entry[1]):
+        snapshot = _local_users.get(session_entry[0])
+        if snapshot and await _session_not_revoked(hashed, redis_conn):
+            counters["local_hits"] += 1
+            return snapshot
+
+    if redis_conn is not None:
+        try:
+            raw_session = await redis_conn.get(_session_key(hashed))
+            if raw_session:
+                user_id, expires_at = json.loads(raw_session)
+                raw_user = await redis_conn.get(_user_key(user_id))
+                snapshot = json.loads(raw_user) if raw_user else None
+                # Snapshots cached before leetcode_connected existed are treated as misses
+                if snapshot and "leetcode_connected" in snapshot and _still_valid(expires_at):
+                    _local_sessions.set(hashed, (user_id, expires_at))
+                    _local_users.set(user_id, snapshot)
+                    counters["redis_hits"] += 1
+                    return snapshot
+        except Exception as e:
+            print(f"Auth cache lookup failed: {e}")
+
+    counters["misses"] += 1
+    return None
+
+
+async def cache_user_session(session_token: str, expires_at: datetime, user: User, redis_conn):
+    hashed = token_hash(session_token)
+    expires_ts = expires_at.timestamp()
+    snapshot = snapshot_user(user)
+
+    _local_sessions.set(hashed, (user.id, expires_ts))
+    _local_users.set(user.id, snapshot)
+
+    if redis_conn is None:
+        return
+    ttl = int(min(AUTH_CACHE_TTL, expires_ts - datetime.now().timestamp()))
+    if ttl <= 0:
+        return
+    try:
+        await redis_conn.set(_session_key(hashed), json.dumps([user.id, expires_ts]), ex=ttl)
+        await redis_conn.set(_user_key(user.id), json.dumps(snapshot), ex=AUTH_CACHE_TTL)
+    except Exception as e:
+        print(f"Auth cache store failed: {e}")
+
+
+async def invalidate_session(session_token: str, redis_conn):
+    """Forget a session token, e.g. on logout."""
+    hashed = token_hash(session_token)
+    _local_sessions.pop(hashed)
+    counters["invalidations"] += 1
+    if redis_conn is not None:
+        try:
+            await redis_conn.delete(_session_key(hashed))
+        except Exception as e:
+            print(f"Auth cache invalidation failed: {e}")
+
+
+def invalidate_users(user_ids):
+    """Drop the cached rows for users whose columns changed."""
+    from dependencies import delete_keys
+
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        _local_users.pop(user_id)
+    counters["invalidations"] += len(user_ids)
+    delete_keys((_user_key(user_id) for user_id in user_ids), f"Auth cache invalidation for users {user_ids}")
+
+
+def stats() -> dict:
+    return {**counters, "local_sessions": len(_local_sessions), "local_users": len(_local_users)}
+
+
+# Any committed change to a users row (credentials, preferences, disconnects...)
+# drops the cached snapshot, wherever in the codebase it was made.
+@event.listens_for(User, "after_update")
+def _mark_user_dirty(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault("auth_dirty_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_dirty_users(session):
+    user_ids = session.info.pop("auth_dirty_users", None)
+    if user_ids:
+        invalidate_users(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_users(session):
+    session.info.pop("auth_dirty_users", None)
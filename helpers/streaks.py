@@ -0,0 +1,158 @@
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+import pytz
+
+from models import LeetCodeSubmission, QuestionCompletion, UserSolveDay, UserStat
+
+# Streak days are calendar days in IST, matching the rest of the daily logic.
+STREAK_TZ = pytz.timezone("Asia/Kolkata")
+
+
+def today_local() -> date:
+    return datetime.now(STREAK_TZ).date()
+
+
+def day_from_timestamp(timestamp) -> date | None:
+    """IST calendar day of a LeetCode epoch timestamp."""
+    try:
+        return datetime.fromtimestamp(int(timestamp), STREAK_TZ).date()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def day_from_datetime(dt: datetime | None) -> date | None:
+    """IST calendar day of a naive-UTC or aware datetime."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = pytz.utc.localize(dt)
+    return dt.astimezone(STREAK_TZ).date()
+
+
+def streaks_from_days(days: Iterable[date], today: date | None = None) -> tuple[int, int, date | None]:
+    """(current_streak, max_streak, last_day) for a set of solve days."""
+    ordered = sorted(set(days))
+    if not ordered:
+        return 0, 0, None
+
+    max_streak = running = 0
+    previous = None
+    for day in ordered:
+        running = running + 1 if previous and day == previous + timedelta(days=1) else 1
+        max_streak = max(max_streak, running)
+        previous = day
+
+    # `running` is the length of the run ending on the last day
+    current = running if is_streak_alive(ordered[-1], today) else 0
+    return current, max_streak, ordered[-1]
+
+
+def is_streak_alive(last_day: date | None, today: date | None = None) -> bool:
+    # A streak is active if the user solved a problem today or yesterday
+    if last_day is None:
+        return False
+    today = today or today_local()
+    return last_day >= today - timedelta(days=1)
+
+
+def record_solve_days(db, user_id: int, days: Iterable[date | None], stats: UserStat | None = None) -> int:
+    """Store new solve days and advance the streak without reading history.
+
+    Days after `streak_last_day` extend or restart the run in O(1). A day older
+    than that (e.g. a history backfill) may bridge a gap, so the streak is
+    recomputed from the stored days instead (one indexed read of the user's
+    distinct days, never the submission history). Does not commit.
+    """
+    days = sorted({day for day in days if day is not None})
+    if not days:
+        return 0
+
+    known = {
+        row[0]
+        for row in db.query(UserSolveDay.day)
+        .filter(UserSolveDay.user_id == user_id, UserSolveDay.day.in_(days))
+        .all()
+    }
+    new_days = [day for day in days if day not in known]
+    if not new_days:
+        return 0
+
+    for day in new_days:
+        db.add(UserSolveDay(user_id=user_id, day=day))
+
+    stats = stats or db.query(UserStat).filter(UserStat.user_id == user_id).first()
+    if not stats:
+        return len(new_days)
+
+    last_day = stats.streak_last_day
+    if last_day is not None and (
+        new_days[0] < last_day
+        # A zeroed streak (decay or penalty) no longer says how long the run
+        # ending at last_day is, so continuing it needs the stored days too
+        or (not stats.current_streak and new_days[0] == last_day + timedelta(days=1))
+    ):
+        db.flush()
+        stored = [row[0] for row in db.query(UserSolveDay.day).filter(UserSolveDay.user_id == user_id).all()]
+        _apply_streaks(stats, stored)
+        return len(new_days)
+
+    current = stats.current_streak or 0
+    max_streak = stats.max_streak or 0
+    for day in new_days:
+        if last_day is not None and day == last_day + timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        last_day = day
+        max_streak = max(max_streak, current)
+
+    stats.current_streak = current
+    stats.streak_last_day = last_day
+    stats.max_streak = max_streak
+    return len(new_days)
+
+
+def decay_streak(stats: UserStat, today: date | None = None) -> bool:
+    """Zero a streak whose last solve day is before yesterday. Returns True if changed."""
+    if stats.current_streak and not is_streak_alive(stats.streak_last_day, today):
+        stats.current_streak = 0
+        return True
+    return False
+
+
+def _apply_streaks(stats: UserStat, days: Iterable[date]):
+    current, max_streak, last_day = streaks_from_days(days)
+    stats.current_streak = current
+    stats.max_streak = max(stats.max_streak or 0, max_streak)
+    stats.streak_last_day = last_day
+
+
+def rebuild_user_streak(user_id: int, db) -> int:
+    """Rebuild solve days and streaks from the full submission/completion history.
+
+    Only needed on demand (first run after the migration, or to repair drift);
+    regular updates go through `record_solve_days`.
+    """
+    stats = db.query(UserStat).filter(UserStat.user_id == user_id).first()
+    if not stats:
+        return 0
+
+    days = set()
+    for (timestamp,) in (
+        db.query(LeetCodeSubmission.timestamp)
+        .filter(LeetCodeSubmission.user_id == user_id, LeetCodeSubmission.timestamp.isnot(None))
+        .all()
+    ):
+        days.add(day_from_timestamp(timestamp))
+    for (rewarded_at,) in db.query(QuestionCompletion.rewarded_at).filter(QuestionCompletion.user_id == user_id).all():
+        days.add(day_from_datetime(rewarded_at))
+    days.discard(None)
+
+    known = {row[0] for row in db.query(UserSolveDay.day).filter(UserSolveDay.user_id == user_id).all()}
+    for day in days - known:
+        db.add(UserSolveDay(user_id=user_id, day=day))
+
+    _apply_streaks(stats, days | known)
+    db.commit()
+    return stats.current_streak
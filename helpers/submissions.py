@@ -0,0 +1,286 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from helpers.jobs import job_handler
+from models import LeetCodeSubmission, LeetCodeSyncState, Question, QuestionCompletion, User, UserStat
+
+# Fetched pages are buffered up to this many rows per INSERT, so a sync holds
+# at most one batch in memory no matter how long the history is.
+SUBMISSION_INGEST_BATCH = int(os.getenv("SUBMISSION_INGEST_BATCH", "500"))
+# Routine syncs stop at the high-water mark; the whole history is walked again
+# this often to pick up anything a partial sync missed.
+FULL_SYNC_INTERVAL = timedelta(days=int(os.getenv("LEETCODE_FULL_SYNC_DAYS", "30")))
+
+# Rows already stored are skipped by uq_user_leetcode_submission
+_INSERT_IGNORE = (
+    insert(LeetCodeSubmission.__table__)
+    .prefix_with("IGNORE", dialect="mysql")
+    .prefix_with("OR IGNORE", dialect="sqlite")
+)
+
+
+def submission_row(user_id: int, item: dict) -> dict | None:
+    submission_id = str(item.get("id") or "").strip()
+    if not submission_id:
+        return None
+    return {
+        "user_id": user_id,
+        "submission_id": submission_id,
+        "title": item.get("title"),
+        "slug": item.get("slug"),
+        "status": item.get("status"),
+        "timestamp": item.get("timestamp"),
+    }
+
+
+def ingest_submission_batch(db, user_id: int, items: list[dict]) -> tuple[int, int]:
+    """Insert one batch of fetched submissions and roll the new ones into activity/streaks. Commits.
+
+    Returns (inserted, duplicates). Known ids are filtered with one indexed
+    IN query so only new rows reach the rollups; the INSERT itself ignores
+    conflicts, so a concurrent sync of the same user can't fail the batch.
+    """
+    from helpers.activity import rebuild_user_activity, record_activity, submission_counts
+    from helpers.streaks import day_from_timestamp, rebuild_user_streak, record_solve_days
+
+    rows, received = {}, 0
+    for item in items:
+        row = submission_row(user_id, item)
+        if row is not None:
+            received += 1
+            rows.setdefault(row["submission_id"], (row, item))
+    if not rows:
+        return 0, 0
+
+    known = {
+        submission_id
+        for (submission_id,) in db.query(LeetCodeSubmission.submission_id).filter(
+            LeetCodeSubmission.user_id == user_id,
+            LeetCodeSubmission.submission_id.in_(list(rows)),
+        )
+    }
+    fresh = [pair for submission_id, pair in rows.items() if submission_id not in known]
+    if not fresh:
+        db.rollback()
+        return 0, received
+
+    result = db.execute(_INSERT_IGNORE, [row for row, _ in fresh])
+    inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(fresh)
+    new_items = [item for _, item in fresh]
+
+    if inserted == len(fresh):
+        record_activity(db, user_id, submission_counts(new_items))
+        record_solve_days(db, user_id, (day_from_timestamp(item.get("timestamp")) for item in new_items))
+        db.commit()
+    else:
+        # Another sync stored some of these rows between the filter and the
+        # insert; we can't tell which, so recount from the stored history.
+        db.commit()
+        rebuild_user_activity(user_id, db)
+        rebuild_user_streak(user_id, db)
+    return inserted, received - inserted
+
+
+async def ingest_submission_pages(db, user_id: int, pages, batch_size: int | None = None,
+                                  on_batch=None) -> tuple[int, int, int]:
+    """Stream an async iterable of submission pages into the database.
+
+    Returns (inserted, duplicates, fetched); `on_batch` gets the running
+    totals after each batch.
+    """
+    batch_size = batch_size or SUBMISSION_INGEST_BATCH
+    inserted = duplicates = fetched = 0
+    buffer: list[dict] = []
+
+    async for page in pages:
+        fetched += len(page)
+        buffer.extend(page)
+        if len(buffer) >= batch_size:
+            added, skipped = ingest_submission_batch(db, user_id, buffer)
+            inserted, duplicates, buffer = inserted + added, duplicates + skipped, []
+            if on_batch:
+                on_batch(inserted, duplicates, fetched)
+
+    if buffer:
+        added, skipped = ingest_submission_batch(db, user_id, buffer)
+        inserted, duplicates = inserted + added, duplicates + skipped
+        if on_batch:
+            on_batch(inserted, duplicates, fetched)
+    return inserted, duplicates, fetched
+
+
+def needs_full_sync(state: LeetCodeSyncState) -> bool:
+    return (
+        state.last_submission_id is None
+        or state.last_full_sync_at is None
+        or datetime.now() - state.last_full_sync_at > FULL_SYNC_INTERVAL
+    )
+
+
+async def sync_submission_history(db, user, since_timestamp: int | None = None, full: bool = False,
+                                  on_batch=None) -> dict:
+    """Sync the user's LeetCode history, fetching only what is newer than the high-water mark.
+
+    Once a full walk has stored the whole history, later syncs stop at the
+    first known submission, so a routine sync is a page or two. The mark only
+    advances when the walk finished, so a failed fetch can't leave a gap.
+    """
+    from helpers.leetcode import iter_submission_pages
+
+    state = db.get(LeetCodeSyncState, user.id) or LeetCodeSyncState(user_id=user.id)
+    full = full or needs_full_sync(state)
+    newest: dict = {}
+    progress: dict = {}
+
+    async def track_newest(pages):
+        async for page in pages:
+            for item in page:
+                timestamp = item.get("timestamp")
+                if item.get("id") and timestamp is not None and timestamp > newest.get("timestamp", -1):
+                    newest.update(id=str(item["id"]), timestamp=timestamp)
+            yield page
+
+    pages = iter_submission_pages(
+        username=user.leetcode_username,
+        session=user.leetcode_session,
+        since_timestamp=since_timestamp,
+        known_id=None if full else state.last_submission_id,
+        known_timestamp=None if full else state.last_submission_timestamp,
+        progress=progress,
+    )
+    inserted, duplicates, fetched = await ingest_submission_pages(db, user.id, track_newest(pages), on_batch=on_batch)
+
+    if progress.get("complete"):
+        now = datetime.now()
+        if newest and newest["timestamp"] >= (state.last_submission_timestamp or 0):
+            state.last_submission_id = newest["id"]
+            state.last_submission_timestamp = newest["timestamp"]
+        state.last_synced_at = now
+        if full and since_timestamp is None:
+            state.last_full_sync_at = now
+        db.merge(state)
+        db.commit()
+
+    return {"inserted": inserted, "duplicates": duplicates, "fetched": fetched, "full": full}
+
+
+async def sync_solved_history(db, user, cutoff_ts: int | None = None) -> dict:
+    """Record solved problems (optionally only those submitted since `cutoff_ts`) as manual completions.
+
+    Problems that already have a completion are skipped, so no XP/coins are
+    awarded twice.
+    """
+    from helpers.leetcode import _parse_leetcode_timestamp, fetch_solved_problem_progress
+
+    progress_rows = await fetch_solved_problem_progress(
+        username=user.leetcode_username,
+        session=user.leetcode_session,
+    )
+
+    if not progress_rows:
+        return {"synced": 0, "skipped": 0, "unmatched": 0}
+
+    solved_rows = [
+        row
+        for row in progress_rows
+        if cutoff_ts is None or _parse_leetcode_timestamp(row.get("lastSubmittedAt")) >= cutoff_ts
+    ]
+
+    if not solved_rows:
+        return {"synced": 0, "skipped": 0, "unmatched": 0}
+
+    slugs = [row.get("titleSlug") for row in solved_rows if row.get("titleSlug")]
+    db_questions = db.query(Question.id, Question.slug).filter(
+        Question.slug.in_(slugs)
+    ).all()
+    slug_to_id = {q.slug: q.id for q in db_questions}
+    unmatched = len([slug for slug in slugs if slug not in slug_to_id])
+
+    matched_ids = list(slug_to_id.values())
+    existing_completions = set()
+    if matched_ids:
+        existing = db.query(QuestionCompletion.question_id).filter(
+            QuestionCompletion.user_id == user.id,
+            QuestionCompletion.question_id.in_(matched_ids)
+        ).all()
+        existing_completions = {c[0] for c in existing}
+
+    synced = 0
+    skipped = 0
+    for row in solved_rows:
+        slug = row.get("titleSlug")
+        if not slug:
+            continue
+
+        qid = slug_to_id.get(slug)
+        if not qid:
+            continue
+
+        if qid in existing_completions:
+            skipped += 1
+            continue
+
+        completion = QuestionCompletion(
+            user_id=user.id,
+            question_id=qid,
+            source="manual",
+        )
+        db.add(completion)
+        existing_completions.add(qid)
+        synced += 1
+
+    if synced > 0:
+        stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
+        if stats:
+            stats.problems_solved += synced
+            # Completions are stamped now, so they count towards today's streak
+            from helpers.streaks import record_solve_days, today_local
+            record_solve_days(db, user.id, [today_local()], stats=stats)
+        from helpers.activity import record_completions
+        record_completions(db, user.id, synced)
+        db.commit()
+    else:
+        db.rollback()
+
+
+    return {"synced": synced, "skipped": skipped, "unmatched": unmatched}
+
+
+def _job_user(db, job: dict):
+    user = db.query(User).filter(User.id == job["user_id"]).first()
+    if not user or not user.leetcode_username or not user.leetcode_session:
+        raise ValueError("LeetCode account not connected")
+    return user
+
+
+@job_handler("leetcode_submissions")
+async def _submissions_job(job: dict, report) -> dict:
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        params = job["params"]
+        return await sync_submission_history(
+            db,
+            _job_user(db, job),
+            since_timestamp=params.get("since_timestamp"),
+            full=params.get("full", False),
+            on_batch=lambda inserted, duplicates, fetched: report(
+                inserted=inserted, duplicates=duplicates, fetched=fetched
+            ),
+        )
+    finally:
+        db.close()
+
+
+@job_handler("leetcode_solved_history")
+async def _solved_history_job(job: dict, report) -> dict:
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return await sync_solved_history(db, _job_user(db, job), job["params"].get("cutoff_ts"))
+    finally:
+        db.close()
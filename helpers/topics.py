@@ -0,0 +1,58 @@
+import re
+
+from models import QuestionTopic, Topic
+
+
+def slugify_topic(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def split_topics(topics: str | None) -> list[str]:
+    """Names from the legacy comma-joined `Question.topics` column."""
+    return [name.strip() for name in (topics or "").split(",") if name.strip()]
+
+
+def ensure_topics(db, tags: dict[str, str]) -> dict[str, int]:
+    """Topic ids for {name: slug}, inserting unknown names. Does not commit."""
+    if not tags:
+        return {}
+    topic_ids = {
+        name: topic_id
+        for topic_id, name in db.query(Topic.id, Topic.name).filter(Topic.name.in_(list(tags))).all()
+    }
+    missing = [Topic(name=name, slug=slug or slugify_topic(name)) for name, slug in tags.items() if name not in topic_ids]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        topic_ids.update({topic.name: topic.id for topic in missing})
+    return topic_ids
+
+
+def set_question_topics(db, topics_by_question: dict[int, list[dict]]):
+    """Replace the topic links of the given questions.
+
+    `topics_by_question` maps question id -> LeetCode topicTags
+    (dicts with `name` and optional `slug`). Does not commit.
+    """
+    if not topics_by_question:
+        return
+    tags = {}
+    for question_tags in topics_by_question.values():
+        for tag in question_tags:
+            if tag.get("name"):
+                tags.setdefault(tag["name"], tag.get("slug"))
+    topic_ids = ensure_topics(db, tags)
+
+    db.query(QuestionTopic).filter(
+        QuestionTopic.question_id.in_(list(topics_by_question))
+    ).delete(synchronize_session=False)
+    links = {
+        (question_id, topic_ids[tag["name"]])
+        for question_id, question_tags in topics_by_question.items()
+        for tag in question_tags
+        if tag.get("name")
+    }
+    if links:
+        db.bulk_insert_mappings(QuestionTopic, [
+            {"question_id": question_id, "topic_id": topic_id} for question_id, topic_id in links
+        ])
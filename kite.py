@@ -1,12 +1,92 @@
+import hashlib
 import os
 from kiteconnect import KiteConnect
 
+from helpers.ratelimit import get_rate_limiter
+
+# Kite allows 10 orders/sec and 1 quote request/sec per API key; stay under both.
+KITE_ORDER_RATE = float(os.getenv("KITE_ORDER_RATE", "8"))
+KITE_QUOTE_RATE = float(os.getenv("KITE_QUOTE_RATE", "1"))
+# Cached last prices are shared by every worker for this long (long enough to cover a sweep)
+QUOTE_CACHE_TTL = int(os.getenv("QUOTE_CACHE_TTL", "300"))
+# Optional Kite session owned by the deployment, used to warm the quote cache
+KITE_QUOTE_API_KEY = os.getenv("KITE_QUOTE_API_KEY") or os.getenv("ZERODHA_API_KEY")
+KITE_QUOTE_ACCESS_TOKEN = os.getenv("KITE_QUOTE_ACCESS_TOKEN")
+
+# Penalty orders buy one of these penny/volatile stocks
+PENNY_STOCKS = ["SUZLON", "IDEA", "YESBANK", "JPPOWER", "UCOBANK"]
+PENNY_STOCK_INSTRUMENTS = [f"NSE:{symbol}" for symbol in PENNY_STOCKS]
+
 def get_kite_client(api_key: str):
     """Factory function to get a Kite client for a specific API key."""
     return KiteConnect(api_key=api_key)
 
+def get_quote_client():
+    """A client on the configured quote session, or None when none is configured."""
+    if not KITE_QUOTE_API_KEY or not KITE_QUOTE_ACCESS_TOKEN:
+        return None
+    client = get_kite_client(KITE_QUOTE_API_KEY)
+    client.set_access_token(KITE_QUOTE_ACCESS_TOKEN)
+    return client
+
 def generate_session(api_key, api_secret, request_token):
     """Generates a session for a specific set of credentials."""
     client = get_kite_client(api_key)
     data = client.generate_session(request_token, api_secret=api_secret)
     return data
+
+
+def _key_limiter(kind: str, api_key: str, rate: float):
+    # Limiters are per API key; the key itself never ends up in the registry
+    digest = hashlib.sha1(api_key.encode()).hexdigest()[:16]
+    return get_rate_limiter(f"kite:{kind}:{digest}", rate)
+
+
+def place_order(client: KiteConnect, **params):
+    """`client.place_order` throttled to the key's order rate limit."""
+    _key_limiter("orders", client.api_key, KITE_ORDER_RATE).acquire()
+    return client.place_order(**params)
+
+
+def get_quotes(client: KiteConnect, instruments: list[str]) -> dict:
+    """One multi-instrument `client.quote` call, throttled to the key's quote rate limit."""
+    _key_limiter("quote", client.api_key, KITE_QUOTE_RATE).acquire()
+    return client.quote(instruments)
+
+
+def _quote_key(instrument: str) -> str:
+    return f"kite:quote:{instrument}"
+
+
+def _cache_prices(prices: dict[str, float]):
+    from dependencies import get_sync_redis_client
+    try:
+        pipe = get_sync_redis_client().pipeline(transaction=False)
+        for instrument, price in prices.items():
+            pipe.set(_quote_key(instrument), price, ex=QUOTE_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        print(f"Failed to cache quotes: {e}")
+
+
+def prefetch_quotes(client: KiteConnect, instruments: list[str]) -> dict[str, float]:
+    """Fetch last prices for all `instruments` in one quote call and cache them in Redis."""
+    prices = {instrument: quote["last_price"] for instrument, quote in get_quotes(client, instruments).items()}
+    _cache_prices(prices)
+    return prices
+
+
+def cached_last_prices(client: KiteConnect, instruments: list[str]) -> dict[str, float]:
+    """Last prices from the Redis quote cache; any misses are fetched together in one call."""
+    from dependencies import get_sync_redis_client
+    try:
+        cached = get_sync_redis_client().mget([_quote_key(instrument) for instrument in instruments])
+    except Exception as e:
+        print(f"Quote cache lookup failed: {e}")
+        cached = [None] * len(instruments)
+
+    prices = {instrument: float(value) for instrument, value in zip(instruments, cached) if value is not None}
+    missing = [instrument for instrument in instruments if instrument not in prices]
+    if missing:
+        prices.update(prefetch_quotes(client, missing))
+    return prices
@@ -1,11 +1,14 @@
-import random
-import time
-import requests
+import asyncio
+import hashlib
+import json
 import os
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from database import get_db
-from dependencies import verify_admin_access
+import threading
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from database import SessionLocal
+from dependencies import get_sync_redis_client, verify_admin_access
+from helpers.topics import set_question_topics
 from models import Question
 
 cookies = {
@@ -38,161 +41,302 @@ headers = {
     "sec-gpc": "1",
     "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
 }
-leetcode_data_router = APIRouter()
 
+PAGE_SIZE = 100
+CATALOG_SYNC_CONCURRENCY = int(os.getenv("CATALOG_SYNC_CONCURRENCY", "4"))
 
-@leetcode_data_router.get("/test")
-async def load_leetcode_questions(db: Session = Depends(get_db)):
-    has_more = True
-    offset = 0
-    while has_more:
-        json_data = {
-            "query": "\n    query problemsetQuestionListV2($filters: QuestionFilterInput, $limit: Int, $searchKeyword: String, $skip: Int, $sortBy: QuestionSortByInput, $categorySlug: String) {\n  problemsetQuestionListV2(\n    filters: $filters\n    limit: $limit\n    searchKeyword: $searchKeyword\n    skip: $skip\n    sortBy: $sortBy\n    categorySlug: $categorySlug\n  ) {\n    questions {\n      id\n      titleSlug\n      title\n      translatedTitle\n      questionFrontendId\n      paidOnly\n      difficulty\n      topicTags {\n        name\n        slug\n        nameTranslated\n      }\n      status\n      isInMyFavorites\n      frequency\n      acRate\n      contestPoint\n    }\n    totalLength\n    finishedLength\n    hasMore\n  }\n}\n    ",
-            "variables": {
-                "skip": offset,
-                "limit": 100,
-                "categorySlug": "all-code-essentials",
-                "filters": {
-                    "filterCombineType": "ALL",
-                    "statusFilter": {
-                        "questionStatuses": [],
-                        "operator": "IS",
-                    },
-                    "difficultyFilter": {
-                        "difficulties": [],
-                        "operator": "IS",
-                    },
-                    "languageFilter": {
-                        "languageSlugs": [],
-                        "operator": "IS",
-                    },
-                    "topicFilter": {
-                        "topicSlugs": [],
-                        "operator": "IS",
-                    },
-                    "acceptanceFilter": {},
-                    "frequencyFilter": {},
-                    "frontendIdFilter": {},
-                    "lastSubmittedFilter": {},
-                    "publishedFilter": {},
-                    "companyFilter": {
-                        "companySlugs": [],
-                        "operator": "IS",
-                    },
-                    "positionFilter": {
-                        "positionSlugs": [],
-                        "operator": "IS",
-                    },
-                    "contestPointFilter": {
-                        "contestPoints": [],
-                        "operator": "IS",
-                    },
-                    "premiumFilter": {
-                        "premiumStatus": [],
-                        "operator": "IS",
-                    },
-                },
-                "searchKeyword": "",
-                "sortBy": {
-                    "sortField": "FRONTEND_ID",
-                    "sortOrder": "ASCENDING",
-                },
-                "filtersV2": {
-                    "filterCombineType": "ALL",
-                    "statusFilter": {
-                        "questionStatuses": [],
-                        "operator": "IS",
-                    },
-                    "difficultyFilter": {
-                        "difficulties": [],
-                        "operator": "IS",
-                    },
-                    "languageFilter": {
-                        "languageSlugs": [],
-                        "operator": "IS",
-                    },
-                    "topicFilter": {
-                        "topicSlugs": [],
-                        "operator": "IS",
-                    },
-                    "acceptanceFilter": {},
-                    "frequencyFilter": {},
-                    "frontendIdFilter": {},
-                    "lastSubmittedFilter": {},
-                    "publishedFilter": {},
-                    "companyFilter": {
-                        "companySlugs": [],
-                        "operator": "IS",
-                    },
-                    "positionFilter": {
-                        "positionSlugs": [],
-                        "operator": "IS",
-                    },
-                    "contestPointFilter": {
-                        "contestPoints": [],
-                        "operator": "IS",
-                    },
-                    "premiumFilter": {
-                        "premiumStatus": [],
-                        "operator": "IS",
-                    },
+# Next offset to fetch; survives an interrupted run so the next one resumes
+CHECKPOINT_KEY = "catalog:sync:offset"
+PROGRESS_KEY = "catalog:sync:progress"
+LOCK_KEY = "catalog:sync:lock"
+LOCK_TTL = 600  # refreshed after every page
+
+
+def _question_list_payload(offset: int, limit: int = PAGE_SIZE) -> dict:
+    return {
+        "query": "\n    query problemsetQuestionListV2($filters: QuestionFilterInput, $limit: Int, $searchKeyword: String, $skip: Int, $sortBy: QuestionSortByInput, $categorySlug: String) {\n  problemsetQuestionListV2(\n    filters: $filters\n    limit: $limit\n    searchKeyword: $searchKeyword\n    skip: $skip\n    sortBy: $sortBy\n    categorySlug: $categorySlug\n  ) {\n    questions {\n      id\n      titleSlug\n      title\n      translatedTitle\n      questionFrontendId\n      paidOnly\n      difficulty\n      topicTags {\n        name\n        slug\n        nameTranslated\n      }\n      status\n      isInMyFavorites\n      frequency\n      acRate\n      contestPoint\n    }\n    totalLength\n    finishedLength\n    hasMore\n  }\n}\n    ",
+        "variables": {
+            "skip": offset,
+            "limit": limit,
+            "categorySlug": "all-code-essentials",
+            "filters": {
+                "filterCombineType": "ALL",
+                "statusFilter": {
+                    "questionStatuses": [],
+                    "operator": "IS",
+                },
+                "difficultyFilter": {
+                    "difficulties": [],
+                    "operator": "IS",
+                },
+                "languageFilter": {
+                    "languageSlugs": [],
+                    "operator": "IS",
                 },
+                "topicFilter": {
+                    "topicSlugs": [],
+                    "operator": "IS",
+                },
+                "acceptanceFilter": {},
+                "frequencyFilter": {},
+                "frontendIdFilter": {},
+                "lastSubmittedFilter": {},
+                "publishedFilter": {},
+                "companyFilter": {
+                    "companySlugs": [],
+                    "operator": "IS",
+                },
+                "positionFilter": {
+                    "positionSlugs": [],
+                    "operator": "IS",
+                },
+                "contestPointFilter": {
+                    "contestPoints": [],
+                    "operator": "IS",
+                },
+                "premiumFilter": {
+                    "premiumStatus": [],
+                    "operator": "IS",
+                },
+            },
+            "searchKeyword": "",
+            "sortBy": {
+                "sortField": "FRONTEND_ID",
+                "sortOrder": "ASCENDING",
             },
-            "operationName": "problemsetQuestionListV2",
-        }
+            "filtersV2": {
+                "filterCombineType": "ALL",
+                "statusFilter": {
+                    "questionStatuses": [],
+                    "operator": "IS",
+                },
+                "difficultyFilter": {
+                    "difficulties": [],
+                    "operator": "IS",
+                },
+                "languageFilter": {
+                    "languageSlugs": [],
+                    "operator": "IS",
+                },
+                "topicFilter": {
+                    "topicSlugs": [],
+                    "operator": "IS",
+                },
+                "acceptanceFilter": {},
+                "frequencyFilter": {},
+                "frontendIdFilter": {},
+                "lastSubmittedFilter": {},
+                "publishedFilter": {},
+                "companyFilter": {
+                    "companySlugs": [],
+                    "operator": "IS",
+                },
+                "positionFilter": {
+                    "positionSlugs": [],
+                    "operator": "IS",
+                },
+                "contestPointFilter": {
+                    "contestPoints": [],
+                    "operator": "IS",
+                },
+                "premiumFilter": {
+                    "premiumStatus": [],
+                    "operator": "IS",
+                },
+            },
+        },
+        "operationName": "problemsetQuestionListV2",
+    }
+
+
+def _request_headers() -> dict:
+    cookie = "; ".join(f"{name}={value}" for name, value in cookies.items() if value)
+    return {**headers, "cookie": cookie}
+
+
+async def _fetch_page(client, offset: int) -> tuple[list[dict], int, bool]:
+    response = await client.post_graphql(_question_list_payload(offset), headers=_request_headers())
+    response.raise_for_status()
+    data = response.json()["data"]["problemsetQuestionListV2"]
+    return data.get("questions") or [], data.get("totalLength") or 0, bool(data.get("hasMore"))
+
+
+def _format_acc_rate(value) -> str | None:
+    # Stored as decimal(4,2)-style text; rounding also keeps the hash stable
+    try:
+        return f"{float(value):.2f}"
+    except (TypeError, ValueError):
+        return None
+
+
+def question_row(question: dict) -> dict:
+    tags = question.get("topicTags") or []
+    row = {
+        "id": int(question["id"]),
+        "title": question["title"],
+        "slug": question["titleSlug"],
+        "acc_rate": _format_acc_rate(question.get("acRate")),
+        "paid_only": 1 if question.get("paidOnly") else 0,
+        "difficulty": question["difficulty"],
+        "topics": ", ".join(tag["name"] for tag in tags),
+    }
+    fingerprint = json.dumps([row, [tag.get("slug") for tag in tags]], sort_keys=True)
+    row["content_hash"] = hashlib.sha1(fingerprint.encode()).hexdigest()
+    return row
 
-        response = requests.post(
-            "https://leetcode.com/graphql/", headers=headers, json=json_data
+
+def _upsert_questions(db, rows: list[dict]):
+    table = Question.__table__
+    columns = [column for column in rows[0] if column != "id"]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in columns})
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"], set_={column: stmt.excluded[column] for column in columns}
         )
+    else:
+        for row in rows:
+            db.merge(Question(**row))
+        return
+    db.execute(stmt, rows)
+
+
+def _apply_page(questions: list[dict]) -> tuple[int, int]:
+    """Write the questions whose content hash changed. Returns (changed, unchanged)."""
+    rows = {row["id"]: row for row in map(question_row, questions)}
+    if not rows:
+        return 0, 0
 
-        questions = (
-            response.json()
-            .get("data", {})
-            .get("problemsetQuestionListV2", {})
-            .get("questions", [])
+    db = SessionLocal()
+    try:
+        known = dict(
+            db.query(Question.id, Question.content_hash).filter(Question.id.in_(list(rows))).all()
         )
-        for question in questions:
-            question_id = question.get("id")
-            title = question.get("title")
-            title_slug = question.get("titleSlug")
-            acc_rate = question.get("acRate")
-            paid_only = question.get("paidOnly")
-            difficulty = question.get("difficulty")
-            topics = ", ".join(tag.get("name") for tag in question.get("topicTags", []))
-            print(
-                f"ID: {question_id}-{difficulty}, TitleSlug: {title_slug}, AccRate: {acc_rate}, PaidOnly: {paid_only}, Topics: {topics}"
-            )
-
-         # Build insert statement
-        existing_ids = {
-            q.id for q in db.query(Question.id).all()
-        }
-
-        new_objs = []
-        for q in questions:
-            q_data = {
-                "title": q["title"],
-                "slug": q["titleSlug"],
-                "acc_rate": q["acRate"],
-                "paid_only": q["paidOnly"],
-                "difficulty": q["difficulty"],
-                "topics": ", ".join(tag["name"] for tag in q.get("topicTags", [])),
-            }
-
-            if q["id"] in existing_ids:
-                db.query(Question).filter_by(id=q["id"]).update(q_data)
-            else:
-                q_data["id"] = q["id"]
-                new_objs.append(Question(**q_data))
-
-        if new_objs:
-            db.bulk_save_objects(new_objs)
-
-        db.commit()
-        
-        has_more = response.json()['data']['problemsetQuestionListV2']['hasMore']
-        offset += 100
-        time.sleep(random.uniform(0,0.5))
-        
-        
-    return {"msg":"Data Loaded successfully"}
+        changed = [row for question_id, row in rows.items() if known.get(question_id) != row["content_hash"]]
+        if changed:
+            changed_ids = {row["id"] for row in changed}
+            _upsert_questions(db, changed)
+            set_question_topics(db, {
+                int(question["id"]): question.get("topicTags") or []
+                for question in questions
+                if int(question["id"]) in changed_ids
+            })
+            db.commit()
+        return len(changed), len(rows) - len(changed)
+    finally:
+        db.close()
+
+
+def _save_progress(progress: dict):
+    try:
+        get_sync_redis_client().hset(PROGRESS_KEY, mapping={key: str(value) for key, value in progress.items()})
+    except Exception as e:
+        print(f"Failed to save catalog sync progress: {e}")
+
+
+async def sync_catalog(resume: bool = True, concurrency: int = CATALOG_SYNC_CONCURRENCY) -> dict:
+    """Fetch the LeetCode problem list and upsert changed questions.
+
+    Pages are fetched `concurrency` at a time (the shared LeetCode rate limit
+    still applies) and applied in order, checkpointing the offset after each
+    page so an interrupted run resumes where it stopped.
+    """
+    from helpers.catalog import bump_catalog_version
+    from helpers.leetcode_client import leetcode_client
+
+    redis_conn = get_sync_redis_client()
+    offset = int(redis_conn.get(CHECKPOINT_KEY) or 0) if resume else 0
+    progress = {
+        "status": "running", "started_at": int(time.time()), "finished_at": "",
+        "resumed_from": offset, "offset": offset, "total": 0,
+        "pages": 0, "changed": 0, "unchanged": 0, "error": "",
+    }
+    _save_progress(progress)
+
+    try:
+        async with leetcode_client() as client:
+            questions, total, has_more = await _fetch_page(client, offset)
+            progress["total"] = total
+            pending = [(offset, questions)]
+
+            while pending:
+                for page_offset, page in pending:
+                    changed, unchanged = await run_in_threadpool(_apply_page, page)
+                    progress["pages"] += 1
+                    progress["changed"] += changed
+                    progress["unchanged"] += unchanged
+                    progress["offset"] = min(page_offset + PAGE_SIZE, progress["total"])
+                    redis_conn.set(CHECKPOINT_KEY, progress["offset"])
+                    redis_conn.expire(LOCK_KEY, LOCK_TTL)
+                    _save_progress(progress)
+
+                next_offset = pending[-1][0] + PAGE_SIZE
+                if not has_more or next_offset >= total:
+                    break
+                offsets = list(range(next_offset, min(total, next_offset + concurrency * PAGE_SIZE), PAGE_SIZE))
+                pages = await asyncio.gather(*(_fetch_page(client, page_offset) for page_offset in offsets))
+                has_more = pages[-1][2]
+                pending = [(page_offset, page[0]) for page_offset, page in zip(offsets, pages) if page[0]]
+
+        redis_conn.delete(CHECKPOINT_KEY)
+        progress.update(status="done", finished_at=int(time.time()))
+        if progress["changed"]:
+            bump_catalog_version()
+    except Exception as e:
+        print(f"Catalog sync failed at offset {progress['offset']}: {e}")
+        progress.update(status="failed", finished_at=int(time.time()), error=str(e))
+
+    _save_progress(progress)
+    print(f"Catalog sync finished: {progress}")
+    return progress
+
+
+def start_catalog_sync(resume: bool = True) -> bool:
+    """Run `sync_catalog` on a background thread unless one is already running."""
+    if not get_sync_redis_client().set(LOCK_KEY, "1", nx=True, ex=LOCK_TTL):
+        return False
+
+    def run():
+        try:
+            asyncio.run(sync_catalog(resume=resume))
+        finally:
+            get_sync_redis_client().delete(LOCK_KEY)
+
+    threading.Thread(target=run, daemon=True, name="catalog-sync").start()
+    return True
+
+
+def catalog_sync_progress() -> dict:
+    raw = get_sync_redis_client().hgetall(PROGRESS_KEY)
+    progress = {key.decode(): value.decode() for key, value in raw.items()}
+    return progress or {"status": "never_run"}
+
+
+leetcode_data_router = APIRouter()
+
+
+@leetcode_data_router.get("/test")
+async def load_leetcode_questions():
+    """Kick off a catalog sync (kept for existing callers; see /catalog/sync)."""
+    if not start_catalog_sync(resume=True):
+        return {"msg": "Catalog sync already running"}
+    return {"msg": "Catalog sync started"}
+
+
+@leetcode_data_router.post("/catalog/sync", status_code=202, dependencies=[Depends(verify_admin_access)])
+async def start_catalog_sync_job(restart: bool = False):
+    """Start a background catalog sync, resuming from the last checkpoint unless `restart`."""
+    if not start_catalog_sync(resume=not restart):
+        raise HTTPException(status_code=409, detail="A catalog sync is already running")
+    return {"status": "started", "progress": catalog_sync_progress()}
+
+
+@leetcode_data_router.get("/catalog/sync", dependencies=[Depends(verify_admin_access)])
+async def get_catalog_sync_status():
+    return catalog_sync_progress()
@@ -12,12 +12,11 @@ import models # Ensure all models are registered for Base.metadata.create_all
 from models import User, UserStat  # Models to be created in DB when API starts
 from scheduler import (
     is_leetcode_solved_today,
-    schedule_daily_check,
     check_dsa_completion,
 )
 from sqlalchemy.orm import Session
 from leetcode.load_questions import leetcode_data_router
-from routes import daily, user, leaderboard, auth, problems
+from routes import daily, user, leaderboard, auth, problems, metrics, jobs
 from contextlib import asynccontextmanager
 import os
 
@@ -54,9 +53,6 @@ app.add_middleware(
 # Removed redundant get_db definition as it's now imported from database.py
 
 
-# Schedule the daily check
-schedule_daily_check()
-
 @app.get("/")
 async def root():
     return {"message": "Welcome to the GamLeet API!"}
@@ -133,3 +129,5 @@ app.include_router(user.router)
 app.include_router(leaderboard.router)
 app.include_router(auth.router)
 app.include_router(problems.router)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
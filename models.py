@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import CHAR, DECIMAL, Column, Date, Integer, DateTime, VARCHAR, TEXT, UniqueConstraint
+from sqlalchemy import CHAR, DECIMAL, Column, Date, Index, Integer, DateTime, VARCHAR, TEXT, UniqueConstraint
 from sqlalchemy.sql import func
 import uuid
 
@@ -45,6 +45,26 @@ class Question(Base):
     paid_only = Column(Integer, default=0)  # Using Integer to represent tinyint
     title = Column(VARCHAR(100), nullable=False)
     difficulty = Column(VARCHAR(100), nullable=False)
+    content_hash = Column(CHAR(40), nullable=True)  # sha1 of the synced fields; unchanged rows are skipped
+
+
+class Topic(Base):
+    __tablename__ = "topics"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(VARCHAR(100), unique=True, nullable=False)  # e.g. "Dynamic Programming"
+    slug = Column(VARCHAR(100), unique=True, nullable=False)  # e.g. "dynamic-programming"
+
+
+class QuestionTopic(Base):
+    __tablename__ = "question_topics"
+    __table_args__ = (
+        # PK serves "topics of a question", this one "questions with a topic"
+        Index("ix_question_topics_topic_question", "topic_id", "question_id"),
+    )
+
+    question_id = Column(Integer, primary_key=True)
+    topic_id = Column(Integer, primary_key=True)
 
 
 class UserStat(Base):
@@ -66,7 +86,7 @@ class UserStat(Base):
     risk_locked = Column(Integer, default=0, nullable=False) # 0 = False, 1 = True
     powerups_used_today = Column(Integer, default=0, nullable=False)
     gamcoins = Column(Integer, default=0, nullable=False)
-    total_xp = Column(Integer, default=0, nullable=False)
+    total_xp = Column(Integer, default=0, nullable=False, index=True)
 
     # Problem Set Preferences
     problem_set_type = Column(VARCHAR(20), default="default", nullable=False)  # "default", "topics", "sheet"
@@ -74,6 +94,8 @@ class UserStat(Base):
     problem_set_sheet = Column(VARCHAR(50), nullable=True)  # e.g., "neetcode150"
 
     last_activity_date = Column(Date, nullable=True)
+    streak_last_day = Column(Date, nullable=True)  # Most recent day counted in current_streak (IST)
+    last_miss_date = Column(Date, nullable=True)  # Last penalty day (IST) whose miss rules were applied
 
     created_at = Column(
         DateTime,
@@ -97,6 +119,9 @@ class UserInventory(Base):
 
 class UserAchievement(Base):
     __tablename__ = "user_achievements"
+    __table_args__ = (
+        UniqueConstraint("user_id", "achievement_id", name="uq_user_achievement"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, nullable=False, index=True)
@@ -114,6 +139,45 @@ class QuestionCompletion(Base):
     rewarded_at = Column(DateTime, server_default=func.current_timestamp())
 
 
+class UserSolveDay(Base):
+    __tablename__ = "user_solve_days"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_user_solve_day"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    day = Column(Date, nullable=False)  # Calendar day (IST) with at least one submission or completion
+
+
+class DailyCuration(Base):
+    __tablename__ = "daily_curation"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uq_daily_curation_user_date"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False, index=True)  # Curation window (starts 3:30 PM IST that day)
+    preferences_hash = Column(VARCHAR(40), nullable=True)  # Preference tuple the picks were made for
+    problems = Column(TEXT, nullable=False)  # JSON: {"easy": {...}, "medium": {...}, "hard": {...}}
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+
+
+class UserDailyActivity(Base):
+    __tablename__ = "user_daily_activity"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uq_user_daily_activity"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)  # Leading column of uq_user_daily_activity
+    date = Column(Date, nullable=False)  # UTC day
+    submissions = Column(Integer, default=0, nullable=False)
+    accepted = Column(Integer, default=0, nullable=False)
+    completions = Column(Integer, default=0, nullable=False)
+
+
 class LeetCodeSubmission(Base):
     __tablename__ = "leetcode_submissions"
     __table_args__ = (
@@ -130,6 +194,38 @@ class LeetCodeSubmission(Base):
     synced_at = Column(DateTime, server_default=func.current_timestamp(), nullable=False)
 
 
+class LeetCodeSyncState(Base):
+    """Per-user high-water mark of the LeetCode submission history sync."""
+    __tablename__ = "leetcode_sync_state"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    last_submission_id = Column(VARCHAR(50), nullable=True)  # newest stored submission
+    last_submission_timestamp = Column(Integer, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)
+    last_full_sync_at = Column(DateTime, nullable=True)  # last complete walk of the history
+
+
+class PenaltyOrder(Base):
+    """Journal of penalty orders; one row per user per penalty day, so a day is never penalized twice."""
+    __tablename__ = "penalty_orders"
+    __table_args__ = (
+        UniqueConstraint("user_id", "penalty_date", name="uq_penalty_order_user_date"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)  # Leading column of uq_penalty_order_user_date
+    penalty_date = Column(Date, nullable=False)  # IST day of the sweep
+    status = Column(VARCHAR(20), default="queued", nullable=False)  # queued | placing | placed | failed | skipped
+    tradingsymbol = Column(VARCHAR(30), nullable=True)
+    quantity = Column(Integer, nullable=True)
+    variety = Column(VARCHAR(10), nullable=True)  # regular | amo
+    order_id = Column(VARCHAR(50), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(TEXT, nullable=True)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
 class UserSession(Base):
     __tablename__ = "user_sessions"
 
@@ -10,7 +10,7 @@ import secrets
 from datetime import datetime, timedelta
 from database import get_db
 from models import User, UserStat, UserInventory, UserSession
-from dependencies import get_current_user
+from dependencies import get_current_user, get_redis_client
 from schemas.user_stats import UserStatsResponse
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -168,11 +168,19 @@ async def dev_login(request: Request, response: Response, db: Session = Depends(
     return {"message": "Dev Login successful", "user": {"email": user.email, "name": user.name}}
 
 @router.post("/logout")
-async def logout(request: Request, response: Response, db: Session = Depends(get_db)):
+async def logout(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    redis_conn = Depends(get_redis_client),
+):
     session_token = request.cookies.get("session_token")
     if session_token:
+        from helpers.session_cache import invalidate_session
+
         db.query(UserSession).filter(UserSession.session_token == session_token).delete()
         db.commit()
+        await invalidate_session(session_token, redis_conn)
 
     response.delete_cookie("session_token")
     return {"message": "Logged out successfully"}
@@ -1,12 +1,11 @@
-import datetime
 from decimal import Decimal
-import random
-import json
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import Question
-from database import get_db
-from dependencies import get_redis_client, get_current_user
+from database import get_async_db
+from dependencies import get_redis_client, get_current_user_async
+from helpers.curation import curation_date, load_curation_async
 import redis.asyncio as redis
 
 router = APIRouter()
@@ -19,25 +18,21 @@ def json_safe(obj):
 
 @router.get("/daily-questions")
 async def get_daily_questions(
-    user = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
     redis_conn: redis.Redis = Depends(get_redis_client),
 ):
-    today = datetime.date.today().isoformat()
+    # Curation rolls over at 3:30 PM IST, not at midnight
+    today = curation_date()
     
-    # 1. Try to get questions from cache
-    # Include allow_paid in cache key since it changes the result set
-    cache_key = f"daily_questions:{today}:paid_{user.allow_paid}"
-    cached_questions = await redis_conn.get(cache_key)
+    # 1. Read the picks precomputed by the curation batch (shared by preference hash)
+    result = await load_curation_async(redis_conn, user.id, today)
     
-    if cached_questions:
-        result = json.loads(cached_questions)
-    else:
+    if result is None:
+        # Not in Redis: daily_curation table, or curate now for new users
         from helpers.problems import get_curated_problems_for_user
-        result = get_curated_problems_for_user(db, user, today)
-        
-        # Save to cache for 24 hours
-        await redis_conn.setex(cache_key, 86400, json.dumps(result))
+        result = await db.run_sync(get_curated_problems_for_user, user, today)
+        await db.commit()
 
     # 2. Check status via database (Only shows as completed if synced)
     from models import QuestionCompletion
@@ -45,10 +40,12 @@ async def get_daily_questions(
     
     completions = []
     if question_ids:
-        completions = db.query(QuestionCompletion.question_id).filter(
-            QuestionCompletion.user_id == user.id,
-            QuestionCompletion.question_id.in_(question_ids)
-        ).all()
+        completions = (await db.execute(
+            select(QuestionCompletion.question_id).where(
+                QuestionCompletion.user_id == user.id,
+                QuestionCompletion.question_id.in_(question_ids)
+            )
+        )).all()
         
     completed_ids = {c[0] for c in completions}
 
@@ -58,8 +55,8 @@ async def get_daily_questions(
             is_completed = result[key]["id"] in completed_ids
             result[key]["status"] = "completed" if is_completed else "unattempted"
 
-    from helpers.leetcode import fetch_daily_problem, is_leetcode_solved_today
-    daily_problem_data = fetch_daily_problem()
+    from helpers.daily_problem import get_daily_problem_async
+    daily_problem_data = await get_daily_problem_async(redis_conn)
     
     # Check status of daily problem
     daily_status = "unattempted"
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from dependencies import get_current_user_async
+from helpers.jobs import get_job
+from schemas.jobs import JobStatusResponse
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str, user = Depends(get_current_user_async)):
+    """Status, progress and result of one of the caller's background jobs."""
+    job = await run_in_threadpool(get_job, job_id)
+    # Other users' jobs look exactly like missing ones
+    if not job or job["user_id"] != user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JobStatusResponse(
+        job_id=job["id"],
+        type=job["type"],
+        status=job["status"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        progress=job.get("progress") or {},
+        result=job.get("result"),
+        error=job.get("error"),
+    )
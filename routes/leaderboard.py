@@ -1,39 +1,118 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from dependencies import get_redis_client, get_current_user_async
+from helpers.leaderboard import LEADERBOARD_KEY, ensure_leaderboard, leaderboard_range, leaderboard_rank
 from models import User, UserStat
-from schemas.leaderboard import LeaderboardResponse, LeaderboardEntry
+from schemas.leaderboard import LeaderboardResponse, LeaderboardEntry, LeaderboardMeResponse
 from typing import List
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
-@router.get("/", response_model=LeaderboardResponse)
-def get_leaderboard(db: Session = Depends(get_db)):
-    # Join UserStat with User to get names and public_id
-    # Sort by total_xp descending
-    results = (
-        db.query(UserStat, User)
+
+def _display_name(user: User) -> str:
+    # Format name logic (consistent with user.py)
+    name = "User"
+    if user.name:
+        parts = user.name.split()
+        name = f"{parts[0]} {parts[-1]}" if len(parts) > 2 else user.name
+    return name
+
+
+async def _build_entries(db: AsyncSession, ranked: list[tuple[int, int]], first_rank: int) -> List[LeaderboardEntry]:
+    """Hydrate (user_id, xp) pairs from the sorted set with one indexed lookup."""
+    if not ranked:
+        return []
+
+    user_ids = [user_id for user_id, _ in ranked]
+    rows = (await db.execute(
+        select(UserStat, User)
         .join(User, UserStat.user_id == User.id)
-        .order_by(UserStat.total_xp.desc())
-        .limit(100)
-        .all()
-    )
-    
+        .where(UserStat.user_id.in_(user_ids))
+    )).all()
+    by_user = {stat.user_id: (stat, user) for stat, user in rows}
+
     entries = []
-    for i, (stat, user) in enumerate(results):
-        # Format name logic (consistent with user.py)
-        name = "User"
-        if user.name:
-            parts = user.name.split()
-            name = f"{parts[0]} {parts[-1]}" if len(parts) > 2 else user.name
-            
+    for offset, (user_id, xp) in enumerate(ranked):
+        if user_id not in by_user:
+            continue
+        stat, user = by_user[user_id]
         entries.append(LeaderboardEntry(
-            rank=i + 1,
-            name=name,
+            rank=first_rank + offset,
+            name=_display_name(user),
             total_xp=stat.total_xp,
             problems_solved=stat.problems_solved,
             current_streak=stat.current_streak,
             public_id=user.public_id
         ))
-        
-    return LeaderboardResponse(entries=entries)
+    return entries
+
+
+async def _db_leaderboard(db: AsyncSession, offset: int, limit: int) -> List[LeaderboardEntry]:
+    # Fallback when Redis is unavailable: ordered scan on the total_xp index
+    results = (await db.execute(
+        select(UserStat, User)
+        .join(User, UserStat.user_id == User.id)
+        .order_by(UserStat.total_xp.desc())
+        .offset(offset)
+        .limit(limit)
+    )).all()
+
+    return [
+        LeaderboardEntry(
+            rank=offset + i + 1,
+            name=_display_name(user),
+            total_xp=stat.total_xp,
+            problems_solved=stat.problems_solved,
+            current_streak=stat.current_streak,
+            public_id=user.public_id
+        )
+        for i, (stat, user) in enumerate(results)
+    ]
+
+
+@router.get("/", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    page: int = Query(1, ge=1),
+    limit: int = Query(100, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    redis_conn = Depends(get_redis_client),
+):
+    offset = (page - 1) * limit
+    try:
+        total = await ensure_leaderboard(redis_conn, db)
+        ranked = await leaderboard_range(redis_conn, offset, offset + limit - 1)
+        entries = await _build_entries(db, ranked, offset + 1)
+    except Exception as e:
+        print(f"Leaderboard cache unavailable, reading from DB: {e}")
+        total = (await db.execute(select(func.count()).select_from(UserStat))).scalar_one()
+        entries = await _db_leaderboard(db, offset, limit)
+
+    return LeaderboardResponse(entries=entries, total=total, page=page, limit=limit)
+
+
+@router.get("/me", response_model=LeaderboardMeResponse)
+async def get_my_rank(
+    window: int = Query(5, ge=0, le=50, description="Players shown above and below you"),
+    user = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    redis_conn = Depends(get_redis_client),
+):
+    total = await ensure_leaderboard(redis_conn, db)
+    rank = await leaderboard_rank(redis_conn, user.id)
+    if rank is None:
+        # Stats created before the set was populated: add them now
+        xp = (await db.execute(select(UserStat.total_xp).where(UserStat.user_id == user.id))).scalar_one_or_none()
+        if xp is not None:
+            await redis_conn.zadd(LEADERBOARD_KEY, {str(user.id): xp})
+            rank = await leaderboard_rank(redis_conn, user.id)
+    if rank is None:
+        return LeaderboardMeResponse(rank=None, total=total, entries=[])
+
+    start = max(rank - window, 0)
+    ranked = await leaderboard_range(redis_conn, start, rank + window)
+    entries = await _build_entries(db, ranked, start + 1)
+    my_xp = next((xp for user_id, xp in ranked if user_id == user.id), 0)
+
+    return LeaderboardMeResponse(rank=rank + 1, total_xp=my_xp, total=total, entries=entries)
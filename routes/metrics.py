@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+
+from dependencies import verify_admin_access
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(verify_admin_access)])
+
+
+@router.get("/")
+async def get_metrics():
+    """Operational counters for the shared clients and caches (admin only)."""
+    from helpers import achievements, catalog, cron, jobs, margins, session_cache
+    from helpers.leetcode_client import get_leetcode_client
+    from scheduler import sweep_status
+    from security import credential_cache_stats
+
+    leetcode_client = get_leetcode_client()
+    return {
+        "leetcode_http": leetcode_client.metrics() if leetcode_client else None,
+        "auth_cache": session_cache.stats(),
+        "catalog": catalog.stats(),
+        "margins_cache": margins.stats(),
+        "credential_cache": credential_cache_stats(),
+        "achievements": achievements.stats(),
+        "jobs": jobs.stats(),
+        "scheduler": cron.stats(),
+        "last_sweep": sweep_status(),
+    }
@@ -2,15 +2,18 @@ import json
 import os
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import distinct
+from sqlalchemy import exists, select
 from typing import Optional, List
 
-from database import get_db
-from dependencies import get_current_user
-from models import Question, UserStat, QuestionCompletion, LeetCodeSubmission
-from schemas.manual_sync import ManualSyncResponse
-from schemas.leetcode_submissions import LeetCodeSubmissionsResponse, LeetCodeSubmissionItem, LeetCodeSubmissionSyncResponse
+from database import get_db, get_async_db
+from dependencies import get_current_user, get_current_user_async, get_redis_client
+from helpers.catalog import get_catalog_async
+from helpers.session_cache import leetcode_connected
+from models import Question, UserStat, QuestionCompletion, LeetCodeSubmission, QuestionTopic, Topic
+from schemas.jobs import JobQueuedResponse
+from schemas.leetcode_submissions import LeetCodeSubmissionsResponse, LeetCodeSubmissionItem
 
 router = APIRouter(prefix="/problems", tags=["Problems"])
 
@@ -51,77 +54,17 @@ def _lookback_month_start(months: int):
     return now, datetime(year, month, 1, tzinfo=timezone.utc)
 
 
-def _parse_progress_timestamp(value) -> int:
-    if value is None or value == "":
-        return 0
+def _queue_job(job_type: str, user, params: dict) -> JobQueuedResponse:
+    from helpers.jobs import enqueue_job
 
-    if isinstance(value, (int, float)):
-        return int(value)
-
-    if isinstance(value, str):
-        try:
-            return int(value)
-        except ValueError:
-            try:
-                return int(datetime.fromisoformat(value).timestamp())
-            except ValueError:
-                return 0
-
-    return 0
-
-
-async def _sync_leetcode_submission_history(user, db: Session, since_timestamp: int | None = None):
-    from helpers.leetcode import fetch_all_submissions
-
-    if not user.leetcode_username or not user.leetcode_session:
-        return 0, 0, 0
-
-    submissions = await fetch_all_submissions(
-        username=user.leetcode_username,
-        session=user.leetcode_session,
-        since_timestamp=since_timestamp,
-    )
-
-    if not submissions:
-        return 0, 0, 0
-
-    existing_ids = {
-        row[0]
-        for row in db.query(LeetCodeSubmission.submission_id)
-        .filter(LeetCodeSubmission.user_id == user.id)
-        .all()
-    }
-
-    synced = 0
-    updated = 0
-
-    for item in submissions:
-        submission_id = str(item.get("id") or "").strip()
-        if not submission_id:
-            continue
-
-        if submission_id in existing_ids:
-            continue
-
-        db.add(
-            LeetCodeSubmission(
-                user_id=user.id,
-                submission_id=submission_id,
-                title=item.get("title"),
-                slug=item.get("slug"),
-                status=item.get("status"),
-                timestamp=item.get("timestamp"),
-            )
-        )
-        existing_ids.add(submission_id)
-        synced += 1
-
-    if synced > 0:
-        db.commit()
-    else:
-        db.rollback()
-
-    return synced, updated, len(submissions)
+    if not user.leetcode_username or not leetcode_connected(user):
+        raise HTTPException(status_code=400, detail="LeetCode account not connected")
+    try:
+        job_id, created = enqueue_job(job_type, user_id=user.id, params=params)
+    except Exception as e:
+        print(f"Failed to queue {job_type} for user {user.id}: {e}")
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    return JobQueuedResponse(job_id=job_id, status="queued" if created else "already_queued")
 
 
 def _serialize_submission_row(row: LeetCodeSubmission, slug_to_id: dict[str, int], completion_map: dict[int, str | None]):
@@ -148,52 +91,40 @@ async def get_all_problems(
     difficulty: Optional[str] = None,
     topic: Optional[str] = None,
     search: Optional[str] = None,
-    user = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    redis_conn = Depends(get_redis_client),
 ):
     """Get all problems with pagination and optional filters."""
-    query = db.query(Question)
-    
+    catalog = await get_catalog_async(db, redis_conn)
+
     # Apply filters
-    if difficulty:
-        from sqlalchemy import func
-        query = query.filter(func.lower(Question.difficulty) == difficulty.lower())
-    if topic:
-        query = query.filter(Question.topics.contains(topic))
+    matched = catalog.select(difficulty=difficulty, topic=topic, free_only=user.allow_paid == 0)
     if search:
-        query = query.filter(Question.title.ilike(f"%{search}%"))
-    if user.allow_paid == 0:
-        query = query.filter(Question.paid_only == 0)
+        matched = catalog.search(matched, search)
     
     # Get total count
-    total = query.count()
+    total = catalog.count(matched)
     
     # Apply pagination
     offset = (page - 1) * limit
-    questions = query.order_by(Question.id).offset(offset).limit(limit).all()
+    questions = [catalog.row(pos) for pos in catalog.positions(matched)[offset:offset + limit]]
     
     # Get completed question IDs for this user
     completed_ids = set()
     if questions:
-        question_ids = [q.id for q in questions]
-        completions = db.query(QuestionCompletion.question_id).filter(
-            QuestionCompletion.user_id == user.id,
-            QuestionCompletion.question_id.in_(question_ids)
-        ).all()
+        question_ids = [q["id"] for q in questions]
+        completions = (await db.execute(
+            select(QuestionCompletion.question_id).where(
+                QuestionCompletion.user_id == user.id,
+                QuestionCompletion.question_id.in_(question_ids)
+            )
+        )).all()
         completed_ids = {c[0] for c in completions}
     
     return {
         "problems": [
-            {
-                "id": q.id,
-                "title": q.title,
-                "slug": q.slug,
-                "difficulty": q.difficulty,
-                "topics": q.topics,
-                "acc_rate": q.acc_rate,
-                "paid_only": q.paid_only,
-                "completed": q.id in completed_ids
-            }
+            {**q, "completed": q["id"] in completed_ids}
             for q in questions
         ],
         "total": total,
@@ -205,22 +136,22 @@ async def get_all_problems(
 
 @router.get("/topics")
 async def get_topics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    redis_conn = Depends(get_redis_client),
 ):
-    """Get all unique topics from the questions table."""
-    # Get all topics as a list of strings
-    topics_rows = db.query(Question.topics).filter(Question.topics.isnot(None)).all()
-    
-    # Parse comma-separated topics and collect unique ones
-    unique_topics = set()
-    for row in topics_rows:
-        if row[0]:
-            for topic in row[0].split(", "):
-                topic = topic.strip()
-                if topic:
-                    unique_topics.add(topic)
-    
-    return {"topics": sorted(unique_topics)}
+    """Get all topics that have at least one question."""
+    topics = (await db.execute(
+        select(Topic.name)
+        .where(exists().where(QuestionTopic.topic_id == Topic.id))
+        .order_by(Topic.name)
+    )).scalars().all()
+
+    if not topics:
+        # question_topics not backfilled yet
+        catalog = await get_catalog_async(db, redis_conn)
+        topics = sorted(catalog.by_topic)
+
+    return {"topics": list(topics)}
 
 
 @router.get("/sheets")
@@ -374,16 +305,15 @@ async def get_problem_set_preference(
     }
 
 
-@router.post("/sync-history", response_model=ManualSyncResponse)
+@router.post("/sync-history", response_model=JobQueuedResponse, status_code=202)
 async def sync_leetcode_history(
     months: Optional[int] = Query(None, ge=1, le=36, description="How many recent months of solved problems to sync"),
     user = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
-    """Sync solved problems from the last N months without awarding XP/coins twice."""
-    from helpers.leetcode import fetch_solved_problem_progress
-    from fastapi import HTTPException
+    """Queue a sync of solved problems from the last N months (no XP/coins are awarded twice).
 
+    Poll GET /jobs/{job_id}; the result has the ManualSyncResponse fields.
+    """
     if not user.leetcode_username:
         raise HTTPException(status_code=400, detail="LeetCode username not configured")
 
@@ -392,90 +322,25 @@ async def sync_leetcode_history(
         _, month_start = _lookback_month_start(months)
         cutoff_ts = int(month_start.timestamp())
 
-    progress_rows = await fetch_solved_problem_progress(
-        username=user.leetcode_username,
-        session=user.leetcode_session,
-    )
-
-    if not progress_rows:
-        return ManualSyncResponse(synced=0, skipped=0, unmatched=0)
+    return _queue_job("leetcode_solved_history", user, {"cutoff_ts": cutoff_ts})
 
-    solved_rows = [
-        row
-        for row in progress_rows
-        if cutoff_ts is None or _parse_progress_timestamp(row.get("lastSubmittedAt")) >= cutoff_ts
-    ]
 
-    if not solved_rows:
-        return ManualSyncResponse(synced=0, skipped=0, unmatched=0)
-
-    slugs = [row.get("titleSlug") for row in solved_rows if row.get("titleSlug")]
-    db_questions = db.query(Question.id, Question.slug).filter(
-        Question.slug.in_(slugs)
-    ).all()
-    slug_to_id = {q.slug: q.id for q in db_questions}
-    unmatched = len([slug for slug in slugs if slug not in slug_to_id])
-
-    matched_ids = list(slug_to_id.values())
-    existing_completions = set()
-    if matched_ids:
-        existing = db.query(QuestionCompletion.question_id).filter(
-            QuestionCompletion.user_id == user.id,
-            QuestionCompletion.question_id.in_(matched_ids)
-        ).all()
-        existing_completions = {c[0] for c in existing}
-
-    synced = 0
-    skipped = 0
-    for row in solved_rows:
-        slug = row.get("titleSlug")
-        if not slug:
-            continue
-
-        qid = slug_to_id.get(slug)
-        if not qid:
-            continue
-
-        if qid in existing_completions:
-            skipped += 1
-            continue
-
-        completion = QuestionCompletion(
-            user_id=user.id,
-            question_id=qid,
-            source="manual",
-        )
-        db.add(completion)
-        existing_completions.add(qid)
-        synced += 1
-
-    if synced > 0:
-        stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
-        if stats:
-            stats.problems_solved += synced
-        db.commit()
-    else:
-        db.rollback()
-
-    return ManualSyncResponse(synced=synced, skipped=skipped, unmatched=unmatched)
-
-
-@router.post("/sync-leetcode-submissions", response_model=LeetCodeSubmissionSyncResponse)
+@router.post("/sync-leetcode-submissions", response_model=JobQueuedResponse, status_code=202)
 async def sync_leetcode_submissions(
     months: Optional[int] = Query(None, ge=1, le=36, description="Look back N months from the current month"),
+    full: bool = Query(False, description="Walk the whole history instead of stopping at the last synced submission"),
     user = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
-    """Backfill and incrementally sync raw LeetCode submissions into local storage."""
+    """Queue a backfill / incremental sync of raw LeetCode submissions into local storage.
+
+    Poll GET /jobs/{job_id}; the result has the LeetCodeSubmissionSyncResponse fields.
+    """
     since_timestamp = None
     if months is not None:
         _, month_start = _lookback_month_start(months)
         since_timestamp = int(month_start.timestamp())
 
-    synced, updated, total = await _sync_leetcode_submission_history(user, db, since_timestamp=since_timestamp)
-    from helpers.leetcode import recalculate_user_streak
-    recalculate_user_streak(user.id, db)
-    return LeetCodeSubmissionSyncResponse(synced=synced, updated=updated, total=total)
+    return _queue_job("leetcode_submissions", user, {"since_timestamp": since_timestamp, "full": full})
 
 
 @router.get("/leetcode-submissions", response_model=LeetCodeSubmissionsResponse)
@@ -486,7 +351,7 @@ async def get_leetcode_submissions(
     user = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Read cached submissions, backfilling from LeetCode when the cache is empty."""
+    """Read cached submissions, queueing a LeetCode backfill when the cache is empty."""
 
     if not user.leetcode_username:
         return LeetCodeSubmissionsResponse(submissions=[])
@@ -520,9 +385,16 @@ async def get_leetcode_submissions(
     rows = query.order_by(*order_clause).limit(limit).all()
 
     if not rows:
-        # Backfill before giving up so the first visit can hydrate older history.
-        await _sync_leetcode_submission_history(user, db, since_timestamp=since_timestamp)
-        rows = query.order_by(*order_clause).limit(limit).all()
+        # Hydrate older history in the background; the client polls the job and re-reads.
+        backfill_job_id = None
+        if leetcode_connected(user):
+            try:
+                backfill_job_id = _queue_job(
+                    "leetcode_submissions", user, {"since_timestamp": since_timestamp, "full": False}
+                ).job_id
+            except HTTPException:
+                pass
+        return LeetCodeSubmissionsResponse(submissions=[], backfill_job_id=backfill_job_id)
 
     slugs = [row.slug for row in rows if row.slug]
     db_questions = db.query(Question.id, Question.slug).filter(
@@ -1,51 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, status, Query
 from fastapi.responses import RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
-from dependencies import get_redis_client, get_current_user
-from models import UserStat, UserInventory, UserAchievement, Question, QuestionCompletion, LeetCodeSubmission
+from database import get_db, get_async_db
+from dependencies import get_redis_client, get_current_user, get_current_user_async
+from models import UserStat, UserInventory, Question, UserDailyActivity
 from schemas.user_stats import UserStatsResponse, DifficultyUpdateRequest, EmailPreferenceUpdate
 from schemas.inventory import InventoryResponse, InventoryItem, AchievementsResponse, Achievement, PowerupPurchaseRequest
 from schemas.user_leetcode import LeetCodeUpdate
 from schemas.stats import ActivityGraphResponse, DailyActivity
 
 from security import decrypt_token, encrypt_token
+from helpers.margins import get_margins
+from helpers.achievements import ACHIEVEMENTS, unlocked_achievements
+from helpers.session_cache import leetcode_connected
 from scheduler import check_all_users_dsa
 from schemas.zerodha import ZerodhaCredentialsUpdate
 from schemas.zerodha import ZerodhaCredentialsUpdate
-import json
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/user", tags=["User"])
 
 async def fetch_and_cache_margins(user, redis):
-    cache_key = f"user:{user.id}:margins"
-    
-    # Check cache
-    cached = await redis.get(cache_key)
-    if cached:
-        return json.loads(cached)
-    
-    # Fetch from Zerodha if access token exists
-    if not user.access_token or not user.zerodha_api_key:
-        return {"equity": {"available": {"live_balance": 0}}, "error": "No credentials"}
-        
-    try:
-        from kite import get_kite_client
-        api_key = decrypt_token(user.zerodha_api_key)
-        access_token = decrypt_token(user.access_token)
-        
-        kite_client = get_kite_client(api_key)
-        kite_client.set_access_token(access_token)
-        margins = kite_client.margins()
-        
-        # Cache for 1 hour
-        await redis.set(cache_key, json.dumps(margins), ex=3600)
-        return margins
-    except Exception as e:
-        print(f"Error fetching margins for user {user.id}: {e}")
-        return {"equity": {"available": {"live_balance": 0}}, "error": str(e)}
+    # Stale-while-revalidate cache; see helpers/margins.py
+    return await get_margins(user, redis)
 
 def extract_wallet_balance(margins):
     """Safely extracts the most relevant balance from Zerodha margins response."""
@@ -74,9 +53,13 @@ async def sync_user_progress(
     db: Session = Depends(get_db),
     redis = Depends(get_redis_client),
 ):
-    from scheduler import check_dsa_completion
-    check_dsa_completion(user, db)
-    stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
+    from fastapi.concurrency import run_in_threadpool
+    from scheduler import check_dsa_completion_async
+
+    await check_dsa_completion_async(user, db, redis)
+    stats = await run_in_threadpool(
+        lambda: db.query(UserStat).filter(UserStat.user_id == user.id).first()
+    )
     if not stats:
         raise HTTPException(status_code=404, detail="User stats not found")
     
@@ -95,7 +78,7 @@ async def sync_user_progress(
     margins = await fetch_and_cache_margins(user, redis)
     stats.available_balance = extract_wallet_balance(margins)
     stats.zerodha_error = margins.get("error")
-    stats.leetcode_connected = bool(user.leetcode_session)
+    stats.leetcode_connected = leetcode_connected(user)
     stats.leetcode_username = user.leetcode_username
     stats.zerodha_connected = bool(user.zerodha_api_key)
     stats.allow_paid = user.allow_paid
@@ -114,7 +97,7 @@ async def complete_walkthrough(
 ):
     user.has_completed_walkthrough = 1
     db.commit()
-    return await get_user_stats(user, db, redis)
+    return await _user_stats_from_sync_session(user, db, redis)
 
 
 @router.get("/login")
@@ -146,14 +129,11 @@ def start_zerodha_login(
 async def disconnect_zerodha(
     user = Depends(get_current_user),
     db: Session = Depends(get_db),
-    redis = Depends(get_redis_client),
 ):
     user.access_token = None
     user.zerodha_api_key = None
     user.zerodha_api_secret = None
-    
-    # Clear cache
-    await redis.delete(f"user:{user.id}:margins")
+    # The cached margins are dropped on commit (helpers/margins.py)
     
     stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
     if stats:
@@ -256,7 +236,7 @@ async def update_difficulty(
     margins = await fetch_and_cache_margins(user, redis)
     stats.available_balance = extract_wallet_balance(margins)
     stats.zerodha_error = margins.get("error")
-    stats.leetcode_connected = bool(user.leetcode_session)
+    stats.leetcode_connected = leetcode_connected(user)
     stats.leetcode_username = user.leetcode_username
     stats.zerodha_connected = bool(user.zerodha_api_key)
     stats.allow_paid = user.allow_paid
@@ -303,7 +283,7 @@ async def use_powerup(
     margins = await fetch_and_cache_margins(user, redis)
     stats.available_balance = extract_wallet_balance(margins)
     stats.zerodha_error = margins.get("error")
-    stats.leetcode_connected = bool(user.leetcode_session)
+    stats.leetcode_connected = leetcode_connected(user)
     stats.leetcode_username = user.leetcode_username
     stats.zerodha_connected = bool(user.zerodha_api_key)
     stats.allow_paid = user.allow_paid
@@ -311,29 +291,25 @@ async def use_powerup(
 
     return stats
 
-@router.get("/stats", response_model=UserStatsResponse)
-async def get_user_stats(
-    user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    redis = Depends(get_redis_client),
-):
+def load_user_stats(db: Session, user_id: int) -> UserStat:
+    """Fetch (or self-heal) the user's stats row and apply streak decay."""
     stats = (
         db.query(UserStat)
-        .filter(UserStat.user_id == user.id)
+        .filter(UserStat.user_id == user_id)
         .first()
     )
 
     if not stats:
         # Self-healing: Create stats if missing
-        stats = UserStat(user_id=user.id)
+        stats = UserStat(user_id=user_id)
         db.add(stats)
         
         # Also initialize inventory
-        inventory_exists = db.query(UserInventory).filter(UserInventory.user_id == user.id).first()
+        inventory_exists = db.query(UserInventory).filter(UserInventory.user_id == user_id).first()
         if not inventory_exists:
             starter_items = [
-                UserInventory(user_id=user.id, item_id="streak-freeze", quantity=1),
-                UserInventory(user_id=user.id, item_id="penalty-shield", quantity=1)
+                UserInventory(user_id=user_id, item_id="streak-freeze", quantity=1),
+                UserInventory(user_id=user_id, item_id="penalty-shield", quantity=1)
             ]
             for item in starter_items:
                 db.add(item)
@@ -341,11 +317,18 @@ async def get_user_stats(
         db.commit()
         db.refresh(stats)
     
-    # Recalculate streak based on cached submissions
-    from helpers.leetcode import recalculate_user_streak
-    recalculate_user_streak(user.id, db)
-    db.refresh(stats)
-    
+    from helpers.streaks import decay_streak, rebuild_user_streak
+    if stats.streak_last_day is None:
+        # No solve days recorded yet (new user or pre-migration row): build them once
+        rebuild_user_streak(user_id, db)
+        db.refresh(stats)
+    elif decay_streak(stats):
+        # Streaks are only advanced on new activity, so expire them at read time
+        db.commit()
+    return stats
+
+
+async def build_user_stats_response(user, stats: UserStat, redis) -> UserStatsResponse:
     # Construct response explicitly to ensure all fields are populated correctly
     # especially those that come from User model or external APIs
     response = UserStatsResponse.from_orm(stats)
@@ -371,7 +354,7 @@ async def get_user_stats(
         response.available_balance = 0
         response.zerodha_error = "Zerodha not connected"
     
-    response.leetcode_connected = bool(user.leetcode_session)
+    response.leetcode_connected = leetcode_connected(user)
     response.leetcode_username = user.leetcode_username
     response.zerodha_connected = bool(user.zerodha_api_key)
     response.allow_paid = user.allow_paid
@@ -379,6 +362,23 @@ async def get_user_stats(
 
     return response
 
+
+async def _user_stats_from_sync_session(user, db: Session, redis) -> UserStatsResponse:
+    from fastapi.concurrency import run_in_threadpool
+
+    stats = await run_in_threadpool(load_user_stats, db, user.id)
+    return await build_user_stats_response(user, stats, redis)
+
+
+@router.get("/stats", response_model=UserStatsResponse)
+async def get_user_stats(
+    user = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    redis = Depends(get_redis_client),
+):
+    stats = await db.run_sync(load_user_stats, user.id)
+    return await build_user_stats_response(user, stats, redis)
+
 @router.get("/margins")
 async def get_user_margins(
     user = Depends(get_current_user),
@@ -391,19 +391,6 @@ async def get_user_margins(
     return await fetch_and_cache_margins(user, redis)
 
 
-# Achievement definitions
-ACHIEVEMENTS = [
-    {"id": "first-blood", "name": "First Blood", "description": "Solve your first problem", "icon": "🎯", "rarity": "common", "check": lambda s: s.problems_solved >= 1},
-    {"id": "week-warrior", "name": "Week Warrior", "description": "Maintain a 7-day streak", "icon": "🔥", "rarity": "rare", "check": lambda s: s.max_streak >= 7},
-    {"id": "month-master", "name": "Month Master", "description": "Maintain a 30-day streak", "icon": "👑", "rarity": "epic", "check": lambda s: s.max_streak >= 30},
-    {"id": "century-club", "name": "Century Club", "description": "Solve 100 problems", "icon": "💯", "rarity": "epic", "check": lambda s: s.problems_solved >= 100},
-    {"id": "diamond-hands", "name": "Diamond Hands", "description": "Never trigger a penalty", "icon": "💎", "rarity": "legendary", "check": lambda s: s.lifetime_loss == 0 and s.problems_solved >= 10},
-    {"id": "survivor", "name": "Survivor", "description": "Recover from 0 lives", "icon": "🛡️", "rarity": "rare", "check": lambda s: s.lives > 0 and s.problems_since_last_life > 0},
-    {"id": "grinder", "name": "Grinder", "description": "Solve 50 problems", "icon": "⚡", "rarity": "rare", "check": lambda s: s.problems_solved >= 50},
-    {"id": "dedicated", "name": "Dedicated", "description": "Solve 10 problems", "icon": "📚", "rarity": "common", "check": lambda s: s.problems_solved >= 10},
-]
-
-
 @router.get("/inventory", response_model=InventoryResponse)
 def get_user_inventory(
     user = Depends(get_current_user),
@@ -428,33 +415,22 @@ def get_user_achievements(
     user = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
-    unlocked_achievements = db.query(UserAchievement).filter(UserAchievement.user_id == user.id).all()
-    unlocked_ids = {a.achievement_id: a.unlocked_at for a in unlocked_achievements}
-    
-    achievements = []
-    for ach_def in ACHIEVEMENTS:
-        is_unlocked = ach_def["id"] in unlocked_ids
-        
-        # Check if newly unlocked
-        if stats and not is_unlocked and ach_def["check"](stats):
-            # Unlock achievement
-            new_ach = UserAchievement(user_id=user.id, achievement_id=ach_def["id"])
-            db.add(new_ach)
-            db.commit()
-            is_unlocked = True
-            unlocked_ids[ach_def["id"]] = new_ach.unlocked_at
-        
-        achievements.append(Achievement(
+    # Unlocks are written when stats change (helpers/achievements.py); this is a cached read
+    unlocked_ids = unlocked_achievements(db, user.id)
+
+    achievements = [
+        Achievement(
             id=ach_def["id"],
             name=ach_def["name"],
             description=ach_def["description"],
             icon=ach_def["icon"],
             rarity=ach_def["rarity"],
-            unlocked=is_unlocked,
+            unlocked=ach_def["id"] in unlocked_ids,
             unlocked_at=unlocked_ids.get(ach_def["id"])
-        ))
-    
+        )
+        for ach_def in ACHIEVEMENTS
+    ]
+
     return AchievementsResponse(achievements=achievements)
 
 
@@ -497,65 +473,53 @@ async def purchase_powerup(
         
     db.commit()
     
-    # Use existing get_user_stats logic
-    return await get_user_stats(user, db, redis)
+    # Same response as GET /user/stats
+    return await _user_stats_from_sync_session(user, db, redis)
 
 
 @router.get("/stats/activity", response_model=ActivityGraphResponse)
 async def get_user_activity(
     month: str | None = Query(None, description="Month to render in YYYY-MM format"),
+    year: int | None = Query(None, ge=2000, le=2100, description="Render the whole year instead of one month"),
     user = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    from sqlalchemy.sql import func
+    from datetime import date
 
     stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
 
-    now = datetime.now(timezone.utc)
-    target = now
-    if month:
-        try:
-            year_str, month_str = month.split("-", 1)
-            target = datetime(int(year_str), int(month_str), 1, tzinfo=timezone.utc)
-        except Exception:
-            raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
-
-    month_start = datetime(target.year, target.month, 1, tzinfo=timezone.utc)
-    if target.month == 12:
-        next_month = datetime(target.year + 1, 1, 1, tzinfo=timezone.utc)
+    if year is not None:
+        range_start, range_end = date(year, 1, 1), date(year + 1, 1, 1)
     else:
-        next_month = datetime(target.year, target.month + 1, 1, tzinfo=timezone.utc)
-
-    activity = []
-
-    leetcode_rows = db.query(LeetCodeSubmission).filter(
-        LeetCodeSubmission.user_id == user.id,
-        LeetCodeSubmission.timestamp.isnot(None),
-        LeetCodeSubmission.timestamp >= int(month_start.timestamp()),
-        LeetCodeSubmission.timestamp < int(next_month.timestamp()),
-    ).all()
-
-    if leetcode_rows:
-        counts: dict[str, int] = {}
-        for row in leetcode_rows:
-            submission_dt = datetime.fromtimestamp(int(row.timestamp), tz=timezone.utc)
-            date_key = submission_dt.date().isoformat()
-            counts[date_key] = counts.get(date_key, 0) + 1
-
-        activity = [DailyActivity(date=date, count=count) for date, count in sorted(counts.items())]
-    else:
-        activity_query = db.query(
-            func.date(QuestionCompletion.rewarded_at).label("date"),
-            func.count().label("count")
-        ).filter(
-            QuestionCompletion.user_id == user.id,
-            QuestionCompletion.rewarded_at >= month_start,
-            QuestionCompletion.rewarded_at < next_month,
-        ).group_by(
-            func.date(QuestionCompletion.rewarded_at)
-        ).all()
-
-        activity = [DailyActivity(date=str(row.date), count=row.count) for row in activity_query if row.date]
+        target = datetime.now(timezone.utc).date()
+        if month:
+            try:
+                year_str, month_str = month.split("-", 1)
+                target = date(int(year_str), int(month_str), 1)
+            except Exception:
+                raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
+
+        range_start = target.replace(day=1)
+        if target.month == 12:
+            range_end = date(target.year + 1, 1, 1)
+        else:
+            range_end = date(target.year, target.month + 1, 1)
+
+    # One range scan on uq_user_daily_activity (user_id, date)
+    rows = db.query(UserDailyActivity).filter(
+        UserDailyActivity.user_id == user.id,
+        UserDailyActivity.date >= range_start,
+        UserDailyActivity.date < range_end,
+    ).order_by(UserDailyActivity.date).all()
+
+    # Prefer raw LeetCode submissions; fall back to GamLeet completions when
+    # no submissions were synced for the period
+    field = "submissions" if any(row.submissions for row in rows) else "completions"
+    activity = [
+        DailyActivity(date=row.date.isoformat(), count=getattr(row, field))
+        for row in rows
+        if getattr(row, field)
+    ]
 
     return ActivityGraphResponse(
         activity=activity,
@@ -1,46 +1,347 @@
-import schedule
+import asyncio
+import json
 import time
-from threading import Thread
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from helpers.activity import record_completions
+from helpers.cron import cron_job
+from helpers.jobs import job_handler
 from helpers.leetcode import is_leetcode_solved_today
-from helpers.mails import build_penalty_email, build_nudge_email
-from kite import generate_session
-from kiteconnect.exceptions import InputException
+from helpers.mails import build_nudge_email
+from helpers.penalties import penalty_date, queue_penalty
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from datetime import datetime
-import pytz
 import os
 import resend
-from security import decrypt_token
 from models import User, UserStat
 
 resend.api_key = os.getenv("RESEND_API_KEY")
 
+# Sweep tuning: how many users are evaluated at once and how long one user may take.
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", "8"))
+SWEEP_USER_TIMEOUT = float(os.getenv("SWEEP_USER_TIMEOUT", "90"))
+# The scheduled sweep is split into this many `user_id % N` shards, each a
+# queue job that any worker process can claim.
+SWEEP_SHARDS = int(os.getenv("SWEEP_SHARDS", "4"))
+SWEEP_RECORD_TTL = 7 * 86400
+LATEST_SWEEP_KEY = "sweep:latest"
+
+_SUMMARY_COUNTERS = ("checked", "rewarded", "penalized", "failed")
+
+
 def check_all_users_dsa(db: Session):
     print("Running daily DSA completion check for all users...")
-    users = db.query(User).all()
-    for user in users:
+    user_ids = [row[0] for row in db.query(User.id).all()]
+    # The caller's session is only used for the user list; each user gets its own.
+    db.rollback()
+    summary = asyncio.run(run_dsa_sweep(user_ids))
+    print(
+        f"DSA sweep finished: checked={summary['checked']} rewarded={summary['rewarded']} "
+        f"penalized={summary['penalized']} failed={summary['failed']} "
+        f"wall_time={summary['wall_time']:.1f}s"
+    )
+    return summary
+
+
+def _sweep_key(sweep_id: str) -> str:
+    return f"sweep:{sweep_id}"
+
+
+def _sweep_shards_key(sweep_id: str) -> str:
+    return f"sweep:{sweep_id}:shards"
+
+
+def start_sharded_sweep(shards: int | None = None) -> dict:
+    """Queue one `dsa_sweep_shard` job per shard; the last shard to finish aggregates."""
+    from dependencies import get_sync_redis_client
+    from datetime import timedelta
+    from helpers.curation import last_rollover
+    from helpers.jobs import enqueue_job
+    from helpers.penalties import prefetch_penny_stock_prices
+
+    # One quote call now means penalty sizing needs no broker round-trips later
+    try:
+        prefetch_penny_stock_prices()
+    except Exception as e:
+        print(f"Quote prefetch failed: {e}")
+
+    shards = max(shards or SWEEP_SHARDS, 1)
+    sweep_id = uuid.uuid4().hex
+    # Users are judged against the window closing at the next 3:30 PM rollover;
+    # after it, curation_date() points at the next window, so nothing may run then
+    deadline = (last_rollover() + timedelta(days=1)).timestamp()
+    r = get_sync_redis_client()
+    pipe = r.pipeline()
+    pipe.hset(_sweep_key(sweep_id), mapping={
+        "shards": shards, "status": "running", "started_at": time.time(), "deadline": deadline,
+    })
+    pipe.expire(_sweep_key(sweep_id), SWEEP_RECORD_TTL)
+    pipe.set(LATEST_SWEEP_KEY, sweep_id, ex=SWEEP_RECORD_TTL)
+    pipe.execute()
+
+    for shard in range(shards):
+        enqueue_job(
+            "dsa_sweep_shard",
+            params={"sweep_id": sweep_id, "shard": shard, "shards": shards, "deadline": deadline},
+            priority=True,
+        )
+    print(f"DSA sweep {sweep_id} queued as {shards} shards")
+    return {"sweep_id": sweep_id, "shards": shards}
+
+
+def run_sweep_shard(sweep_id: str, shard: int, shards: int, deadline: float | None = None) -> dict:
+    """Evaluate the users with `id % shards == shard` and record the shard's result.
+
+    Nothing is evaluated once `deadline` (epoch seconds) has passed.
+    """
+    from database import SessionLocal
+    from dependencies import get_sync_redis_client
+
+    try:
+        if deadline and time.time() >= deadline:
+            print(f"DSA sweep {sweep_id} shard {shard} started after its deadline; skipping")
+            summary = {"error": "started after the sweep deadline"}
+            return summary
+        db = SessionLocal()
         try:
-            check_dsa_completion(user, db)
-        except Exception as e:
-            print(f"Error checking DSA completion for user {user.id}: {e}")
+            user_ids = [row[0] for row in db.query(User.id).filter(User.id % shards == shard).all()]
+        finally:
+            db.close()
+        summary = asyncio.run(run_dsa_sweep(user_ids, deadline=deadline))
+    except Exception as e:
+        summary = {"error": str(e)}
+        raise
+    finally:
+        r = get_sync_redis_client()
+        r.hset(_sweep_shards_key(sweep_id), shard, json.dumps(summary))
+        r.expire(_sweep_shards_key(sweep_id), SWEEP_RECORD_TTL)
+        if r.hlen(_sweep_shards_key(sweep_id)) >= shards:
+            _finish_sweep(sweep_id)
+    return summary
+
+
+def _finish_sweep(sweep_id: str):
+    """Aggregate the shard results once every shard has reported (runs once per sweep)."""
+    from dependencies import get_sync_redis_client
+
+    r = get_sync_redis_client()
+    finished_at = time.time()
+    # Two shards finishing together both get here; only the first claims it
+    if not r.hsetnx(_sweep_key(sweep_id), "finished_at", finished_at):
+        return
+
+    results = [json.loads(value) for value in r.hgetall(_sweep_shards_key(sweep_id)).values()]
+    summary = {key: sum(result.get(key, 0) for result in results) for key in _SUMMARY_COUNTERS}
+    summary["failed_shards"] = sum(1 for result in results if "error" in result)
+    started_at = float(r.hget(_sweep_key(sweep_id), "started_at") or finished_at)
+    summary["wall_time"] = round(finished_at - started_at, 1)
+    r.hset(_sweep_key(sweep_id), mapping={"status": "done", **summary})
+    print(
+        f"DSA sweep {sweep_id} finished: checked={summary['checked']} rewarded={summary['rewarded']} "
+        f"penalized={summary['penalized']} failed={summary['failed']} "
+        f"failed_shards={summary['failed_shards']} wall_time={summary['wall_time']:.1f}s"
+    )
+
+
+def close_overdue_sweep(now: float | None = None) -> str | None:
+    """Finish the latest sweep if its deadline passed before every shard reported.
+
+    Shards lost with their worker never report; they are recorded as failed so
+    the sweep (and /metrics) doesn't show it as running forever.
+    """
+    from dependencies import get_sync_redis_client
+
+    r = get_sync_redis_client()
+    sweep_id = (r.get(LATEST_SWEEP_KEY) or b"").decode()
+    record = {key.decode(): value.decode() for key, value in r.hgetall(_sweep_key(sweep_id)).items()} if sweep_id else {}
+    if not record or "finished_at" in record or not record.get("deadline"):
+        return None
+    if (now or time.time()) < float(record["deadline"]):
+        return None
+
+    for shard in range(int(record["shards"])):
+        r.hsetnx(_sweep_shards_key(sweep_id), shard, json.dumps({"error": "shard never reported"}))
+    r.expire(_sweep_shards_key(sweep_id), SWEEP_RECORD_TTL)
+    print(f"DSA sweep {sweep_id} passed its deadline with shards missing; closing it")
+    _finish_sweep(sweep_id)
+    return sweep_id
+
+
+def sweep_status(sweep_id: str | None = None) -> dict | None:
+    """The sweep record (default: the latest), with per-shard results."""
+    from dependencies import get_sync_redis_client
+
+    try:
+        r = get_sync_redis_client()
+        sweep_id = sweep_id or (r.get(LATEST_SWEEP_KEY) or b"").decode()
+        record = r.hgetall(_sweep_key(sweep_id)) if sweep_id else None
+        if not record:
+            return None
+        shard_results = r.hgetall(_sweep_shards_key(sweep_id))
+    except Exception as e:
+        print(f"Sweep status lookup failed: {e}")
+        return None
+    status = {key.decode(): value.decode() for key, value in record.items()}
+    status["sweep_id"] = sweep_id
+    status["shard_results"] = {int(shard): json.loads(result) for shard, result in shard_results.items()}
+    return status
+
+
+@job_handler("dsa_sweep_shard")
+def _sweep_shard_job(job: dict, report) -> dict:
+    params = job["params"]
+    return run_sweep_shard(params["sweep_id"], params["shard"], params["shards"], params.get("deadline"))
+
+
+def _check_user_in_own_session(user_id: int, user_timeout: float | None = None):
+    """Evaluate one user inside a dedicated DB session so failures stay isolated."""
+    from database import SessionLocal
+
+    # The clock starts when a sweep thread picks the user up, not when it was queued
+    deadline = time.monotonic() + user_timeout if user_timeout else None
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return None
+        return check_dsa_completion(user, db, deadline=deadline)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_dsa_sweep(
+    user_ids: list[int],
+    concurrency: int | None = None,
+    user_timeout: float | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """Run `check_dsa_completion` for many users with bounded concurrency.
+
+    LeetCode traffic from all workers shares the leetcode.com rate limiter in
+    helpers.leetcode, so raising the concurrency does not raise the request rate.
+    Users not started by `deadline` (epoch seconds) are counted as failed.
+    """
+    concurrency = max(concurrency or SWEEP_CONCURRENCY, 1)
+    user_timeout = user_timeout or SWEEP_USER_TIMEOUT
+    summary = {"checked": 0, "rewarded": 0, "penalized": 0, "failed": 0, "wall_time": 0.0}
+    started_at = time.monotonic()
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dsa-sweep") as executor:
+        async def process(user_id: int):
+            async with semaphore:
+                if deadline and time.time() >= deadline:
+                    summary["failed"] += 1
+                    return
+                # The deadline is enforced inside the user's work (see
+                # check_dsa_completion), so a user reported as failed here has
+                # stopped and wrote nothing.
+                try:
+                    result = await loop.run_in_executor(executor, _check_user_in_own_session, user_id, user_timeout)
+                except TimeoutError:
+                    print(f"Timed out checking DSA completion for user {user_id} after {user_timeout}s")
+                    summary["failed"] += 1
+                    return
+                except Exception as e:
+                    print(f"Error checking DSA completion for user {user_id}: {e}")
+                    summary["failed"] += 1
+                    return
+
+            if result and result.get("outcome") == "failed":
+                summary["failed"] += 1
+                return
+            summary["checked"] += 1
+            if result and result.get("rewarded"):
+                summary["rewarded"] += 1
+            if result and result.get("outcome") == "penalized":
+                summary["penalized"] += 1
+
+        await asyncio.gather(*(process(user_id) for user_id in user_ids))
+
+    summary["wall_time"] = time.monotonic() - started_at
+    return summary
+
+
+def check_dsa_completion(user: User, db: Session, deadline: float | None = None):
+    """Reward today's solves or apply the miss/penalty rules for one user.
+
+    Returns a dict with `rewarded` (whether coins/XP were granted) and
+    `outcome`: "no_stats", "failed", "solved", "sandbox", "lives_lost",
+    "frozen", "penalized" or "already_missed" (the miss rules already ran for
+    this penalty day).
+
+    `deadline` (time.monotonic()) bounds the LeetCode calls; once it has
+    passed, TimeoutError is raised before anything is written.
+    """
+    from helpers.leetcode import fetch_submission_snapshot
+    from helpers.daily_problem import get_daily_problem
+
+    def remaining() -> float:
+        if deadline is None:
+            return 15
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"Deadline passed while checking user {user.id}")
+        return min(left, 15)
+
+    # One recentSubmissionList fetch backs every check
+    snapshot = fetch_submission_snapshot(
+        username=user.leetcode_username, session=user.leetcode_session, timeout=remaining()
+    )
+    daily_problem = get_daily_problem()
+    remaining()
+    return apply_dsa_completion(user, db, snapshot, daily_problem)
+
+
+async def check_dsa_completion_async(user: User, db: Session, redis_conn=None):
+    """Async-native check_dsa_completion for request handlers.
+
+    LeetCode calls are awaited on the event loop; the DB work (and a possible
+    Zerodha order) runs in the threadpool so other requests keep being served.
+    """
+    from fastapi.concurrency import run_in_threadpool
+    from helpers.leetcode import fetch_submission_snapshot_async
+    from helpers.daily_problem import get_daily_problem_async
+
+    snapshot, daily_problem = await asyncio.gather(
+        fetch_submission_snapshot_async(username=user.leetcode_username, session=user.leetcode_session),
+        get_daily_problem_async(redis_conn),
+    )
+    return await run_in_threadpool(apply_dsa_completion, user, db, snapshot, daily_problem)
+
+
+def apply_dsa_completion(user: User, db: Session, snapshot, daily_problem: dict):
+    """DB half of check_dsa_completion, driven by already-fetched LeetCode data."""
+    # A failed fetch says nothing about today's activity; never treat it as a miss
+    if not snapshot.ok:
+        print(f"LeetCode submissions unavailable for user {user.id}; leaving stats unchanged")
+        return {"rewarded": False, "outcome": "failed"}
 
-def check_dsa_completion(user: User, db: Session):
     stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
     if not stats:
-        return
+        return {"rewarded": False, "outcome": "no_stats"}
 
     from helpers.problems import get_curated_problems_for_user
-    from helpers.leetcode import get_problems_status, is_leetcode_solved_today
     from models import QuestionCompletion
 
+    from helpers.curation import curation_date
+
     today = datetime.now().date()
-    today_str = today.isoformat()
     
-    curated_problems = get_curated_problems_for_user(db, user, today_str)
+    # The 3 PM sweep evaluates the window that closes at 3:30 PM
+    curated_problems = get_curated_problems_for_user(db, user, curation_date())
+    # Keep a curation made just now, whichever way the rules below go
+    db.commit()
     curated_slugs = [p["slug"] for p in curated_problems.values() if p and "slug" in p]
-    
+
     # 1. Check curated problems status
-    status_map = get_problems_status(curated_slugs, username=user.leetcode_username, session=user.leetcode_session)
+    status_map = snapshot.problems_status(curated_slugs)
     
     rewards_granted = False
     
@@ -79,20 +380,18 @@ def check_dsa_completion(user: User, db: Session):
                     # Record completion
                     completion = QuestionCompletion(user_id=user.id, question_id=question_id)
                     db.add(completion)
+                    record_completions(db, user.id)
                     rewards_granted = True
                     print(f"Rewards granted for {slug}: +{rewards['coins']} GC, +{rewards['xp']} XP")
                 else:
                     print(f"Warning: No rewards config found for difficulty: {difficulty}")
 
     # --- Daily Problem Check ---
-    from helpers.leetcode import fetch_daily_problem
-    daily_problem = fetch_daily_problem()
-    
     if daily_problem.get("slug"):
         daily_slug = daily_problem["slug"]
         daily_id = daily_problem["id"]
 
-        is_daily_solved = is_leetcode_solved_today(username=user.leetcode_username, session=user.leetcode_session, daily_slug=daily_slug)
+        is_daily_solved = snapshot.is_solved(daily_slug)
         
         if is_daily_solved:
              # Check if already rewarded for THIS specific daily problem ID (assuming ID is unique per daily occurrence or question)
@@ -122,11 +421,12 @@ def check_dsa_completion(user: User, db: Session):
 
                 completion = QuestionCompletion(user_id=user.id, question_id=daily_id)
                 db.add(completion)
+                record_completions(db, user.id)
                 rewards_granted = True
     # ---------------------------
 
     # 2. Handle Streak / Streak Maintenance logic
-    dsa_solved = is_leetcode_solved_today(username=user.leetcode_username, session=user.leetcode_session)
+    dsa_solved = snapshot.has_activity_today()
     
     mode = stats.difficulty_mode.lower()
 
@@ -134,14 +434,13 @@ def check_dsa_completion(user: User, db: Session):
         if stats.last_activity_date == today:
             if rewards_granted:
                 db.commit()
-            return
+            return {"rewarded": rewards_granted, "outcome": "solved"}
 
-        from datetime import timedelta
         print(f"DSA solved today. Updating streak stats for user {user.id}")
         
         # Streak increment logic using submissions
-        from helpers.leetcode import recalculate_user_streak
-        recalculate_user_streak(user.id, db)
+        from helpers.streaks import record_solve_days
+        record_solve_days(db, user.id, snapshot.activity_days(), stats=stats)
 
         stats.problems_solved += 1
         stats.problems_since_last_life += 1
@@ -154,14 +453,27 @@ def check_dsa_completion(user: User, db: Session):
             stats.problems_since_last_life = 0
         
         db.commit()
-        return
+        return {"rewarded": rewards_granted, "outcome": "solved"}
     
     if rewards_granted:
         db.commit()
 
     # Penalty Logic
     if mode == "sandbox":
-        return
+        return {"rewarded": rewards_granted, "outcome": "sandbox"}
+
+    # The miss rules run once per (user, penalty day), the penalty journal's key:
+    # a duplicated or re-queued sweep run finds the day claimed and takes nothing.
+    # The claim commits together with the lives/freeze/streak changes below.
+    day = penalty_date()
+    claimed = db.query(UserStat).filter(
+        UserStat.user_id == user.id,
+        or_(UserStat.last_miss_date.is_(None), UserStat.last_miss_date != day),
+    ).update({UserStat.last_miss_date: day}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        print(f"Miss rules already applied to user {user.id} for {day}")
+        return {"rewarded": rewards_granted, "outcome": "already_missed"}
 
     should_execute_penalty = False
     if mode == "hardcore" or mode == "god":
@@ -169,7 +481,6 @@ def check_dsa_completion(user: User, db: Session):
     elif mode == "normal":
         if stats.lives > 0:
             stats.lives -= 1
-            db.commit()
             if stats.lives == 0:
                 should_execute_penalty = True
         else:
@@ -189,101 +500,30 @@ def check_dsa_completion(user: User, db: Session):
             freeze.quantity -= 1
             # We don't delete if quantity > 0, SQLAlchemy handles the update
             db.commit()
-            return
+            return {"rewarded": rewards_granted, "outcome": "frozen"}
 
-        # No freeze, reset streak and execute penalty
+        # No freeze, reset streak and execute penalty; queue_penalty commits the
+        # reset together with the journal row.
         stats.current_streak = 0
-        db.commit()
-        execute_zerodha_penalty(user, db)
-
-def execute_zerodha_penalty(user, db: Session):
-    if not user.access_token or not user.zerodha_api_key:
-        print(f"User {user.id} has no Zerodha credentials set. Skipping penalty.")
-        return
-
-    from kite import get_kite_client
-    from security import decrypt_token
-    
-    kite_client = get_kite_client(decrypt_token(user.zerodha_api_key))
-    kite_client.set_access_token(decrypt_token(user.access_token))
-
-    import random
-    
-    stats = db.query(UserStat).filter(UserStat.user_id == user.id).first()
-    risk_amount = stats.daily_risk_amount if stats else 50
-    
-    # List of penny stocks/volatile stocks
-    PENNY_STOCKS = ["SUZLON", "IDEA", "YESBANK", "JPPOWER", "UCOBANK"]
-    
-    chosen_stock = random.choice(PENNY_STOCKS)
-    exchange = kite_client.EXCHANGE_NSE
-    instrument_token = f"{exchange}:{chosen_stock}"
-    
-    quantity = 1
-    
-    try:
-        quote = kite_client.quote(instrument_token)
-        ltp = quote[instrument_token]["last_price"]
-        
-        if ltp > 0:
-            quantity = int(risk_amount // ltp)
-            
-        # Ensure at least 1 qty if risk amount is low but non-zero, or just fallback to 1
-        if quantity < 1:
-            quantity = 1
-            
-        print(f"Penalty calculation: Stock={chosen_stock}, LTP={ltp}, Risk={risk_amount}, Qty={quantity}")
-        
-    except Exception as e:
-        print(f"Error fetching quote for {chosen_stock}: {e}. Defaulting to Qty=1")
-        quantity = 1
+        # The order itself is placed by the penalty executor (helpers.penalties) on the job queue
+        queue_penalty(db, user.id, day)
+        return {"rewarded": rewards_granted, "outcome": "penalized"}
 
-    try:
-        order_id = kite_client.place_order(
-            variety=kite_client.VARIETY_REGULAR,
-            tradingsymbol=chosen_stock,
-            exchange=exchange,
-            transaction_type=kite_client.TRANSACTION_TYPE_BUY,
-            quantity=quantity, 
-            order_type=kite_client.ORDER_TYPE_MARKET,
-            product=kite_client.PRODUCT_CNC,
-            validity=kite_client.VALIDITY_DAY,
-        )
-        print(f"Penalty order placed for user {user.id}. Order ID: {order_id}")
-        if user.email and getattr(user, "email_notifications", 1):
-            try:
-                resend.Emails.send(build_penalty_email(user.email))
-            except Exception as mail_err:
-                print(f"Failed to send penalty email to {user.email}: {mail_err}")
-    except InputException as e:
-        if "Markets are closed right now." in str(e):
-            try:
-                order_id = kite_client.place_order(
-                    variety=kite_client.VARIETY_AMO,
-                    tradingsymbol=chosen_stock,
-                    exchange=exchange,
-                    transaction_type=kite_client.TRANSACTION_TYPE_BUY,
-                    quantity=quantity,
-                    order_type=kite_client.ORDER_TYPE_MARKET,
-                    product=kite_client.PRODUCT_CNC,
-                    validity=kite_client.VALIDITY_DAY,
-                )
-                print(f"Penalty AMO order placed for user {user.id}. Order ID: {order_id}")
-                if user.email and getattr(user, "email_notifications", 1):
-                    try:
-                        resend.Emails.send(build_penalty_email(user.email))
-                    except Exception as mail_err:
-                        print(f"Failed to send penalty email to {user.email}: {mail_err}")
-            except Exception as ex:
-                print(f"Failed to place penalty AMO order for user {user.id}: {ex}")
-    except Exception as e:
-        print(f"Failed to place penalty order for user {user.id}: {e}")
+    db.commit()
+    return {"rewarded": rewards_granted, "outcome": "lives_lost"}
 
 def daily_reset(db: Session):
     print("Performing daily reset...")
     db.query(UserStat).update({UserStat.powerups_used_today: 0})
     db.commit()
 
+    # Correct any drift between user_stats and the Redis leaderboard
+    from helpers.leaderboard import rebuild_leaderboard
+    try:
+        rebuild_leaderboard(db)
+    except Exception as e:
+        print(f"Leaderboard rebuild failed: {e}")
+
 def send_nudge_reminders(db: Session):
     print("Running pre-penalty nudges...")
     users = db.query(User).all()
@@ -300,32 +540,36 @@ def send_nudge_reminders(db: Session):
             print(f"Error nudging user {user.id}: {e}")
 
 
-def schedule_daily_check():
-    def job_wrapper():
-        india_tz = pytz.timezone("Asia/Kolkata")
-        now = datetime.now(india_tz)
-        current_time = now.strftime("%H:%M")
-        
-        if current_time in ["11:00", "15:00", "00:00"]:
-            from database import SessionLocal
-            db = SessionLocal()
-            try:
-                if current_time == "11:00": # Nudge at 11 AM IST
-                    send_nudge_reminders(db)
-                elif current_time == "15:00": # Penalty at 3 PM IST
-                    check_all_users_dsa(db)
-                elif current_time == "00:00": # Reset at Midnight
-                    daily_reset(db)
-            except Exception as e:
-                print(f"Error executing scheduled job at {current_time}: {e}")
-            finally:
-                db.close()
-
-    schedule.every().minute.do(job_wrapper)
-
-    def run_scheduler():
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
-
-    Thread(target=run_scheduler, daemon=True).start()
+# Cron-style schedule (IST). The leader in worker.py queues each run exactly
+# once per cluster; catch-up windows keep late runs inside their day.
+@cron_job("nudge", "0 11 * * *", catchup=3 * 3600)  # Nudge at 11 AM IST
+def run_nudges(db: Session):
+    send_nudge_reminders(db)
+
+
+# Must finish before the 3:30 PM rollover it evaluates against
+@cron_job("penalty_sweep", "0 15 * * *", catchup=25 * 60)  # Penalty at 3 PM IST
+def run_penalty_sweep(db: Session):
+    return start_sharded_sweep()
+
+
+@cron_job("sweep_deadline", "35 15 * * *", catchup=12 * 3600)  # Close a sweep whose shards were lost
+def run_sweep_deadline(db: Session):
+    return {"closed": close_overdue_sweep()}
+
+
+@cron_job("penalty_reaper", "*/5 * * * *", catchup=5 * 60)  # Re-queue penalty orders whose job was lost
+def run_penalty_reaper(db: Session):
+    from helpers.penalties import requeue_stuck_penalties
+    return {"requeued": requeue_stuck_penalties(db)}
+
+
+@cron_job("daily_curation", "15 15 * * *", catchup=10 * 60)  # Curate the window opening at 3:30 PM
+def run_curation(db: Session):
+    from helpers.curation import run_daily_curation
+    return run_daily_curation(db)
+
+
+@cron_job("daily_reset", "0 0 * * *", catchup=12 * 3600)  # Reset at Midnight
+def run_daily_reset(db: Session):
+    daily_reset(db)
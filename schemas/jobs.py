@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+
+class JobQueuedResponse(BaseModel):
+    job_id: str
+    status: str  # "queued", or "already_queued" when the user's job of this type was still pending
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    type: str
+    status: str  # queued | running | done | failed
+    created_at: Optional[int] = None
+    started_at: Optional[int] = None
+    finished_at: Optional[int] = None
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
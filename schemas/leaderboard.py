@@ -11,3 +11,12 @@ class LeaderboardEntry(BaseModel):
 
 class LeaderboardResponse(BaseModel):
     entries: List[LeaderboardEntry]
+    total: int = 0
+    page: int = 1
+    limit: int = 100
+
+class LeaderboardMeResponse(BaseModel):
+    rank: Optional[int] = None  # 1-based, None if the user has no stats yet
+    total_xp: int = 0
+    total: int = 0
+    entries: List[LeaderboardEntry]  # window of players around the user
@@ -17,9 +17,12 @@ class LeetCodeSubmissionItem(BaseModel):
 
 class LeetCodeSubmissionsResponse(BaseModel):
     submissions: List[LeetCodeSubmissionItem]
+    backfill_job_id: Optional[str] = None  # set when the cache was empty and a sync was queued
 
 
 class LeetCodeSubmissionSyncResponse(BaseModel):
     synced: int
     updated: int = 0
     total: int = 0
+    duplicates: int = 0
+    full_sync: bool = False
@@ -1,6 +1,12 @@
+import hashlib
 import os
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from helpers.cache import TTLCache
+from models import User
 
 load_dotenv()
 
@@ -10,8 +16,77 @@ if not encryption_key:
 
 cipher = Fernet(encryption_key)
 
+# Decrypted credentials are kept in memory briefly so hot paths (margins,
+# penalty orders, the Zerodha callback) don't pay for Fernet on every call.
+CREDENTIAL_CACHE_TTL = float(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "10000"))
+
+# sha256(ciphertext) -> plaintext. Fernet ciphertexts are never reused, so a
+# new credential is always a new key and an old entry can't be served for it.
+_plaintexts = TTLCache(maxsize=CREDENTIAL_CACHE_SIZE, ttl=CREDENTIAL_CACHE_TTL)
+
+
+def _digest(encrypted_token: str) -> bytes:
+    return hashlib.sha256(encrypted_token.encode()).digest()
+
+
 def encrypt_token(token: str) -> str:
     return cipher.encrypt(token.encode()).decode()
 
 def decrypt_token(encrypted_token: str) -> str:
-    return cipher.decrypt(encrypted_token.encode()).decode()
+    key = _digest(encrypted_token)
+    token = _plaintexts.get(key)
+    if token is None:
+        token = cipher.decrypt(encrypted_token.encode()).decode()
+        _plaintexts.set(key, token)
+    return token
+
+def decrypt_tokens(encrypted_tokens: list[str | None]) -> list[str | None]:
+    """Decrypt many tokens in one pass; missing or invalid ones come back as None."""
+    tokens = []
+    for encrypted_token in encrypted_tokens:
+        try:
+            tokens.append(decrypt_token(encrypted_token) if encrypted_token else None)
+        except InvalidToken:
+            tokens.append(None)
+    return tokens
+
+def forget_tokens(encrypted_tokens):
+    """Drop decrypted copies of `encrypted_tokens` from the cache."""
+    for encrypted_token in encrypted_tokens:
+        if encrypted_token:
+            _plaintexts.pop(_digest(encrypted_token))
+
+def credential_cache_stats() -> dict:
+    return _plaintexts.stats()
+
+
+# Replaced or cleared credentials (new Zerodha login, credential update,
+# disconnect) are evicted once the change is committed.
+_CREDENTIAL_COLUMNS = ("access_token", "zerodha_api_key", "zerodha_api_secret")
+
+# Load the old ciphertext on assignment even when the attribute has expired, so
+# it shows up in the update's history.
+for _column in _CREDENTIAL_COLUMNS:
+    event.listen(getattr(User, _column), "set", lambda *_: None, active_history=True)
+
+
+@event.listens_for(User, "after_update")
+def _credentials_replaced(mapper, connection, target):
+    state = inspect(target)
+    if state.session is None:
+        return
+    for column in _CREDENTIAL_COLUMNS:
+        old = state.attrs[column].history.deleted
+        if old:
+            state.session.info.setdefault("replaced_credentials", set()).update(old)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_replaced_credentials(session):
+    forget_tokens(session.info.pop("replaced_credentials", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_replaced_credentials(session):
+    session.info.pop("replaced_credentials", None)
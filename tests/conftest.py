@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+from cryptography.fernet import Fernet
+
+# The app reads its configuration at import time: point it at a throwaway
+# SQLite file before anything imports database.py.
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.pop("ASYNC_SQLALCHEMY_DATABASE_URL", None)
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+os.environ.setdefault("REDIS_CONN_STRING", "redis://localhost:6379/0")
+os.environ.setdefault("ZERODHA_ID", "test")
+
+import fakeredis
+import pytest
+
+import dependencies
+import main  # noqa: F401  (registers routes, job handlers and ORM hooks)
+from database import Base, SessionLocal, engine
+from helpers import session_cache
+
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    """A fresh fake Redis, shared by the sync and async clients."""
+    server = fakeredis.FakeServer()
+    sync_client = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(dependencies, "get_sync_redis_client", lambda: sync_client)
+    monkeypatch.setattr(dependencies, "redis_client", fakeredis.aioredis.FakeRedis(server=server))
+    return sync_client
+
+
+@pytest.fixture(autouse=True)
+def db():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session_cache._local_sessions.clear()
+    session_cache._local_users.clear()
+    session = SessionLocal()
+    yield session
+    session.close()
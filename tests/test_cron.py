@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import scheduler
+from helpers import cron
+from helpers.jobs import PRIORITY_QUEUE_KEY
+from helpers.leetcode import SubmissionSnapshot
+from models import PenaltyOrder, User, UserStat
+
+
+def test_lease_is_only_renewed_and_released_by_its_holder(redis):
+    assert cron.acquire_leadership("a")
+    assert not cron.acquire_leadership("b")
+
+    # a's lease lapses and b takes over; a must neither extend nor drop it
+    redis.delete(cron.LEADER_KEY)
+    assert cron.acquire_leadership("b")
+    redis.expire(cron.LEADER_KEY, 5)
+    assert not cron.acquire_leadership("a")
+    assert redis.ttl(cron.LEADER_KEY) <= 5
+    cron.release_leadership("a")
+    assert redis.get(cron.LEADER_KEY) == b"b"
+
+
+def test_each_slot_is_queued_once_by_competing_schedulers(redis):
+    now = cron.CRON_TZ.localize(datetime(2026, 10, 16, 15, 0, 5))
+
+    first = cron.tick(now)
+    assert "penalty_sweep" in first
+    # A second leader that read due_jobs before the first recorded its runs
+    redis.delete(cron.LAST_RUN_KEY)
+    assert cron.tick(now) == []
+    assert redis.llen(PRIORITY_QUEUE_KEY) == len(first)
+
+
+def test_late_cron_run_is_skipped():
+    ran = []
+    handler = cron._run_with_session(ran.append, catchup=60)
+    slot = (datetime.now(cron.CRON_TZ) - timedelta(minutes=5)).isoformat()
+
+    assert handler({"type": "cron:test", "params": {"slot": slot}}, None)["skipped"] == "late"
+    assert ran == []
+
+
+@pytest.mark.parametrize("mode, lives, streak, penalties", [("normal", 2, 5, 0), ("hardcore", 3, 0, 1)])
+def test_miss_rules_apply_once_per_penalty_day(db, mode, lives, streak, penalties):
+    db.add(User(id=1, email="coder@example.com"))
+    db.add(UserStat(user_id=1, lives=3, current_streak=5, difficulty_mode=mode))
+    db.commit()
+
+    outcomes = [
+        scheduler.apply_dsa_completion(db.get(User, 1), db, SubmissionSnapshot([]), {})["outcome"]
+        for _ in range(2)
+    ]
+
+    assert outcomes[1] == "already_missed"
+    db.expire_all()
+    stats = db.query(UserStat).one()
+    assert (stats.lives, stats.current_streak) == (lives, streak)
+    assert db.query(PenaltyOrder).count() == penalties
@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import kite
+from helpers import penalties
+from helpers.jobs import PRIORITY_QUEUE_KEY
+from models import PenaltyOrder, User, UserStat
+from security import encrypt_token
+
+DAY = date(2026, 10, 16)
+
+
+class FakeKite:
+    """Stands in for KiteConnect: quotes at a fixed price and an in-memory order book."""
+    api_key = "api-key"
+    EXCHANGE_NSE = "NSE"
+    TRANSACTION_TYPE_BUY = "BUY"
+    ORDER_TYPE_MARKET = "MARKET"
+    PRODUCT_CNC = "CNC"
+    VALIDITY_DAY = "DAY"
+    VARIETY_REGULAR = "regular"
+    VARIETY_AMO = "amo"
+
+    def __init__(self):
+        self.book = []
+
+    def set_access_token(self, access_token):
+        pass
+
+    def quote(self, instruments):
+        return {instrument: {"last_price": 10.0} for instrument in instruments}
+
+    def orders(self):
+        return self.book
+
+    def place_order(self, **params):
+        self.book.append({"order_id": f"order-{len(self.book) + 1}", "tag": params["tag"]})
+        return self.book[-1]["order_id"]
+
+
+@pytest.fixture
+def broker(db, monkeypatch):
+    client = FakeKite()
+    monkeypatch.setattr(kite, "get_kite_client", lambda api_key: client)
+    db.add(User(
+        id=1, email="coder@example.com", email_notifications=0,
+        zerodha_api_key=encrypt_token("api-key"), access_token=encrypt_token("access-token"),
+    ))
+    db.add(UserStat(user_id=1, daily_risk_amount=50))
+    db.commit()
+    return client
+
+
+def _order(db) -> PenaltyOrder:
+    db.expire_all()
+    return db.query(PenaltyOrder).one()
+
+
+def test_queue_penalty_journals_and_queues_once(db, redis):
+    assert penalties.queue_penalty(db, 1, DAY)
+    assert not penalties.queue_penalty(db, 1, DAY)
+
+    assert _order(db).status == "queued"
+    assert redis.llen(PRIORITY_QUEUE_KEY) == 1
+
+
+def test_order_is_placed_once_and_counted_as_loss(db, broker):
+    penalties.queue_penalty(db, 1, DAY)
+
+    assert penalties.execute_zerodha_penalty(db, 1, DAY)["status"] == "placed"
+    assert penalties.execute_zerodha_penalty(db, 1, DAY) == {"status": "not_queued"}
+
+    order = _order(db)
+    assert (order.status, order.order_id, order.quantity) == ("placed", "order-1", 5)
+    assert len(broker.book) == 1
+    assert db.query(UserStat).one().lifetime_loss == Decimal("50.00")
+
+
+def test_retry_after_a_lost_worker_finds_the_placed_order(db, broker, redis):
+    penalties.queue_penalty(db, 1, DAY)
+    # The worker claimed the row and reached Kite, then died (and its job with it)
+    # before journaling the order
+    order = _order(db)
+    order.status, order.attempts, order.tradingsymbol, order.quantity = "placing", 1, "IDEA", 5
+    order.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    broker.place_order(tag=penalties.order_tag(1, DAY))
+    redis.flushall()
+
+    assert penalties.requeue_stuck_penalties(db) == 1
+    assert _order(db).status == "queued"
+    assert redis.llen(PRIORITY_QUEUE_KEY) == 1
+    assert penalties.execute_zerodha_penalty(db, 1, DAY) == {"status": "placed", "order_id": "order-1"}
+    assert len(broker.book) == 1
+
+
+def test_reaper_leaves_recent_and_finished_rows_alone(db, redis):
+    db.add_all([
+        PenaltyOrder(user_id=1, penalty_date=DAY, status="queued", attempts=0),
+        PenaltyOrder(user_id=2, penalty_date=DAY, status="placed", attempts=1,
+                     updated_at=datetime.utcnow() - timedelta(hours=1)),
+        PenaltyOrder(user_id=3, penalty_date=DAY, status="placing", attempts=1,
+                     updated_at=datetime.utcnow() - timedelta(hours=1)),
+    ])
+    db.commit()
+
+    assert penalties.requeue_stuck_penalties(db) == 1
+    db.expire_all()
+    assert [(row.user_id, row.status) for row in db.query(PenaltyOrder).order_by(PenaltyOrder.user_id)] == [
+        (1, "queued"), (2, "placed"), (3, "queued"),
+    ]
+    assert redis.llen(PRIORITY_QUEUE_KEY) == 1
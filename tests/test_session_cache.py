@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from helpers import session_cache
+from models import User, UserSession, UserStat
+
+
+@pytest.fixture
+def client(db):
+    db.add(User(id=1, email="coder@example.com", leetcode_username="coder", leetcode_session="cookie-secret"))
+    db.add(UserStat(user_id=1))
+    db.add(UserSession(user_id=1, session_token="token", expires_at=datetime.now() + timedelta(days=1)))
+    db.commit()
+    client = TestClient(main.app)
+    client.cookies.set("session_token", "token")
+    return client
+
+
+def test_cached_user_serves_async_routes(client):
+    # Miss, then a local hit, then a Redis hit: each rebuilds the user from the snapshot
+    for clear_local in (False, False, True):
+        if clear_local:
+            session_cache._local_sessions.clear()
+            session_cache._local_users.clear()
+        response = client.get("/user/stats")
+        assert response.status_code == 200
+        assert response.json()["leetcode_connected"] is True
+
+
+def test_snapshot_leaves_secrets_out_of_redis(client, redis):
+    client.get("/user/stats")
+
+    snapshot = json.loads(redis.get("auth:user:1"))
+    assert "leetcode_session" not in snapshot
+    assert snapshot["leetcode_connected"] is True
+
+
+def test_logout_in_another_process_revokes_local_hits(client, db, redis):
+    assert client.get("/user/stats").status_code == 200
+
+    # What /auth/logout does in another process: this process keeps its local entry
+    db.query(UserSession).delete()
+    db.commit()
+    redis.delete(f"auth:session:{session_cache.token_hash('token')}")
+
+    assert client.get("/user/stats").status_code == 401
+
+
+def test_committed_user_change_drops_snapshot(client, db, redis):
+    client.get("/user/stats")
+    assert redis.exists("auth:user:1")
+
+    db.get(User, 1).leetcode_session = None
+    db.commit()
+
+    assert not redis.exists("auth:user:1")
+    assert client.get("/user/stats").json()["leetcode_connected"] is False
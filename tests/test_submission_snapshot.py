@@ -0,0 +1,46 @@
+import httpx
+import pytest
+
+import helpers.leetcode as leetcode
+import scheduler
+from helpers.leetcode import SubmissionSnapshot
+from models import PenaltyOrder, User, UserStat
+
+
+def _respond(monkeypatch, status_code: int, body: dict):
+    request = httpx.Request("POST", "https://leetcode.com/graphql/")
+    monkeypatch.setattr(leetcode, "_leetcode_post", lambda **_: httpx.Response(status_code, json=body, request=request))
+
+
+def test_clean_response_is_ok(monkeypatch):
+    _respond(monkeypatch, 200, {"data": {"recentSubmissionList": []}})
+
+    snapshot = leetcode.fetch_submission_snapshot("coder")
+    assert snapshot.ok
+    assert snapshot.submissions == []
+
+
+@pytest.mark.parametrize("status_code, body", [
+    (403, {"data": {"recentSubmissionList": []}}),
+    (429, {"error": "rate limited"}),
+    (200, {"errors": [{"message": "That user does not exist."}], "data": None}),
+    (200, {"data": {"recentSubmissionList": None}}),
+    (200, {"data": None}),
+])
+def test_errors_are_not_an_empty_history(monkeypatch, status_code, body):
+    _respond(monkeypatch, status_code, body)
+
+    assert not leetcode.fetch_submission_snapshot("coder").ok
+
+
+def test_failed_snapshot_applies_no_miss_rules(db):
+    db.add(User(id=1, email="coder@example.com"))
+    db.add(UserStat(user_id=1, lives=3, current_streak=5))
+    db.commit()
+
+    result = scheduler.apply_dsa_completion(db.get(User, 1), db, SubmissionSnapshot(ok=False), {})
+
+    assert result["outcome"] == "failed"
+    stats = db.query(UserStat).one()
+    assert (stats.lives, stats.current_streak) == (3, 5)
+    assert db.query(PenaltyOrder).count() == 0
@@ -22,9 +22,118 @@ def add_columns():
             conn.execute(text("ALTER TABLE question_completions ADD COLUMN source VARCHAR(20) DEFAULT 'sync' NOT NULL"))
         except Exception:
             pass
+
+        try:
+            conn.execute(text("CREATE INDEX ix_user_stats_total_xp ON user_stats (total_xp)"))
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE user_stats ADD COLUMN streak_last_day DATE"))
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE user_stats ADD COLUMN last_miss_date DATE"))
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE daily_curation ADD COLUMN preferences_hash VARCHAR(40)"))
+        except Exception:
+            pass
+
+        try:
+            conn.execute(text("ALTER TABLE questions ADD COLUMN content_hash CHAR(40)"))
+        except Exception:
+            pass
         
         conn.commit()
         print("Finished updating DB columns")
 
+def backfill_solve_days():
+    """Create user_solve_days and fill it (plus streaks) from each user's history."""
+    from models import UserSolveDay, UserStat
+    from helpers.streaks import rebuild_user_streak
+
+    UserSolveDay.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(UserStat.user_id).all()]
+        for user_id in user_ids:
+            rebuild_user_streak(user_id, db)
+        print(f"Backfilled solve days for {len(user_ids)} users")
+    finally:
+        db.close()
+
+def backfill_daily_activity():
+    """Create user_daily_activity and rebuild it from raw submissions/completions."""
+    from models import LeetCodeSubmission, QuestionCompletion, UserDailyActivity
+    from helpers.activity import rebuild_user_activity
+
+    UserDailyActivity.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        user_ids = {row[0] for row in db.query(LeetCodeSubmission.user_id).distinct().all()}
+        user_ids |= {row[0] for row in db.query(QuestionCompletion.user_id).distinct().all()}
+        for user_id in sorted(user_ids):
+            rebuild_user_activity(user_id, db)
+        print(f"Backfilled daily activity for {len(user_ids)} users")
+    finally:
+        db.close()
+
+def backfill_question_topics():
+    """Create topics/question_topics and fill them from the comma-joined questions.topics."""
+    from models import Question, QuestionTopic, Topic
+    from helpers.topics import set_question_topics, split_topics
+
+    Topic.__table__.create(bind=engine, checkfirst=True)
+    QuestionTopic.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        rows = db.query(Question.id, Question.topics).all()
+        for start in range(0, len(rows), 500):
+            chunk = rows[start:start + 500]
+            set_question_topics(db, {
+                question_id: [{"name": name} for name in split_topics(topics)]
+                for question_id, topics in chunk
+            })
+            db.commit()
+        print(f"Backfilled topics for {len(rows)} questions")
+
+        from helpers.catalog import bump_catalog_version
+        bump_catalog_version()
+    finally:
+        db.close()
+
+def backfill_achievements():
+    """Dedupe user_achievements, add its unique key and unlock anything already earned.
+
+    Unlocks used to happen only when the achievements page was viewed; they
+    now come from stat-change events (helpers/achievements.py).
+    """
+    from helpers.achievements import backfill_achievements as unlock_earned
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text(
+                "DELETE a FROM user_achievements a JOIN user_achievements b "
+                "ON a.user_id = b.user_id AND a.achievement_id = b.achievement_id AND a.id > b.id"
+            ))
+            conn.execute(text("CREATE UNIQUE INDEX uq_user_achievement ON user_achievements (user_id, achievement_id)"))
+        except Exception:
+            pass
+        conn.commit()
+
+    db = SessionLocal()
+    try:
+        print(f"Unlocked {unlock_earned(db)} earned achievements")
+    finally:
+        db.close()
+
 if __name__ == "__main__":
     add_columns()
+    backfill_solve_days()
+    backfill_daily_activity()
+    backfill_question_topics()
+    backfill_achievements()
@@ -0,0 +1,81 @@
+"""Background job worker and scheduler.
+
+Pops jobs queued by the API (LeetCode history backfills, ...) and by the
+scheduler (penalty sweep, nudges, curation, daily reset) from Redis and runs
+them. Every worker also runs the scheduler loop; a Redis lease elects one
+leader, so each scheduled run is queued once per cluster. Start as many as
+needed, on any host that can reach Redis and the database:
+
+    python worker.py --concurrency 2
+    python worker.py --no-scheduler   # jobs only
+"""
+import argparse
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import models  # noqa: F401  (register all tables)
+import helpers.submissions  # noqa: F401  (registers the LeetCode sync job handlers)
+import helpers.penalties  # noqa: F401  (registers the penalty order executor)
+import scheduler  # noqa: F401  (registers the cron jobs)
+# Every module with ORM hooks is imported before any thread starts: jobs commit
+# the same tables the API does, and SQLAlchemy listeners must not be added
+# while other threads are dispatching events.
+import helpers.achievements  # noqa: F401  (unlocks achievements on stat changes)
+import helpers.curation  # noqa: F401  (drops cached curation when preferences change)
+import helpers.leaderboard  # noqa: F401  (mirrors total_xp into the Redis leaderboard)
+import helpers.margins  # noqa: F401  (drops cached margins when credentials change)
+import helpers.session_cache  # noqa: F401  (drops cached users when their row changes)
+import security  # noqa: F401  (evicts decrypted credentials when they change)
+from helpers.cron import run_scheduler
+from helpers.jobs import PRIORITY_QUEUE_KEY, work
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))
+# Threads that only take priority jobs (cron runs, sweep shards, penalty orders)
+WORKER_PRIORITY_CONCURRENCY = int(os.getenv("WORKER_PRIORITY_CONCURRENCY", "1"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run GamLeet background jobs.")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs run in parallel")
+    parser.add_argument(
+        "--priority-concurrency", type=int, default=WORKER_PRIORITY_CONCURRENCY,
+        help="extra threads reserved for scheduled and penalty jobs",
+    )
+    parser.add_argument("--no-scheduler", action="store_true", help="don't take part in scheduler leader election")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    threads = [
+        threading.Thread(target=work, args=(stop,), name=f"job-worker-{n}")
+        for n in range(max(args.concurrency, 1))
+    ]
+    threads += [
+        threading.Thread(target=work, args=(stop,), kwargs={"queues": (PRIORITY_QUEUE_KEY,)}, name=f"priority-worker-{n}")
+        for n in range(max(args.priority_concurrency, 0))
+    ]
+    if not args.no_scheduler:
+        threads.append(threading.Thread(target=run_scheduler, args=(stop,), name="scheduler"))
+    for thread in threads:
+        thread.start()
+    print(
+        f"Worker started with {max(args.concurrency, 1)} job thread(s), "
+        f"{max(args.priority_concurrency, 0)} priority thread(s)" + ("" if args.no_scheduler else " and the scheduler")
+    )
+
+    # Finish the jobs in hand, then exit
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    print("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()